@@ -1,192 +1,260 @@
 import streamlit as st
-from utils.downloader import download_video_audio
-from utils.audio import extract_audio
-from utils.transcribe import transcribe_with_assemblyai
-from utils.frames import extract_frames
-from utils.embeddings import get_clip_embedding, get_text_embedding
-from utils.fusion import fuse_embeddings
-from utils.storage import save_embedding_to_json
-from utils.vectorstore import get_or_create_collection, add_video_to_collection
+from utils.embeddings import get_clip_backend
+from utils.vectorstore import get_or_create_collection
 from utils.pdf import generate_pdf_summary, generate_detailed_pdf, generate_breakdown_pdf
-import hashlib
+from utils.cache import hash_inputs
+from utils.chunking import format_timestamp
+from utils.frame_search import find_moments
+from utils.pipeline import run_ingest, STAGES, TranscriptionError
+from utils.jobs import JobManager
+from utils.llm import LLMError, DEFAULT_MODEL
+from utils.generation import (
+    TEMPERATURE, PROMPT_TEMPLATES, MAP_INSTRUCTIONS, set_error_handler,
+    generate_summary_groq, generate_detailed_explanation, generate_time_aligned_breakdown,
+)
+from utils.llm_cache import ResponseCache
+from utils.answer_cache import AnswerCache
+from utils.memory import ChatMemory
+from utils.mapreduce import condense, needs_map_reduce, split_units, timestamped_lines
+import utils.query as query
 import os
-import requests
-
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
-
-def generate_answer_groq(context_text, chat_history, question):
-    messages = chat_history + [
-        {"role": "user", "content": f"Context:\n{context_text}\n\nQuestion: {question}"}
-    ]
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": messages,
-        "max_tokens": 300,
-        "temperature": 0.3,
-    }
-    response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        st.error(f"Groq API error {response.status_code}: {response.text}")
-        return "Failed to generate answer."
-
-def generate_summary_groq(transcript_text):
-    prompt = f"""
-You are an assistant that summarizes YouTube video transcripts.
-
-Please provide a concise and informative summary of the following transcript:
-
-{transcript_text}
-
-Summary:
-"""
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 300,
-        "temperature": 0.3,
-    }
-    response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        st.error(f"Groq API error {response.status_code}: {response.text}")
-        return "Failed to generate summary."
-
-def generate_detailed_explanation(transcript_text):
-    prompt = f"""
-You are an AI assistant. Read the transcript of a YouTube video below and generate a detailed explanation that expands on all important points, examples, and logic used.
-
-Transcript:
-{transcript_text}
-
-Detailed Explanation:
-"""
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 1000,
-        "temperature": 0.3,
-    }
-    response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        st.error(f"Groq API error {response.status_code}: {response.text}")
-        return "Failed to generate detailed explanation."
-
-def generate_time_aligned_breakdown(transcript_text):
-    prompt = f"""
-Read the following YouTube video transcript and generate a time-aligned breakdown of key sections. Format it as:
-
-[00:00] Introduction: ...
-[01:15] Key Concept 1: ...
-[03:45] Example and Use Case: ...
-...
-
-Transcript:
-{transcript_text}
-"""
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama-3.3-70b-versatile",
-        "messages": [{"role": "user", "content": prompt}],
-        "max_tokens": 1000,
-        "temperature": 0.3,
-    }
-    response = requests.post(GROQ_API_URL, headers=headers, json=payload)
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        st.error(f"Groq API error {response.status_code}: {response.text}")
-        return "Failed to generate time-aligned breakdown."
-
-def ingest_video(url, summary_type):
-    video_id = hashlib.md5(url.encode()).hexdigest()
-    video_dir = os.path.join("data/videos", video_id)
-    os.makedirs(video_dir, exist_ok=True)
-
-    with st.spinner("Downloading video and extracting audio..."):
-        video_path, _ = download_video_audio(url)
-        audio_path = extract_audio(video_path, video_id)
-
-    with st.spinner("Transcribing audio with AssemblyAI..."):
-        transcription_result = transcribe_with_assemblyai(audio_path)
-        if not transcription_result:
-            st.error("Transcription failed.")
-            return None, None, None, None, None
-        text = transcription_result
-
-    with st.spinner("Extracting frames and computing embeddings..."):
-        frame_paths = extract_frames(video_path, video_id, interval_sec=5)
-        frame_embeddings = [get_clip_embedding(p) for p in frame_paths]
-        text_embedding = get_text_embedding(text)
-        video_embedding = fuse_embeddings(text_embedding, frame_embeddings)
-
-    save_embedding_to_json(video_id, video_embedding, {
-        "url": url,
-        "text": text,
-        "title": "Unknown Title"
-    })
-
-    client, collection = get_or_create_collection()
-    add_video_to_collection(client, collection, video_id, video_embedding, {
-        "url": url,
-        "text": text,
-        "title": "Unknown Title"
-    })
+import time
+
+# Only for generation on the script thread (chat); background jobs record errors on the job
+set_error_handler(st.error)
+
+@st.cache_resource(show_spinner="Loading CLIP model...")
+def load_clip_model():
+    # Shared by every session and rerun; only loaded once something needs an embedding
+    return get_clip_backend()
+
+SUMMARY_VERSION = "llama-3.3-70b-versatile/v2"
+
+@st.cache_resource
+def get_response_cache():
+    return ResponseCache()
+
+@st.cache_resource
+def get_answer_cache():
+    return AnswerCache()
+
+@st.cache_resource
+def get_job_manager():
+    # One pool for every session, capped at MAX_PARALLEL_INGESTS running jobs
+    return JobManager()
+
+STAGE_LABELS = {
+    "download": "Downloading video",
+    "audio": "Extracting audio",
+    "transcript": "Transcribing audio with AssemblyAI",
+    "chunks": "Chunking and embedding the transcript",
+    "frames": "Extracting frames and computing CLIP embeddings",
+    "fusion": "Fusing text and visual embeddings",
+    "index": "Saving to the vector store",
+    "condense": "Long transcript: summarizing sections in parallel",
+    "summary": "Generating summary",
+}
+
+def _generation_input(template, transcript):
+    # The breakdown needs real timestamps, so feed it "[mm:ss] ..." lines when words are available
+    if template == "breakdown" and transcript.get("words"):
+        units = timestamped_lines(transcript["words"])
+        return "\n".join(units), units
+    return transcript["text"], None
+
+def _condensed(template, text, units, job):
+    if not needs_map_reduce(text):
+        return text
+    # Long transcript: summarize sections in parallel first
+    job.report("condense", "running")
+    started = time.perf_counter()
+    notes = condense(units or split_units(text), MAP_INSTRUCTIONS[template],
+                     keep_timestamps=template == "breakdown")
+    job.report("condense", "done", time.perf_counter() - started)
+    return notes
+
+def _cached_generation(template, transcript, generate, failure_message, job, bypass=False):
+    settings = PROMPT_TEMPLATES[template]
+    text, units = _generation_input(template, transcript)
+    key = ResponseCache.key(hash_inputs(text), settings["version"], DEFAULT_MODEL, settings["max_tokens"], TEMPERATURE)
+
+    def compute():
+        try:
+            prompt_text = _condensed(template, text, units, job)
+        except LLMError as e:
+            job.set_error(str(e))
+            return failure_message
+        # Tokens go to the job preview; the Ingest tab shows them while it polls.
+        # Errors go on the job too: st.error from this worker thread would be dropped.
+        parts = []
+        for chunk in generate(prompt_text, stream=True, on_error=job.set_error):
+            parts.append(chunk)
+            job.append_preview(chunk)
+        return "".join(parts).strip()
+
+    return get_response_cache().get_or_compute(
+        key,
+        compute,
+        bypass=bypass,
+        should_store=lambda value: not value.startswith("Failed to generate"),
+    )
 
+def _summarize(summary_type, transcript, video_id, url, job, bypass=False):
     if summary_type == "Brief Summary":
-        summary = generate_summary_groq(text)
+        summary = _cached_generation("summary", transcript, generate_summary_groq,
+                                     "Failed to generate summary.", job, bypass)
         pdf_path = generate_pdf_summary(video_id, url, summary)
     elif summary_type == "Detailed Explanation":
-        summary = generate_detailed_explanation(text)
+        summary = _cached_generation("detailed", transcript, generate_detailed_explanation,
+                                     "Failed to generate detailed explanation.", job, bypass)
         pdf_path = generate_detailed_pdf(video_id, summary)
     elif summary_type == "Time-Aligned Breakdown":
-        raw_summary = generate_time_aligned_breakdown(text)
+        raw_summary = _cached_generation("breakdown", transcript, generate_time_aligned_breakdown,
+                                         "Failed to generate time-aligned breakdown.", job, bypass)
         summary = '\n\n'.join(line.strip() for line in raw_summary.split('\n') if line.strip())
         pdf_path = generate_breakdown_pdf(video_id, summary)
     else:
         summary = "Invalid summary type."
         pdf_path = None
+    return {"summary": summary, "pdf_path": pdf_path}
+
+def ingest_video(url, summary_type, bypass_cache=False, visual=True):
+    """
+    Work function for a background ingest job: runs in a JobManager thread,
+    so it reports through `job` and never touches st.*.
+    """
+    def work(job):
+        get_clip_backend()  # process-wide, so concurrent jobs share one model
+        try:
+            result = run_ingest(url, progress=job.report, visual=visual, cancel=job.cancel_event)
+        except TranscriptionError as e:
+            raise RuntimeError(f"Transcription failed: {e}") from e
+
+        video_id = result["video_id"]
+        text = result["text"]
+        cache = result["cache"]
+
+        job.report("summary", "running")
+        started = time.perf_counter()
+        summary_stage = "summary:" + summary_type
+        if bypass_cache:
+            cache.invalidate(summary_stage)
+        summary, cached = cache.run(
+            summary_stage, {"text": hash_inputs(text)}, SUMMARY_VERSION,
+            lambda: _summarize(summary_type, result["transcript"], video_id, url, job, bypass_cache),
+            files=lambda out: [out["pdf_path"]] if out["pdf_path"] else [],
+        )
+        if not cached and summary["summary"].startswith("Failed to generate"):
+            # Don't let a transient Groq error stick in the manifest
+            cache.invalidate(summary_stage)
+        job.report("summary", "cached" if cached else "done", time.perf_counter() - started)
+
+        return {
+            "text": text,
+            "embedding": result["video_embedding"],
+            "summary": summary["summary"],
+            "pdf_path": summary["pdf_path"],
+            "video_id": video_id,
+        }
+
+    return work
+
+def _load_job_result(job):
+    # Copy a finished job's result into this session, once
+    if st.session_state.loaded_job == job.id or not job.result:
+        return
+    result = job.result
+    st.session_state.transcription = result["text"]
+    st.session_state.embedding = result["embedding"]
+    st.session_state.summary = result["summary"]
+    st.session_state.pdf_path = result["pdf_path"]
+    st.session_state.chat_history = []
+    st.session_state.memory = ChatMemory()
+    st.session_state.moments = {}
+    st.session_state.video_id = result["video_id"]
+    st.session_state.loaded_job = job.id
+
+def _render_stage(stage, info):
+    label = STAGE_LABELS.get(stage, stage)
+    if info["status"] == "running":
+        st.info(f"⏳ {label}...")
+    elif info["status"] == "cached":
+        st.success(f"♻️ {label} (cached)")
+    elif info["status"] == "done":
+        st.success(f"✅ {label} ({info['seconds']:.1f}s)")
+
+def _render_job(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        st.warning("This ingest job has expired.")
+        return
+    state = job.snapshot()
+    st.progress(state["percent"], text=f"{state['label']}: {state['status']}")
+    for stage, info in state["stages"].items():
+        _render_stage(stage, info)
+    if state["preview"] and state["status"] == "running":
+        st.markdown(state["preview"])
+
+    if state["status"] in ("queued", "running"):
+        if state["cancelling"]:
+            st.caption("Cancelling after the current stage...")
+        elif st.button("Cancel", key=f"cancel-{job_id}"):
+            get_job_manager().cancel(job_id)
+    elif state["status"] == "failed":
+        st.error(state["error"])
+    elif state["status"] == "cancelled":
+        st.warning("Ingestion cancelled.")
+    else:
+        if state["error"]:
+            st.warning(state["error"])
+        if st.session_state.loaded_job != job_id:
+            # Finished while polling: rerun the whole script so the result is loaded
+            st.rerun()
 
-    return text, video_embedding, summary, pdf_path, video_id
+# Re-renders itself once a second while the job runs, without rerunning the page
+job_panel = st.fragment(run_every=1.0)(_render_job)
 
-def answer_question(collection, question, chat_history):
-    q_emb = get_text_embedding(question)
-    results = collection.query(
-        query_embeddings=[q_emb.tolist()],
-        n_results=3,
-        include=['documents', 'metadatas', 'distances']
+def answer_question(collection, question, stream=False):
+    load_clip_model()
+    # Filter inside Chroma so the top-k chunks all belong to the video being discussed.
+    # The prompt's history comes from the session's ChatMemory; chat_history is only for display.
+    return query.answer_question(
+        collection, question, video_id=st.session_state.video_id, stream=stream, memory=st.session_state.memory,
+        cache=get_answer_cache(),
     )
-    context = "\n\n".join(doc[0] if isinstance(doc, list) else doc for doc in results['documents']) if results['documents'] else "No relevant context found."
-    return generate_answer_groq(context, chat_history, question)
+
+def moments_caption(question):
+    """
+    "See 12:35, 14:02-14:20" pointing at the frames that best match the question.
+    """
+    moments = find_moments(question, video_id=st.session_state.video_id)
+    if not moments:
+        return None
+    spans = [
+        format_timestamp(m["start"]) + (f"-{format_timestamp(m['end'])}" if m["end"] > m["start"] else "")
+        for m in sorted(moments, key=lambda m: m["start"])
+    ]
+    return "🎞️ See " + ", ".join(spans)
 
 # Streamlit UI
 st.title("YouTube Video Summarizer & Chat with Groq LLaMA")
 
 _, collection = get_or_create_collection()
 
+with st.sidebar:
+    cache_stats = get_response_cache().stats()
+    st.caption(f"LLM response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+               f"({cache_stats['bytes'] / 1024:.0f} KB)")
+    answer_stats = get_answer_cache().stats()
+    st.caption(f"Chat answer cache: {answer_stats['hit_rate']:.0%} hit rate "
+               f"({answer_stats['hits']} hits / {answer_stats['misses']} misses, {answer_stats['entries']} entries)")
+
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
+if "memory" not in st.session_state:
+    st.session_state.memory = ChatMemory()
+
 if "transcription" not in st.session_state:
     st.session_state.transcription = None
 
@@ -199,44 +267,85 @@ if "summary" not in st.session_state:
 if "video_id" not in st.session_state:
     st.session_state.video_id = None
 
+if "moments" not in st.session_state:
+    st.session_state.moments = {}
+
+if "pdf_path" not in st.session_state:
+    st.session_state.pdf_path = None
+
+if "loaded_job" not in st.session_state:
+    st.session_state.loaded_job = None
+
+# The job id lives in the URL so a browser refresh reattaches to a running job
+if "job_id" not in st.session_state:
+    st.session_state.job_id = st.query_params.get("job")
+
 tab1, tab2 = st.tabs(["Ingest Video", "Chat"])
 
 with tab1:
     st.header("Ingest a YouTube Video")
     summary_option = st.radio("Choose summary type:", ["Brief Summary", "Detailed Explanation", "Time-Aligned Breakdown"])
     video_url = st.text_input("Enter YouTube video URL")
+    regenerate = st.checkbox("Regenerate summary (skip the response cache)")
+    transcript_only = st.checkbox("Transcript only (download audio, skip frame embeddings)")
     if st.button("Ingest Video"):
         if not video_url.strip():
             st.error("Please enter a valid URL.")
         else:
-            transcription, embedding, summary, pdf_path, video_id = ingest_video(video_url.strip(), summary_option)
-            if transcription:
-                st.success("Video ingested successfully!")
-                st.session_state.transcription = transcription
-                st.session_state.embedding = embedding
-                st.session_state.summary = summary
-                st.session_state.chat_history = []
-                st.session_state.video_id = video_id
-                st.write(summary)
-                if pdf_path and os.path.exists(pdf_path):
-                    with open(pdf_path, "rb") as f:
-                        st.download_button("📄 Download Summary PDF", f, file_name=os.path.basename(pdf_path), mime="application/pdf")
+            job = get_job_manager().submit(
+                video_url.strip(),
+                ingest_video(video_url.strip(), summary_option, regenerate, visual=not transcript_only),
+                stages=[stage for stage in STAGES if not (transcript_only and stage == "frames")] + ["summary"],
+            )
+            st.session_state.job_id = job.id
+            st.query_params["job"] = job.id
+
+    active = get_job_manager().running_count()
+    if active:
+        st.caption(f"{active} ingest job(s) queued or running across all users")
+
+    job = get_job_manager().get(st.session_state.job_id) if st.session_state.job_id else None
+    if job is not None:
+        _load_job_result(job)
+        if job.finished:
+            _render_job(job.id)
+        else:
+            job_panel(job.id)
+
+    if job is not None and st.session_state.loaded_job == job.id:
+        st.success("Video ingested successfully!")
+        st.write(st.session_state.summary)
+        pdf_path = st.session_state.pdf_path
+        if pdf_path and os.path.exists(pdf_path):
+            with open(pdf_path, "rb") as f:
+                st.download_button("📄 Download Summary PDF", f, file_name=os.path.basename(pdf_path), mime="application/pdf")
 
 with tab2:
     st.header("Chat with the Video")
     if st.session_state.embedding is None:
         st.info("Please ingest a video first in Tab 1.")
     else:
-        for msg in st.session_state.chat_history:
+        for i, msg in enumerate(st.session_state.chat_history):
             if msg['role'] == 'user':
                 st.markdown(f"**You:** {msg['content']}")
             else:
                 st.markdown(f"**Groq LLaMA:** {msg['content']}")
+                if i in st.session_state.moments:
+                    st.caption(st.session_state.moments[i])
+
+        memory = st.session_state.memory
+        if memory.summarized_turns:
+            st.caption(f"{memory.summarized_turns} earlier turn(s) summarized; "
+                       f"history sent with each question: ~{memory.tokens()} tokens")
 
         user_input = st.text_input("Ask a question")
         if st.button("Send") and user_input.strip():
             st.session_state.chat_history.append({"role": "user", "content": user_input.strip()})
-            with st.spinner("Thinking..."):
-                answer = answer_question(collection, user_input.strip(), st.session_state.chat_history)
+            st.markdown(f"**You:** {user_input.strip()}")
+            st.markdown("**Groq LLaMA:**")
+            answer = st.write_stream(answer_question(collection, user_input.strip(), stream=True))
             st.session_state.chat_history.append({"role": "assistant", "content": answer})
+            caption = moments_caption(user_input.strip())
+            if caption:
+                st.session_state.moments[len(st.session_state.chat_history) - 1] = caption
             st.rerun()
@@ -0,0 +1,65 @@
+"""
+Compare CLIP image-embedding throughput: per-frame loop vs batched engine.
+
+Run from the repo root:
+    python -m benchmarks.bench_clip --frames 128 --batch-size 32 --threads 4
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.embeddings import get_clip_embedding, get_clip_embeddings, set_torch_threads
+
+def make_frames(n, output_dir, size=(640, 360)):
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(n):
+        frame = rng.integers(0, 255, size=(size[1], size[0], 3), dtype=np.uint8)
+        path = os.path.join(output_dir, f"frame_{i}.jpg")
+        Image.fromarray(frame).save(path, quality=90)
+        paths.append(path)
+    return paths
+
+def bench(fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return elapsed, n / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    set_torch_threads(args.threads)
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_frames(args.frames, tmp)
+
+        # Warm up both paths so one-time allocation isn't measured
+        get_clip_embedding(paths[0])
+        get_clip_embeddings(paths[:2], batch_size=2)
+
+        loop_s, loop_fps = bench(lambda: [get_clip_embedding(p) for p in paths], len(paths))
+        batch_s, batch_fps = bench(
+            lambda: get_clip_embeddings(paths, batch_size=args.batch_size, num_workers=args.workers),
+            len(paths),
+        )
+
+        loop = np.stack([get_clip_embedding(p).numpy() for p in paths[:4]])
+        batched = get_clip_embeddings(paths[:4])
+        max_diff = float(np.abs(loop - batched).max())
+
+    print(f"frames={args.frames} batch_size={args.batch_size} workers={args.workers} threads={args.threads or 'default'}")
+    print(f"per-frame loop : {loop_s:7.2f}s  {loop_fps:7.1f} frames/s")
+    print(f"batched        : {batch_s:7.2f}s  {batch_fps:7.1f} frames/s")
+    print(f"speedup        : {batch_fps / loop_fps:7.2f}x  (max abs diff {max_diff:.2e})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Text-to-moment search latency over a synthetic frame index.
+
+Run from the repo root:
+    python -m benchmarks.bench_frame_search --videos 200 --frames-per-video 250
+
+Random vectors stand in for CLIP frame embeddings (no model is loaded). They
+are written as per-video .npy artifacts to a temp directory, so the index
+load time is measured too. Latency is reported for a search over every frame
+and for one video.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.frame_search import FrameIndex, merge_hits
+from utils.storage import FRAME_EMBEDDINGS_FILE, FRAME_TIMESTAMPS_FILE, VIDEO_EMBEDDING_FILE
+
+def timed_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--frames-per-video", type=int, default=250)
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        for v in range(args.videos):
+            video_dir = os.path.join(tmp, f"video{v}")
+            os.makedirs(video_dir)
+            frames = rng.standard_normal((args.frames_per_video, 512)).astype(np.float32)
+            np.save(os.path.join(video_dir, FRAME_EMBEDDINGS_FILE), frames)
+            np.save(os.path.join(video_dir, FRAME_TIMESTAMPS_FILE), np.arange(args.frames_per_video, dtype=np.float32) * 5)
+            np.save(os.path.join(video_dir, VIDEO_EMBEDDING_FILE), frames.mean(axis=0))
+
+        index = FrameIndex(root=tmp)
+        start = time.perf_counter()
+        frames_total = len(index)  # triggers the load
+        build_s = time.perf_counter() - start
+
+        queries = itertools.cycle(rng.standard_normal((args.repeats, 512)).astype(np.float32))
+        all_p50, all_p95 = timed_ms(
+            lambda: merge_hits(index.search(next(queries), top_k=args.top_k)), args.repeats
+        )
+        one_p50, one_p95 = timed_ms(
+            lambda: merge_hits(index.search(next(queries), top_k=args.top_k, video_id="video7")), args.repeats
+        )
+
+    print(f"frames={frames_total} ({args.videos} videos x {args.frames_per_video}), loaded in {build_s:.2f}s")
+    print(f"all videos : p50 {all_p50:6.2f} ms  p95 {all_p95:6.2f} ms")
+    print(f"one video  : p50 {one_p50:6.2f} ms  p95 {one_p95:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
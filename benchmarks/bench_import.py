@@ -0,0 +1,59 @@
+"""
+Measure cold import time of the app's modules with `python -X importtime`.
+
+Run from the repo root:
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --modules utils.pipeline utils.query --top 15
+
+Each module set is imported in a fresh interpreter. The report shows the
+wall time of the import, the cumulative time reported by -X importtime and
+the most expensive imports. CLIP is loaded lazily, so torch/transformers
+should not appear unless something forces the model to load.
+"""
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+DEFAULT_MODULES = ["utils.pipeline", "utils.query", "utils.generation", "utils.ingest"]
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def import_profile(modules):
+    code = "; ".join(f"import {m}" for m in modules)
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent)))
+    # Top-level imports have the smallest indent; their cumulative times add up to the total
+    min_indent = min(e[3] for e in entries) if entries else 0
+    total_us = sum(e[2] for e in entries if e[3] == min_indent)
+    return wall, total_us, entries
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    wall, total_us, entries = import_profile(args.modules)
+    print(f"modules      : {' '.join(args.modules)}")
+    print(f"process wall : {wall:.3f}s (includes interpreter start-up)")
+    print(f"import total : {total_us / 1e6:.3f}s")
+    heavy = [e for e in entries if e[0].split(".")[0] in ("torch", "transformers", "chromadb", "yt_dlp")]
+    print(f"heavy deps   : {'none' if not heavy else ', '.join(sorted({e[0].split('.')[0] for e in heavy}))}")
+    print(f"\nTop {args.top} imports by cumulative time:")
+    for name, _, cumulative_us, _ in sorted(entries, key=lambda e: -e[2])[:args.top]:
+        print(f"  {cumulative_us / 1e3:9.1f} ms  {name}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+BM25 keyword search latency over a synthetic transcript corpus.
+
+Run from the repo root:
+    python -m benchmarks.bench_lexical --videos 20000 --chunks-per-video 40
+
+Chunks are ~60 words drawn from a Zipf-distributed vocabulary, so a few
+words are very common and most are rare, as in real transcripts. Reports
+build time, index size on disk and query latency over every video and
+within one video.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from utils.lexical_index import LexicalIndex
+
+def timed_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--chunks-per-video", type=int, default=40)
+    parser.add_argument("--vocab", type=int, default=50000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vocab = [f"w{i}" for i in range(args.vocab)]
+
+    def words(n):
+        return [vocab[(i - 1) % args.vocab] for i in rng.zipf(1.2, n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "lexical.db")
+        index = LexicalIndex(path)
+        start = time.perf_counter()
+        for v in range(args.videos):
+            chunks = [
+                {"text": " ".join(words(60)), "start": c * 35.0, "end": c * 35.0 + 45}
+                for c in range(args.chunks_per_video)
+            ]
+            index.add_chunks(f"video{v}", chunks)
+        build_s = time.perf_counter() - start
+        size_mb = sum(os.path.getsize(os.path.join(tmp, name)) for name in os.listdir(tmp)) / 1e6
+
+        queries = itertools.cycle([" ".join(words(6)) for _ in range(args.repeats)])
+        all_p50, all_p95 = timed_ms(lambda: index.search(next(queries), top_k=args.top_k), args.repeats)
+        one_p50, one_p95 = timed_ms(
+            lambda: index.search(next(queries), top_k=args.top_k, video_id="video7"), args.repeats
+        )
+        chunks_total = index.count()
+        index.close()
+
+    print(f"chunks={chunks_total} ({args.videos} videos x {args.chunks_per_video}), "
+          f"built in {build_s:.1f}s, {size_mb:.0f} MB on disk")
+    print(f"all videos : p50 {all_p50:6.2f} ms  p95 {all_p95:6.2f} ms")
+    print(f"one video  : p50 {one_p50:6.2f} ms  p95 {one_p95:6.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare the throughput of the torch and ONNX Runtime CLIP backends.
+
+Run from the repo root:
+    python -m benchmarks.bench_onnx --frames 64 --texts 256
+    python -m benchmarks.bench_onnx --backends torch onnx-int8
+
+Also prints each backend's lowest cosine similarity with the torch
+embeddings; tests/test_onnx_clip.py is the parity check. Models are
+exported to CLIP_ONNX_DIR on first run.
+"""
+import argparse
+import tempfile
+import time
+
+from benchmarks.bench_clip import make_frames
+from utils.embeddings import get_clip_backend, get_clip_embeddings, get_text_embeddings
+
+BACKENDS = ["torch", "onnx", "onnx-int8"]
+
+SAMPLE_TEXTS = [
+    "a person writing equations on a whiteboard",
+    "a slide with a bar chart",
+    "two people talking in a studio",
+    "code in a terminal window",
+    "an aerial view of a city at night",
+    "a close-up of a circuit board",
+]
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=64)
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    args = parser.parse_args()
+
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" #{i}" for i in range(args.texts)]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_frames(args.frames, tmp)
+        for name in dict.fromkeys(["torch"] + args.backends):
+            backend = get_clip_backend(name)
+            # Warm up so session creation and first-call allocation aren't measured
+            get_clip_embeddings(paths[:2], batch_size=2, backend=backend)
+            get_text_embeddings(texts[:2], backend=backend)
+            images, image_s = timed(lambda: get_clip_embeddings(paths, batch_size=args.batch_size, backend=backend))
+            text, text_s = timed(lambda: get_text_embeddings(texts, backend=backend))
+            results[name] = (images, image_s, text, text_s)
+
+    reference_images, _, reference_text, _ = results["torch"]
+    print(f"frames={args.frames} texts={args.texts} batch_size={args.batch_size}")
+    print(f"{'backend':<10} {'frames/s':>9} {'texts/s':>9} {'min cos img':>12} {'min cos txt':>12}")
+    for name in args.backends:
+        images, image_s, text, text_s = results[name]
+        # Embeddings are L2-normalized, so the row-wise dot product is the cosine
+        image_cos = float((images * reference_images).sum(axis=1).min())
+        text_cos = float((text * reference_text).sum(axis=1).min())
+        print(f"{name:<10} {args.frames / image_s:9.1f} {args.texts / text_s:9.1f} "
+              f"{image_cos:12.4f} {text_cos:12.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Query latency vs corpus size for the Chroma and NumPy vector-store backends.
+
+Run from the repo root:
+    python -m benchmarks.bench_vectorstore --sizes 1000 10000 50000 --queries 200
+    python -m benchmarks.bench_vectorstore --backends numpy --batch 16
+
+Each size is loaded into a fresh store in a temp directory with random
+512-d vectors spread over --videos videos. Latency is measured for an
+unfiltered query and for one filtered to a single video's chunks, the
+filter the chat tab uses.
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from utils.vectorstore import VECTOR_BACKENDS, build_where
+
+def make_corpus(n, videos, dim=512, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    ids = [f"v{i % videos}:chunk:{i // videos}" for i in range(n)]
+    metadatas = [
+        {"video_id": f"v{i % videos}", "kind": "chunk", "start": float(i // videos * 35), "end": float(i // videos * 35 + 45)}
+        for i in range(n)
+    ]
+    return ids, vectors, metadatas
+
+def load(collection, ids, vectors, metadatas, batch=5000):
+    start = time.perf_counter()
+    for offset in range(0, len(ids), batch):
+        sl = slice(offset, offset + batch)
+        collection.upsert(
+            ids=ids[sl], embeddings=vectors[sl].tolist(), metadatas=metadatas[sl],
+            documents=[f"chunk {i}" for i in range(offset, offset + len(ids[sl]))],
+        )
+    return time.perf_counter() - start
+
+def latencies(collection, queries, top_k, batch, where):
+    times = []
+    for offset in range(0, len(queries), batch):
+        kwargs = {"where": where} if where else {}
+        start = time.perf_counter()
+        collection.query(
+            query_embeddings=queries[offset:offset + batch].tolist(), n_results=top_k,
+            include=["documents", "metadatas", "distances"], **kwargs
+        )
+        times.append((time.perf_counter() - start) * 1000)
+    return np.percentile(times, 50), np.percentile(times, 95)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--backends", nargs="+", default=list(VECTOR_BACKENDS), choices=list(VECTOR_BACKENDS))
+    parser.add_argument("--videos", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=1, help="queries per call")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    queries = np.random.default_rng(1).standard_normal((args.queries, 512)).astype(np.float32)
+    video_filter = build_where(video_id="v7")
+    print(f"{'backend':<8} {'rows':>7} {'load s':>8} {'p50 ms':>8} {'p95 ms':>8} {'filt p50':>9} {'filt p95':>9}")
+    for n in args.sizes:
+        ids, vectors, metadatas = make_corpus(n, args.videos)
+        for name in args.backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                _, collection = VECTOR_BACKENDS[name](tmp)
+                load_s = load(collection, ids, vectors, metadatas)
+                p50, p95 = latencies(collection, queries, args.top_k, args.batch, None)
+                f50, f95 = latencies(collection, queries, args.top_k, args.batch, video_filter)
+                if hasattr(collection, "close"):
+                    collection.close()
+            print(f"{name:<8} {n:>7} {load_s:8.2f} {p50:8.2f} {p95:8.2f} {f50:9.2f} {f95:9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Local stand-ins for the AssemblyAI and Groq HTTP APIs.
+
+    python -m benchmarks.mock_servers --port 8900 --transcript-latency 2 --llm-latency 0.5
+
+then point the app at it:
+
+    ASSEMBLYAI_BASE_URL=http://localhost:8900/v2
+    GROQ_API_URL=http://localhost:8900/openai/v1/chat/completions
+    GROQ_TRANSCRIBE_URL=http://localhost:8900/openai/v1/audio/transcriptions
+
+Endpoints:
+    POST /v2/upload                            -> {"upload_url"}
+    POST /v2/transcript                        -> {"id", "status": "queued"}
+    GET  /v2/transcript/<id>                   -> "processing" until the latency has passed, then "completed"
+    POST /openai/v1/chat/completions           -> canned reply, JSON or SSE ("stream": true)
+    POST /openai/v1/audio/transcriptions       -> verbose_json with word timestamps
+
+Transcripts have one word every `word_sec` seconds for `audio_sec` seconds.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = "the quick brown fox jumps over the lazy dog while the narrator explains each step".split()
+
+class MockAPI:
+    """
+    Threaded HTTP server implementing just enough of both APIs for the pipeline.
+
+    Args:
+        transcript_latency (float): Seconds from job creation until the poll returns "completed"
+        llm_latency (float): Seconds before the first chat token (time to first byte)
+        token_delay (float): Seconds between streamed tokens
+        audio_sec (float): Length of the transcript the mocks return
+    """
+
+    def __init__(self, port=0, transcript_latency=1.0, llm_latency=0.2, token_delay=0.005,
+                 audio_sec=60.0, word_sec=0.4):
+        self.transcript_latency = transcript_latency
+        self.llm_latency = llm_latency
+        self.token_delay = token_delay
+        self.audio_sec = audio_sec
+        self.word_sec = word_sec
+        self.jobs = {}
+        self.requests = {"upload": 0, "transcript": 0, "poll": 0, "chat": 0, "whisper": 0}
+        self.uploaded_bytes = 0
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.port = self.server.server_address[1]
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def env(self):
+        """
+        Environment variables pointing every client at this server.
+        """
+        return {
+            "ASSEMBLYAI_BASE_URL": f"{self.base_url}/v2",
+            "ASSEMBLYAI_API_KEY": "mock",
+            "GROQ_API_URL": f"{self.base_url}/openai/v1/chat/completions",
+            "GROQ_TRANSCRIBE_URL": f"{self.base_url}/openai/v1/audio/transcriptions",
+            "GROQ_API_KEY": "mock",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mock-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _count(self, name):
+        with self._lock:
+            self.requests[name] += 1
+
+    def transcript(self):
+        words = []
+        t = 0.0
+        i = 0
+        while t < self.audio_sec:
+            words.append({"text": WORDS[i % len(WORDS)], "start": int(t * 1000), "end": int((t + self.word_sec * 0.8) * 1000)})
+            t += self.word_sec
+            i += 1
+        return {"text": " ".join(w["text"] for w in words), "words": words}
+
+    def reply(self, max_tokens):
+        return [WORDS[i % len(WORDS)] + " " for i in range(max(1, min(max_tokens, 400) // 2))]
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return self.rfile.read(length) if length else b""
+
+            def _json(self, payload, status=200):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                body = self._body()
+                if self.path == "/v2/upload":
+                    api._count("upload")
+                    with api._lock:
+                        api.uploaded_bytes += len(body)
+                    self._json({"upload_url": f"{api.base_url}/files/{uuid.uuid4().hex}"})
+                elif self.path == "/v2/transcript":
+                    api._count("transcript")
+                    job_id = uuid.uuid4().hex
+                    with api._lock:
+                        api.jobs[job_id] = time.monotonic() + api.transcript_latency
+                    self._json({"id": job_id, "status": "queued"})
+                elif self.path == "/openai/v1/chat/completions":
+                    api._count("chat")
+                    self._chat(json.loads(body or b"{}"))
+                elif self.path == "/openai/v1/audio/transcriptions":
+                    api._count("whisper")
+                    time.sleep(api.transcript_latency)
+                    transcript = api.transcript()
+                    self._json({
+                        "text": transcript["text"],
+                        "words": [{"word": w["text"], "start": w["start"] / 1000, "end": w["end"] / 1000}
+                                  for w in transcript["words"]],
+                    })
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def do_GET(self):
+                if self.path.startswith("/v2/transcript/"):
+                    api._count("poll")
+                    ready_at = api.jobs.get(self.path.rsplit("/", 1)[-1])
+                    if ready_at is None:
+                        self._json({"error": "unknown transcript"}, 404)
+                    elif time.monotonic() < ready_at:
+                        self._json({"status": "processing"})
+                    else:
+                        self._json(dict(api.transcript(), status="completed"))
+                else:
+                    self._json({"error": "not found"}, 404)
+
+            def _chat(self, payload):
+                time.sleep(api.llm_latency)
+                tokens = api.reply(payload.get("max_tokens", 300))
+                prompt_tokens = sum(len(m.get("content", "")) for m in payload.get("messages", [])) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens)}
+                if not payload.get("stream"):
+                    self._json({
+                        "choices": [{"message": {"role": "assistant", "content": "".join(tokens)}}],
+                        "usage": usage,
+                    })
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for token in tokens:
+                    chunk = {"choices": [{"delta": {"content": token}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                    time.sleep(api.token_delay)
+                final = {"choices": [{"delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": usage}}
+                self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode())
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--transcript-latency", type=float, default=1.0)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--audio-sec", type=float, default=60.0)
+    args = parser.parse_args()
+
+    api = MockAPI(args.port, args.transcript_latency, args.llm_latency, audio_sec=args.audio_sec).start()
+    for key, value in api.env().items():
+        print(f"{key}={value}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        api.stop()
+
+if __name__ == "__main__":
+    main()
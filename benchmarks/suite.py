@@ -0,0 +1,309 @@
+"""
+Offline benchmark suite: every pipeline stage on a synthetic video, with
+local stand-ins for AssemblyAI and Groq, so no network is needed.
+
+Run from the repo root:
+    python -m benchmarks.suite                                  # run, compare with benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline                # run and store the result as the baseline
+    python -m benchmarks.suite --duration 300 --output out.json --tolerance 0.3
+
+Each benchmark records its wall time (and counts) in a JSON report. When a
+baseline exists, any benchmark slower than baseline * (1 + tolerance) plus
+--min-slack seconds, or one that fails but passed in the baseline, is a
+regression and the exit status is 1. Baselines are machine-specific:
+regenerate them on the machine that runs the comparison.
+
+The run happens in a temporary working directory, so data/ and the vector
+store of a real install are never touched. CLIP weights must already be in
+the Hugging Face cache (or use --skip-clip).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.mock_servers import MockAPI
+from benchmarks.synthetic import make_video
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+class Suite:
+    def __init__(self, args, video_path):
+        self.args = args
+        self.video_path = video_path
+        self.results = {}
+        self.state = {}
+
+    def run(self, name, fn, needs_clip=False):
+        if needs_clip and self.args.skip_clip:
+            self.results[name] = {"skipped": True}
+            print(f"⏭️ {name:<18} skipped")
+            return
+        try:
+            seconds, extra = timed(fn)
+            self.results[name] = dict(extra or {}, seconds=round(seconds, 4))
+            print(f"✅ {name:<18} {seconds:8.3f}s  {json.dumps(extra or {})}")
+        except Exception as e:
+            self.results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"❌ {name:<18} {type(e).__name__}: {e}")
+
+    # -- stages ------------------------------------------------------------
+
+    def extract_frames(self):
+        from utils.frames import extract_frames
+
+        saved = extract_frames(self.video_path, "bench-frames", interval_sec=self.args.interval)
+        return {"frames": len(saved)}
+
+    def sample_frames(self):
+        from utils.frames import sample_frames
+
+        self.state["frames"] = [frame for _, frame in sample_frames(
+            self.video_path, interval_sec=self.args.interval, min_side=224
+        )]
+        return {"frames": len(self.state["frames"])}
+
+    def extract_audio(self):
+        from utils.audio import extract_audio
+
+        self.state["audio_path"] = extract_audio(self.video_path, "data/processed")
+        return {"bytes": os.path.getsize(self.state["audio_path"])}
+
+    def transcribe(self):
+        from utils.transcribe import transcribe
+
+        result = transcribe(self.state["audio_path"], backend="assemblyai")
+        if not result:
+            raise RuntimeError("mock transcription returned nothing")
+        self.state["transcript"] = result
+        return {"words": len(result["words"])}
+
+    def clip_load(self):
+        from utils.embeddings import get_clip_backend
+
+        get_clip_backend()
+        return {}
+
+    def clip_images(self):
+        from utils.embeddings import get_clip_embeddings
+
+        self.state["frame_embeddings"] = get_clip_embeddings(self.state["frames"])
+        return {"frames": len(self.state["frames"])}
+
+    def clip_text(self):
+        from utils.chunking import chunk_transcript
+        from utils.embeddings import get_text_embeddings
+
+        self.state["chunks"] = chunk_transcript(self.state["transcript"])
+        self.state["chunk_embeddings"] = get_text_embeddings([c["text"] for c in self.state["chunks"]])
+        return {"chunks": len(self.state["chunks"])}
+
+    def fusion(self, repeats=100):
+        from utils.fusion import fuse_embeddings
+
+        text_embedding = self.state["chunk_embeddings"].mean(axis=0)
+        for _ in range(repeats):
+            self.state["fused"] = fuse_embeddings(text_embedding, self.state["frame_embeddings"])
+        return {"calls": repeats}
+
+    def storage(self, repeats=20):
+        from utils.storage import (
+            FRAME_EMBEDDINGS_FILE, FRAME_TIMESTAMPS_FILE, VIDEO_EMBEDDING_FILE, load_video_artifacts,
+            save_video_metadata,
+        )
+
+        video_dir = os.path.join("data", "videos", "bench-storage")
+        os.makedirs(video_dir, exist_ok=True)
+        frames = self.state["frame_embeddings"]
+        for _ in range(repeats):
+            np.save(os.path.join(video_dir, VIDEO_EMBEDDING_FILE), self.state["fused"])
+            np.save(os.path.join(video_dir, FRAME_EMBEDDINGS_FILE), frames)
+            np.save(os.path.join(video_dir, FRAME_TIMESTAMPS_FILE),
+                    np.arange(len(frames), dtype=np.float32) * self.args.interval)
+            save_video_metadata("bench-storage", {"url": "bench", "text": self.state["transcript"]["text"]})
+            artifacts = load_video_artifacts("bench-storage")
+            float(np.asarray(artifacts["frame_embeddings"]).sum())
+        return {"calls": repeats}
+
+    def vector_add(self):
+        from utils.vectorstore import add_chunks_to_collection, get_or_create_collection
+
+        _, collection = get_or_create_collection(path=os.path.abspath("data/bench_vectors"),
+                                                 backend=self.args.vector_backend)
+        rng = np.random.default_rng(0)
+        chunks = [{"text": f"chunk {i}", "start": i * 35.0, "end": i * 35.0 + 45} for i in range(200)]
+        for v in range(self.args.vector_videos):
+            embeddings = rng.standard_normal((len(chunks), 512)).astype(np.float32)
+            add_chunks_to_collection(collection, f"video{v}", chunks, embeddings, {"url": "bench"})
+        self.state["collection"] = collection
+        return {"vectors": len(chunks) * self.args.vector_videos}
+
+    def vector_query(self, repeats=100):
+        from utils.vectorstore import search
+
+        queries = np.random.default_rng(1).standard_normal((repeats, 512)).astype(np.float32)
+        for i, query in enumerate(queries):
+            search(self.state["collection"], query, top_k=5, video_id=f"video{i % self.args.vector_videos}")
+        return {"queries": repeats}
+
+    def llm_summary(self):
+        from utils.generation import generate_summary_groq
+
+        summary = generate_summary_groq(self.state["transcript"]["text"])
+        if summary.startswith("Failed to generate"):
+            raise RuntimeError(summary)
+        return {"chars": len(summary)}
+
+    def llm_stream(self):
+        from utils.generation import generate_summary_groq
+
+        first = None
+        start = time.perf_counter()
+        parts = 0
+        for _ in generate_summary_groq(self.state["transcript"]["text"], stream=True):
+            if first is None:
+                first = time.perf_counter() - start
+            parts += 1
+        return {"first_token_s": round(first or 0.0, 4), "chunks": parts}
+
+    def ingest(self):
+        from utils.cache import StageCache
+        from utils.pipeline import STAGE_VERSIONS, run_ingest
+
+        # Seed the info and download stages so run_ingest never contacts YouTube
+        video_id = "benchIngest1"
+        cache = StageCache(video_id)
+        local_copy = cache.path("source.mp4")
+        os.makedirs(cache.video_dir, exist_ok=True)
+        shutil.copy(self.video_path, local_copy)
+        cache.put("download", {"video_id": video_id}, STAGE_VERSIONS["download"],
+                  {"video_path": local_copy}, files=[local_copy])
+        cache.put("info", {"video_id": video_id}, STAGE_VERSIONS["info"],
+                  {"id": video_id, "title": "Synthetic benchmark video", "channel": "", "duration": self.args.duration,
+                   "upload_date": None})
+
+        result = run_ingest(f"https://www.youtube.com/watch?v={video_id}", interval_sec=self.args.interval)
+        return {"stage_seconds": {k: round(v, 4) for k, v in result["timings"].items()}}
+
+def compare(results, baseline, tolerance, min_slack):
+    """
+    Returns:
+        list: (name, message) for every regression
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is None or current.get("skipped") or base.get("skipped"):
+            continue
+        if "error" in current and "error" not in base:
+            regressions.append((name, f"now fails: {current['error']}"))
+            continue
+        if "seconds" not in current or "seconds" not in base:
+            continue
+        limit = base["seconds"] * (1 + tolerance) + min_slack
+        if current["seconds"] > limit:
+            regressions.append((name, f"{current['seconds']:.3f}s vs baseline {base['seconds']:.3f}s (limit {limit:.3f}s)"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=60, help="Synthetic video length (s)")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--interval", type=float, default=5, help="Seconds between sampled frames")
+    parser.add_argument("--transcript-latency", type=float, default=2.0, help="Mock AssemblyAI processing time (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Mock Groq time to first token (s)")
+    parser.add_argument("--vector-backend", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("--vector-videos", type=int, default=50, help="Videos x 200 chunks for vector add/query")
+    parser.add_argument("--skip-clip", action="store_true", help="Skip benchmarks that need the CLIP weights")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown as a fraction of the baseline")
+    parser.add_argument("--min-slack", type=float, default=0.05, help="Allowed slowdown in seconds, on top of --tolerance")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline_path = os.path.abspath(args.baseline)
+
+    api = MockAPI(transcript_latency=args.transcript_latency, llm_latency=args.llm_latency,
+                  audio_sec=args.duration).start()
+    # Must be set before utils.* is imported: the API URLs are read at import time
+    os.environ.update(api.env())
+    os.environ["TRANSCRIBE_BACKEND"] = "assemblyai"
+    os.environ["VECTOR_BACKEND"] = args.vector_backend
+
+    workdir = tempfile.mkdtemp(prefix="yt-bench-")
+    cwd = os.getcwd()
+    sys.path.insert(0, cwd)
+    try:
+        os.chdir(workdir)
+        video_path = os.path.join(workdir, "synthetic.mp4")
+        print(f"🎬 Generating a {args.duration:.0f}s synthetic video at {args.fps} fps")
+        make_video(video_path, duration=args.duration, fps=args.fps)
+
+        suite = Suite(args, video_path)
+        suite.run("extract_frames", suite.extract_frames)
+        suite.run("sample_frames", suite.sample_frames)
+        suite.run("extract_audio", suite.extract_audio)
+        suite.run("transcribe", suite.transcribe)
+        suite.run("clip_load", suite.clip_load, needs_clip=True)
+        suite.run("clip_images", suite.clip_images, needs_clip=True)
+        suite.run("clip_text", suite.clip_text, needs_clip=True)
+        suite.run("fusion", suite.fusion, needs_clip=True)
+        suite.run("storage", suite.storage, needs_clip=True)
+        suite.run("vector_add", suite.vector_add)
+        suite.run("vector_query", suite.vector_query)
+        suite.run("llm_summary", suite.llm_summary)
+        suite.run("llm_stream", suite.llm_stream)
+        suite.run("ingest_e2e", suite.ingest, needs_clip=True)
+    finally:
+        os.chdir(cwd)
+        api.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "update_baseline")},
+            "mock_requests": api.requests,
+        },
+        "results": suite.results,
+    }
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {output}")
+
+    if args.update_baseline:
+        shutil.copy(output, baseline_path)
+        print(f"📌 Baseline updated: {baseline_path}")
+        return
+    if not os.path.exists(baseline_path):
+        print("ℹ️ No baseline yet; run with --update-baseline to create one.")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = compare(suite.results, baseline, args.tolerance, args.min_slack)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against {baseline_path}:")
+        for name, message in regressions:
+            print(f"  {name}: {message}")
+        sys.exit(1)
+    print(f"✅ No regressions against {baseline_path}")
+
+if __name__ == "__main__":
+    main()
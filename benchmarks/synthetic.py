@@ -0,0 +1,69 @@
+"""
+Synthetic test videos for the offline benchmarks.
+
+    python -m benchmarks.synthetic out.mp4 --duration 120 --fps 30
+
+The picture cuts to a new scene every --scene-sec seconds (a solid colour
+with a moving box), so the near-duplicate frame filter has something to
+keep and something to drop. The audio is a tone that goes silent for 0.6s
+every 4s, so silence-based splitting has cut points.
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+
+def make_video(path, duration=60, fps=30, size=(640, 360), scene_sec=10, seed=0):
+    """
+    Write an mp4 (MPEG-4 Part 2 video, AAC audio) of `duration` seconds.
+
+    Returns:
+        str: `path`
+    """
+    import cv2
+
+    rng = np.random.default_rng(seed)
+    width, height = size
+    with tempfile.TemporaryDirectory() as tmp:
+        silent_path = os.path.join(tmp, "video.mp4")
+        writer = cv2.VideoWriter(silent_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError("cv2.VideoWriter could not open an mp4v writer")
+        colour = None
+        for i in range(int(duration * fps)):
+            t = i / fps
+            if colour is None or i % int(scene_sec * fps) == 0:
+                colour = rng.integers(0, 255, size=3).tolist()
+            frame = np.empty((height, width, 3), dtype=np.uint8)
+            frame[:] = colour
+            x = int((t * 80) % max(1, width - 60))
+            frame[height // 2 - 30:height // 2 + 30, x:x + 60] = 255 - np.asarray(colour, dtype=np.uint8)
+            writer.write(frame)
+        writer.release()
+
+        tone = f"aevalsrc='0.3*sin(440*2*PI*t)*gt(mod(t,4),0.6)':s=44100:d={duration}"
+        command = [
+            "ffmpeg", "-v", "error", "-i", silent_path, "-f", "lavfi", "-i", tone,
+            "-c:v", "copy", "-c:a", "aac", "-b:a", "128k", "-shortest", path, "-y",
+        ]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed muxing audio: {result.stderr.strip()[-500:]}")
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--scene-sec", type=float, default=10)
+    args = parser.parse_args()
+    make_video(args.path, args.duration, args.fps, (args.width, args.height), args.scene_sec)
+    print(f"🎬 Wrote {args.path} ({os.path.getsize(args.path) / 1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+class ScriptedServer:
+    """
+    Local HTTP server answering requests, in order, with queued responses.
+    Unscripted requests get a 500.
+    """
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []  # (method, path, body)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, name="scripted-server", daemon=True).start()
+
+    def add(self, status=200, body=b"", headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self.responses.append((status, body, headers or {}))
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        scripted = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _respond(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with scripted._lock:
+                    scripted.requests.append((self.command, self.path, body))
+                    status, payload, headers = scripted.responses.pop(0) if scripted.responses else (500, b"", {})
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                if "Content-Length" not in headers:
+                    self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = do_POST = _respond
+
+        return Handler
+
+@pytest.fixture
+def http_server():
+    server = ScriptedServer()
+    yield server
+    server.close()
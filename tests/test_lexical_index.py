@@ -0,0 +1,58 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.lexical_index import LexicalIndex
+
+@pytest.fixture
+def index(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    yield index
+    index.close()
+
+def _chunks(*texts):
+    return [{"text": text, "start": i * 30.0, "end": i * 30.0 + 45} for i, text in enumerate(texts)]
+
+@pytest.mark.parametrize("query", ["cafe", "café", "CAFÉ", "cafe\u0301"])
+def test_accents_are_folded_like_fts5(index, query):
+    index.add_chunks("v1", _chunks("we met at the café near the station", "the train was late"))
+    index.add_chunks("v2", _chunks("nothing to see here"))
+
+    for video_id in (None, "v1"):
+        hits = index.search(query, video_id=video_id)
+        assert [hit["id"] for hit in hits] == ["v1:chunk:0"]
+        assert hits[0]["score"] > 0
+
+def test_unaccented_text_matches_an_accented_query(index):
+    index.add_chunks("v1", _chunks("a naive approach to resume parsing"))
+
+    assert [hit["id"] for hit in index.search("naïve résumé")] == ["v1:chunk:0"]
+
+def test_terms_are_rebuilt_for_an_older_index(tmp_path):
+    path = str(tmp_path / "lexical.db")
+    index = LexicalIndex(path)
+    index.add_chunks("v1", _chunks("Crème brûlée recipe"))
+    index.close()
+
+    # An index written before accent folding has unfolded terms and user_version 0
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE terms SET term = 'crème' WHERE term = 'creme'")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+
+    index = LexicalIndex(path)
+    assert [hit["id"] for hit in index.search("creme")] == ["v1:chunk:0"]
+    assert index.count() == 1
+    index.close()
+
+def test_searches_do_not_wait_for_the_write_lock(index):
+    index.add_chunks("v1", _chunks("parallel keyword search", "unrelated words"))
+
+    # A long write holds the lock; searches read their own WAL snapshot meanwhile
+    with ThreadPoolExecutor(max_workers=4) as pool, index._lock:
+        futures = [pool.submit(index.search, "keyword", 5, "v1" if i % 2 else None) for i in range(8)]
+        results = [future.result(timeout=5) for future in futures]
+    assert all([hit["id"] for hit in hits] == ["v1:chunk:0"] for hits in results)
+    assert index._idle_readers.qsize() <= 4
@@ -0,0 +1,70 @@
+import pytest
+
+from utils import llm
+from utils.llm import GroqClient, LLMError
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(llm.time, "sleep", delays.append)
+    return delays
+
+def _client(http_server, **kwargs):
+    return GroqClient(api_key="test", api_url=f"{http_server.url}/chat", **kwargs)
+
+def _reply(text):
+    return {"choices": [{"message": {"role": "assistant", "content": text}}], "usage": {}}
+
+def test_429_waits_for_retry_after(http_server, sleeps):
+    http_server.add(429, {"error": "rate limited"}, {"Retry-After": "7"})
+    http_server.add(200, _reply(" hello "))
+
+    assert _client(http_server).chat([{"role": "user", "content": "hi"}]) == "hello"
+    assert sleeps == [7.0]
+    assert len(http_server.requests) == 2
+
+def test_5xx_raises_once_retries_run_out(http_server, sleeps):
+    for _ in range(3):
+        http_server.add(503, b"overloaded")
+
+    with pytest.raises(LLMError) as e:
+        _client(http_server, max_retries=2).chat([{"role": "user", "content": "hi"}])
+    assert e.value.status_code == 503
+    assert e.value.body == "overloaded"
+    assert len(http_server.requests) == 3
+    assert len(sleeps) == 2
+
+def test_stream_chat_reassembles_sse_deltas(http_server):
+    events = [
+        ": keep-alive",
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+        'data: {"choices": [{"delta": {"content": "Hel"}}]}',
+        'data: {"choices": [{"delta": {"content": "lo"}}]}',
+        'data: {"choices": [{"delta": {}, "finish_reason": "stop"}], "x_groq": {"usage": {"completion_tokens": 2}}}',
+        "data: [DONE]",
+        'data: {"choices": [{"delta": {"content": "after done"}}]}',
+    ]
+    http_server.add(200, "\n\n".join(events).encode() + b"\n\n", {"Content-Type": "text/event-stream"})
+
+    client = _client(http_server, max_concurrency=1)
+    assert list(client.stream_chat([{"role": "user", "content": "hi"}])) == ["Hel", "lo"]
+    # The concurrency slot is given back once the stream ends
+    assert client._semaphore.acquire(blocking=False)
+
+@pytest.mark.parametrize("body, headers, expected", [
+    # Connection dropped mid-stream; iter_lines still buffers the only full line
+    (b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n', {"Content-Length": "4096"}, []),
+    (b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\ndata: {"choi\n\n', {}, ["Hel"]),
+    (b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\ndata: {"error": {"message": "overloaded"}}\n\n', {},
+     ["Hel"]),
+])
+def test_stream_chat_failures_raise_llm_error(http_server, body, headers, expected):
+    http_server.add(200, body, dict(headers, **{"Content-Type": "text/event-stream"}))
+
+    client = _client(http_server, max_concurrency=1)
+    received = []
+    with pytest.raises(LLMError):
+        for delta in client.stream_chat([{"role": "user", "content": "hi"}]):
+            received.append(delta)
+    assert received == expected
+    assert client._semaphore.acquire(blocking=False)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+
+from utils.embeddings import get_clip_backend, get_clip_embeddings, get_text_embeddings
+
+MIN_COSINE = 0.99
+
+TEXTS = [
+    "a person writing equations on a whiteboard",
+    "a slide with a bar chart",
+    "code in a terminal window",
+    "an aerial view of a city at night",
+]
+
+@pytest.fixture(scope="module")
+def frames():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, size=(360, 640, 3), dtype=np.uint8) for _ in range(8)]
+
+@pytest.fixture(scope="module")
+def reference(frames):
+    backend = get_clip_backend("torch")
+    return get_clip_embeddings(frames, backend=backend), get_text_embeddings(TEXTS, backend=backend)
+
+@pytest.mark.parametrize("name", ["onnx", "onnx-int8"])
+def test_onnx_matches_torch(name, frames, reference):
+    backend = get_clip_backend(name)
+    reference_images, reference_text = reference
+
+    images = get_clip_embeddings(frames, backend=backend)
+    text = get_text_embeddings(TEXTS, backend=backend)
+
+    # Embeddings are L2-normalized, so the row-wise dot product is the cosine
+    assert (images * reference_images).sum(axis=1).min() >= MIN_COSINE
+    assert (text * reference_text).sum(axis=1).min() >= MIN_COSINE
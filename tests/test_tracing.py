@@ -0,0 +1,51 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import tracing
+from utils.tracing import bind_span, span, traced_submit
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+def test_pool_work_nests_under_the_submitting_span(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(tracing, "_tracer", tracing.Tracer(str(path)))
+
+    def work(name):
+        with span(name):
+            return tracing.current_span().name
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with span("ingest") as root:
+            assert traced_submit(pool, work, "submitted").result() == "submitted"
+            assert list(pool.map(bind_span(work), ["mapped"])) == ["mapped"]
+        # The worker's stack is left empty once the task is done
+        assert pool.submit(tracing.current_span).result() is tracing._NOOP
+    tracing._tracer._file.close()
+
+    records = _records(path)
+    for name in ("submitted", "mapped"):
+        assert records[name]["trace_id"] == root.trace_id
+        assert records[name]["parent_id"] == root.span_id
+
+def test_workers_cannot_set_attributes_on_the_parent(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(tracing, "_tracer", tracing.Tracer(str(path)))
+
+    def work(i):
+        tracing.current_span().set(items=i)
+        with span("child") as child:
+            tracing.current_span().set(items=i)
+        return child.parent_id
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        with span("map", items=1) as root:
+            parent_ids = list(pool.map(bind_span(work), range(8)))
+    tracing._tracer._file.close()
+
+    assert parent_ids == [root.span_id] * 8
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["items"] for r in records if r["name"] == "map"] == [1]
+    assert sorted(r["items"] for r in records if r["name"] == "child") == list(range(8))
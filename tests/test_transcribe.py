@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+import requests
+
+from utils import transcribe
+from utils.transcribe import (
+    AssemblyAIBackend, TranscriptionCancelled, TranscriptionTimeout, merge_segments, poll_with_backoff,
+)
+
+class FakeTime:
+    """
+    Stand-in for the time module: sleep() advances monotonic() instantly.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(transcribe, "time", fake)
+    return fake
+
+def test_poll_interval_grows_up_to_the_cap(clock):
+    results = iter([(False, None)] * 4 + [(True, "done")])
+
+    assert poll_with_backoff(lambda: next(results), initial=1.0, factor=2.0, max_interval=3.0) == "done"
+    assert clock.sleeps == [1.0, 2.0, 3.0, 3.0]
+
+def test_poll_times_out(clock):
+    calls = []
+
+    def check():
+        calls.append(clock.now)
+        return False, None
+
+    with pytest.raises(TranscriptionTimeout):
+        poll_with_backoff(check, initial=1.0, factor=1.5, timeout=5)
+    # The last sleep is cut short so the final check lands on the deadline
+    assert clock.sleeps == [1.0, 1.5, 2.25, 0.25]
+    assert calls[-1] == 5.0
+
+def test_poll_stops_when_cancelled():
+    cancel = threading.Event()
+    calls = []
+
+    def check():
+        calls.append(1)
+        cancel.set()
+        return False, None
+
+    # The wait returns as soon as the event is set instead of sleeping the interval out
+    with pytest.raises(TranscriptionCancelled):
+        poll_with_backoff(check, initial=60.0, cancel=cancel)
+    assert len(calls) == 1
+
+def _assemblyai(http_server, tmp_path):
+    audio = tmp_path / "audio.opus"
+    audio.write_bytes(b"fake audio")
+    http_server.add(200, {"upload_url": f"{http_server.url}/files/audio"})
+    http_server.add(200, {"id": "t1", "status": "queued"})
+    return AssemblyAIBackend(api_key="test", base_url=f"{http_server.url}/v2"), str(audio)
+
+def test_assemblyai_polls_through_processing_and_5xx(http_server, tmp_path, clock):
+    backend, audio = _assemblyai(http_server, tmp_path)
+    http_server.add(200, {"status": "processing"})
+    http_server.add(503, b"unavailable")
+    http_server.add(200, {
+        "status": "completed",
+        "text": "hello world",
+        "words": [{"text": "hello", "start": 0, "end": 400, "confidence": 0.9},
+                  {"text": "world", "start": 500, "end": 900, "confidence": 0.9}],
+    })
+
+    result = backend.transcribe(audio)
+
+    assert result == {
+        "text": "hello world",
+        "words": [{"text": "hello", "start": 0, "end": 400}, {"text": "world", "start": 500, "end": 900}],
+    }
+    assert [(method, path) for method, path, _ in http_server.requests] == [
+        ("POST", "/v2/upload"), ("POST", "/v2/transcript"),
+        ("GET", "/v2/transcript/t1"), ("GET", "/v2/transcript/t1"), ("GET", "/v2/transcript/t1"),
+    ]
+    assert http_server.requests[0][2] == b"fake audio"
+    assert clock.sleeps == [1.0, 1.5]
+
+def test_assemblyai_error_status_returns_none(http_server, tmp_path, clock):
+    backend, audio = _assemblyai(http_server, tmp_path)
+    http_server.add(200, {"status": "error", "error": "unsupported audio"})
+
+    assert backend.transcribe(audio) is None
+    assert len(http_server.requests) == 3
+
+def test_assemblyai_keeps_polling_after_connection_errors(http_server, tmp_path, clock, monkeypatch):
+    backend, audio = _assemblyai(http_server, tmp_path)
+    http_server.add(200, {"status": "completed", "text": "hi", "words": []})
+    errors = iter([requests.ConnectionError("reset"), requests.Timeout("read timed out")])
+    get = backend.session.get
+
+    def flaky_get(*args, **kwargs):
+        error = next(errors, None)
+        if error:
+            raise error
+        return get(*args, **kwargs)
+
+    monkeypatch.setattr(backend.session, "get", flaky_get)
+
+    assert backend.transcribe(audio) == {"text": "hi", "words": []}
+    assert clock.sleeps == [1.0, 1.5]
+
+def test_merge_segments_shifts_and_orders_words():
+    results = [
+        (600.0, {"text": " second ", "words": [{"text": "second", "start": 100, "end": 500}]}),
+        (0.0, {"text": "first", "words": [{"text": "first", "start": 0, "end": 300}]}),
+        (1200.5, {"text": "", "words": []}),
+        (1200.0, {"text": "third", "words": [{"text": "third", "start": 250, "end": 750}]}),
+    ]
+
+    merged = merge_segments(results)
+
+    assert merged["text"] == "first second third"
+    assert merged["words"] == [
+        {"text": "first", "start": 0, "end": 300},
+        {"text": "second", "start": 600100, "end": 600500},
+        {"text": "third", "start": 1200250, "end": 1200750},
+    ]
@@ -0,0 +1,46 @@
+import numpy as np
+
+from utils.vector_index import NumpyIndex
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+def test_torn_line_is_truncated_before_appending(tmp_path):
+    index = NumpyIndex(str(tmp_path), dim=8)
+    index.upsert(["a", "b"], _vectors(2), metadatas=[{"video_id": "v"}] * 2, documents=["a", "b"])
+    index.close()
+
+    # A crash in the middle of a log write leaves a fragment with no newline
+    with open(tmp_path / "rows.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"id": "torn", "docu')
+
+    index = NumpyIndex(str(tmp_path), dim=8)
+    assert index.count() == 2
+    index.upsert(["c"], _vectors(1, seed=1), metadatas=[{"video_id": "v"}], documents=["c"])
+    index.close()
+
+    reloaded = NumpyIndex(str(tmp_path), dim=8)
+    assert sorted(reloaded.get()["ids"]) == ["a", "b", "c"]
+    assert reloaded.get(ids=["c"])["documents"] == ["c"]
+    reloaded.close()
+
+def test_compact_keeps_live_rows_and_queries(tmp_path):
+    index = NumpyIndex(str(tmp_path), dim=8)
+    vectors = _vectors(20)
+    ids = [f"id{i}" for i in range(20)]
+    index.upsert(ids, vectors, metadatas=[{"video_id": f"v{i % 2}"} for i in range(20)], documents=ids)
+    index.delete(ids=ids[:10])
+    index.upsert(["id15"], vectors[:1], metadatas=[{"video_id": "v1"}], documents=["new"])
+
+    index.compact()
+
+    assert index.count() == 10
+    assert index.get(ids=["id15"])["documents"] == ["new"]
+    result = index.query(vectors[12], n_results=1)
+    assert result["ids"] == [["id12"]]
+    index.close()
+
+    reloaded = NumpyIndex(str(tmp_path), dim=8)
+    assert sorted(reloaded.get()["ids"]) == sorted(ids[10:])
+    assert reloaded.query(vectors[0], n_results=1, where={"video_id": "v1"})["ids"] == [["id15"]]
+    reloaded.close()
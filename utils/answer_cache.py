@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from utils.tracing import current_span, traced
+
+# Cosine similarity between CLIP text embeddings above which two questions count as the same
+ANSWER_CACHE_MIN_COSINE = float(os.getenv("ANSWER_CACHE_MIN_COSINE", "0.95"))
+ANSWER_CACHE_TTL_SEC = int(os.getenv("ANSWER_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "20000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id          INTEGER PRIMARY KEY,
+    scope       TEXT NOT NULL,
+    context     TEXT NOT NULL,
+    question    TEXT NOT NULL,
+    embedding   BLOB NOT NULL,
+    answer      TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_scope ON answers (scope, context);
+CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access);
+"""
+
+def context_key(hits, model):
+    """
+    Hash of the retrieved chunks (ids and text) and the model, so an answer
+    is only reused when it would be generated from the same prompt context.
+    Re-ingesting a video changes the chunk text and so the key.
+    """
+    payload = json.dumps([model, [[hit["id"], hit["text"]] for hit in hits]])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _scope(video_id):
+    if video_id is None:
+        return "*"
+    if isinstance(video_id, str):
+        return video_id
+    return ",".join(sorted(video_id))
+
+class AnswerCache:
+    """
+    On-disk cache of chat answers, looked up by question similarity.
+
+    A lookup returns a stored answer when an earlier question about the same
+    video(s) had the same retrieved context and an embedding within
+    `min_cosine` of the new one. Entries expire after `ttl_sec`; beyond
+    `max_entries` the least recently used are dropped. Hit/miss counters are
+    kept per process.
+    """
+
+    def __init__(self, path="data/answer_cache.db", min_cosine=ANSWER_CACHE_MIN_COSINE,
+                 ttl_sec=ANSWER_CACHE_TTL_SEC, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.min_cosine = min_cosine
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+    @traced("chat.answer_cache")
+    def get(self, video_id, context, embedding):
+        """
+        Returns:
+            str or None: The stored answer of the most similar matching question
+        """
+        now = time.time()
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding = embedding / (np.linalg.norm(embedding) + 1e-12)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, embedding, answer FROM answers WHERE scope = ? AND context = ? AND created_at > ?",
+                (_scope(video_id), context, now - self.ttl_sec),
+            ).fetchall()
+            best, best_score = None, self.min_cosine
+            for row_id, blob, answer in rows:
+                score = float(np.frombuffer(blob, dtype=np.float32) @ embedding)
+                if score >= best_score:
+                    best, best_score = (row_id, answer), score
+            if best is None:
+                self.misses += 1
+                current_span().set(misses=1)
+                return None
+            self.hits += 1
+            current_span().set(hits=1, similarity=round(best_score, 4))
+            self._conn.execute("UPDATE answers SET last_access = ? WHERE id = ?", (now, best[0]))
+            return best[1]
+
+    def put(self, video_id, context, question, embedding, answer):
+        now = time.time()
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding = embedding / (np.linalg.norm(embedding) + 1e-12)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO answers (scope, context, question, embedding, answer, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (_scope(video_id), context, question, embedding.tobytes(), answer, now, now),
+            )
+            self._count += 1
+            self._evict(now)
+
+    def _evict(self, now):
+        if self._count <= self.max_entries:
+            return
+        # Expired entries first, then the least recently used; down to 90% so this runs rarely
+        self._conn.execute("DELETE FROM answers WHERE created_at <= ?", (now - self.ttl_sec,))
+        self._count = self._conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+        excess = self._count - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM answers WHERE id IN (SELECT id FROM answers ORDER BY last_access LIMIT ?)", (excess,)
+            )
+            self._count -= excess
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._count,
+        }
+
+    def close(self):
+        self._conn.close()
@@ -1,14 +1,104 @@
+import json
 import os
 import subprocess
 
-def extract_audio(video_path, output_dir="data/processed"):
-    os.makedirs(output_dir, exist_ok=True)
-    audio_path = os.path.join(output_dir, os.path.basename(video_path).rsplit('.', 1)[0] + ".mp3")
+from utils.tracing import current_span, traced
+
+# Codecs the transcription APIs accept directly, with the container to copy them into
+COPY_CONTAINERS = {"opus": ".opus", "aac": ".m4a", "flac": ".flac", "mp3": ".mp3", "vorbis": ".ogg"}
+# Above this bitrate a speech re-encode is worth the CPU for the upload it saves
+COPY_MAX_BITRATE = 96_000
+
+SPEECH_FORMATS = {
+    "opus": (".opus", ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"]),
+    "flac": (".flac", ["-c:a", "flac", "-sample_fmt", "s16"]),
+}
+
+def probe_audio(path):
+    """
+    Return codec, bit_rate, sample_rate, channels and duration of the first audio stream.
+    """
     command = [
-        "ffmpeg", "-i", video_path,
-        "-q:a", "0", "-map", "a", audio_path,
-        "-y"
+        "ffprobe", "-v", "error", "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,bit_rate,sample_rate,channels:format=duration,bit_rate",
+        "-of", "json", path
     ]
-    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    print(f"🎧 Audio saved to {audio_path}")
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed for {path}: {result.stderr.strip()[-500:]}")
+    info = json.loads(result.stdout or "{}")
+    streams = info.get("streams") or []
+    if not streams:
+        raise RuntimeError(f"No audio stream in {path}")
+    stream = streams[0]
+    fmt = info.get("format", {})
+    return {
+        "codec": stream.get("codec_name"),
+        "bit_rate": int(stream.get("bit_rate") or 0) or None,
+        "sample_rate": int(stream.get("sample_rate") or 0) or None,
+        "channels": int(stream.get("channels") or 0) or None,
+        "duration": float(fmt.get("duration") or 0) or None,
+    }
+
+def _run_ffmpeg(command):
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+
+@traced("extract_audio")
+def extract_audio(video_path, output_dir="data/processed", mode="speech", speech_format="opus",
+                  trim_silence=False, allow_copy=True):
+    """
+    Extract the audio track for transcription.
+
+    Args:
+        video_path (str): Video (or audio-only) file
+        output_dir (str): Where to write the audio file
+        mode (str): "speech" writes 16 kHz mono Opus/FLAC (or stream-copies an
+            already compact track); "archive" keeps the old max-quality VBR MP3
+        speech_format (str): "opus" (smallest) or "flac" (lossless)
+        trim_silence (bool): Remove stretches of silence longer than a second.
+            Off by default because word timestamps then drift from video time.
+        allow_copy (bool): Stream-copy when the source codec is already acceptable
+
+    Returns:
+        str: Path of the extracted audio
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, os.path.basename(video_path).rsplit('.', 1)[0])
+
+    if mode == "archive":
+        audio_path = base + ".mp3"
+        _run_ffmpeg(["ffmpeg", "-i", video_path, "-q:a", "0", "-map", "a", audio_path, "-y"])
+        print(f"🎧 Audio saved to {audio_path}")
+        return audio_path
+
+    source = probe_audio(video_path)
+    copy_ext = COPY_CONTAINERS.get(source["codec"])
+    can_copy = (
+        allow_copy and not trim_silence and copy_ext
+        and (source["bit_rate"] is None or source["bit_rate"] <= COPY_MAX_BITRATE)
+    )
+
+    if can_copy:
+        audio_path = base + copy_ext
+        command = ["ffmpeg", "-i", video_path, "-vn", "-map", "a:0", "-c:a", "copy", audio_path, "-y"]
+    else:
+        ext, codec_args = SPEECH_FORMATS[speech_format]
+        audio_path = base + ext
+        command = ["ffmpeg", "-i", video_path, "-vn", "-map", "a:0", "-ac", "1", "-ar", "16000"]
+        if trim_silence:
+            command += ["-af", "silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-45dB"]
+        command += codec_args + [audio_path, "-y"]
+    _run_ffmpeg(command)
+
+    out_bytes = os.path.getsize(audio_path)
+    current_span().set(bytes=out_bytes, copied=bool(can_copy))
+    if source["bit_rate"] and source["duration"]:
+        src_bytes = int(source["bit_rate"] * source["duration"] / 8)
+        saved = max(0, src_bytes - out_bytes)
+        print(f"🎧 Audio saved to {audio_path} ({'copied' if can_copy else 'speech re-encode'}, "
+              f"{out_bytes / 1e6:.1f} MB vs {src_bytes / 1e6:.1f} MB source track, {saved / 1e6:.1f} MB saved)")
+    else:
+        print(f"🎧 Audio saved to {audio_path} ({out_bytes / 1e6:.1f} MB)")
     return audio_path
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+
+VIDEOS_DIR = "data/videos"
+
+_YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+_file_digests = {}
+
+def canonical_video_id(url):
+    """
+    Map any YouTube URL form to its 11-character video id.
+
+    youtu.be/X, watch?v=X&t=30, /shorts/X, /embed/X and /live/X all give X.
+    Anything that isn't recognisably YouTube falls back to an md5 of the URL.
+    """
+    url = url.strip()
+    if _YOUTUBE_ID.match(url):
+        return url
+
+    parsed = urlparse(url if "://" in url else "https://" + url)
+    host = (parsed.hostname or "").lower()
+    if host.startswith("www.") or host.startswith("m.") or host.startswith("music."):
+        host = host.split(".", 1)[1]
+
+    candidate = None
+    if host == "youtu.be":
+        candidate = parsed.path.lstrip("/").split("/")[0]
+    elif host in ("youtube.com", "youtube-nocookie.com"):
+        parts = [p for p in parsed.path.split("/") if p]
+        if parts and parts[0] == "watch":
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ("shorts", "embed", "live", "v"):
+            candidate = parts[1]
+
+    if candidate and _YOUTUBE_ID.match(candidate):
+        return candidate
+    return hashlib.md5(url.encode()).hexdigest()
+
+def file_digest(path):
+    """
+    sha256 of a file's contents, memoised per (path, size, mtime) for the process.
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_digests:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_digests[key] = h.hexdigest()
+    return _file_digests[key]
+
+def hash_inputs(inputs):
+    """
+    Stable hash of a JSON-serialisable dict of stage inputs.
+    """
+    payload = json.dumps(inputs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class StageCache:
+    """
+    Per-video artifact manifest stored at data/videos/<id>/manifest.json.
+
+    Each stage entry records its outputs, the hash of its inputs and the
+    code/model version that produced it. A stage is served from cache when
+    both match and every output file it lists still exists.
+    """
+
+    def __init__(self, video_id, root=VIDEOS_DIR):
+        self.video_id = video_id
+        self.video_dir = os.path.join(root, video_id)
+        self.manifest_path = os.path.join(self.video_dir, "manifest.json")
+        os.makedirs(self.video_dir, exist_ok=True)
+        self.manifest = self._load()
+        # Stages of one video may run on different threads
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {"video_id": self.video_id, "stages": {}}
+
+    def _save(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def path(self, name):
+        return os.path.join(self.video_dir, name)
+
+    def get(self, stage, inputs, version):
+        entry = self.manifest["stages"].get(stage)
+        if not entry:
+            return None
+        if entry["inputs_hash"] != hash_inputs(inputs) or entry["version"] != version:
+            return None
+        for path in entry.get("files", []):
+            if not os.path.exists(path):
+                return None
+        return entry["outputs"]
+
+    def put(self, stage, inputs, version, outputs, files=()):
+        with self._lock:
+            self.manifest["stages"][stage] = {
+                "inputs_hash": hash_inputs(inputs),
+                "version": version,
+                "outputs": outputs,
+                "files": list(files),
+                "created_at": time.time(),
+            }
+            self._write()
+
+    def invalidate(self, stage):
+        with self._lock:
+            if self.manifest["stages"].pop(stage, None) is not None:
+                self._write()
+
+    def run(self, stage, inputs, version, compute, files=()):
+        """
+        Return cached outputs for `stage`, or call `compute()` and record them.
+
+        Args:
+            stage (str): Stage name, e.g. "download"
+            inputs (dict): Everything the stage's result depends on
+            version (str): Code/model version of the stage
+            compute (callable): Returns a JSON-serialisable dict of outputs
+            files (iterable or callable): Output files that must exist for a
+                cache hit; a callable receives the outputs dict
+
+        Returns:
+            (dict, bool): The outputs and whether they came from cache
+        """
+        outputs = self.get(stage, inputs, version)
+        if outputs is not None:
+            return outputs, True
+        outputs = compute()
+        if callable(files):
+            files = files(outputs)
+        self.put(stage, inputs, version, outputs, files)
+        return outputs, False
@@ -0,0 +1,75 @@
+def format_timestamp(seconds):
+    seconds = int(seconds)
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+def chunk_words(words, window_sec=45, overlap_sec=10, max_words=60):
+    """
+    Build overlapping, time-aligned windows from word timestamps.
+
+    A window closes when it spans `window_sec` seconds or reaches `max_words`
+    (CLIP's text encoder only sees ~77 tokens). The next window starts
+    `overlap_sec` seconds before the previous one ended.
+
+    Args:
+        words (list): AssemblyAI words, {"text", "start", "end"} in milliseconds
+
+    Returns:
+        list: {"text", "start", "end"} dicts with times in seconds
+    """
+    chunks = []
+    i = 0
+    n = len(words)
+    while i < n:
+        start_ms = words[i]["start"]
+        j = i
+        while j < n and j - i < max_words and words[j]["end"] - start_ms <= window_sec * 1000:
+            j += 1
+        j = max(j, i + 1)
+        chunks.append({
+            "text": " ".join(w["text"] for w in words[i:j]),
+            "start": words[i]["start"] / 1000.0,
+            "end": words[j - 1]["end"] / 1000.0,
+        })
+        if j >= n:
+            break
+        # Step back so the next window overlaps this one, but always move forward
+        next_start_ms = words[j - 1]["end"] - overlap_sec * 1000
+        k = j
+        while k > i + 1 and words[k - 1]["start"] >= next_start_ms:
+            k -= 1
+        i = k
+    return chunks
+
+def chunk_text(text, max_chars=400, overlap_chars=80):
+    """
+    Fallback for transcripts without word timestamps: overlapping character
+    windows split on whitespace. Chunks have no start/end times.
+    """
+    chunks = []
+    pos = 0
+    while pos < len(text):
+        end = min(len(text), pos + max_chars)
+        if end < len(text):
+            space = text.rfind(" ", pos, end)
+            if space > pos:
+                end = space
+        chunks.append({"text": text[pos:end].strip(), "start": None, "end": None})
+        if end >= len(text):
+            break
+        pos = max(pos + 1, end - overlap_chars)
+        space = text.find(" ", pos, end)
+        if space != -1:
+            pos = space + 1
+    return [chunk for chunk in chunks if chunk["text"]]
+
+def chunk_transcript(transcript, **kwargs):
+    """
+    Chunk a transcript dict ({"text", "words"}), using word timestamps when available.
+    """
+    if transcript.get("words"):
+        return chunk_words(transcript["words"], **kwargs)
+    return chunk_text(transcript["text"])
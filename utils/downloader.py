@@ -1,19 +1,133 @@
 import os
-from yt_dlp import YoutubeDL
 
-def download_video_audio(url, output_dir="downloads"):
+from utils.tracing import span
+
+# CLIP sees 224x224 crops, so anything with a short side of 224+ px is enough
+DOWNLOAD_MAX_HEIGHT = int(os.getenv("DOWNLOAD_MAX_HEIGHT", "360"))
+DOWNLOAD_FRAGMENTS = int(os.getenv("DOWNLOAD_FRAGMENTS", "4"))
+
+def _video_format(max_height):
+    # Smallest pre-merged file (no ffmpeg merge) that is still big enough for CLIP
+    return (
+        f'worst[ext=mp4][height>=224][height<={max_height}]/'
+        f'worst[height>=224][height<={max_height}]/'
+        f'best[height<={max_height}]/worst'
+    )
+
+def _find_download(output_dir, stem):
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith(stem + ".") and not name.endswith((".part", ".ytdl")) and name.count(".") == stem.count(".") + 1:
+            return os.path.join(output_dir, name)
+    return None
+
+def _forget_archived(archive, video_id):
+    if not os.path.exists(archive):
+        return
+    with open(archive, encoding="utf-8") as f:
+        lines = f.readlines()
+    kept = [line for line in lines if line.split()[-1:] != [video_id]]
+    if len(kept) != len(lines):
+        with open(archive, "w", encoding="utf-8") as f:
+            f.writelines(kept)
+
+def download_video_audio(url, output_dir="downloads", audio_only=False, max_height=DOWNLOAD_MAX_HEIGHT):
+    """
+    Download a video at the lowest resolution good enough for CLIP, named by
+    its canonical_video_id. With audio_only=True, fetch just the smallest reasonable
+    audio stream (Opus/AAC), for transcript-only ingests.
+
+    Files are fetched with concurrent fragment downloads and recorded in a
+    yt-dlp download archive; a video already on disk is not fetched again.
+    """
+    from yt_dlp import YoutubeDL
+
+    from utils.cache import canonical_video_id
+
     os.makedirs(output_dir, exist_ok=True)
 
+    if audio_only:
+        # Low-bitrate Opus (WebM) or AAC (M4A); either is stream-copied by extract_audio
+        fmt = 'bestaudio[acodec=opus][abr<=96]/bestaudio[ext=m4a]/bestaudio/best'
+        suffix = ".audio"
+    else:
+        fmt = _video_format(max_height)
+        suffix = ""
+
+    video_id = canonical_video_id(url)
+    existing = _find_download(output_dir, video_id + suffix)
+    if existing:
+        print(f"♻️ Already downloaded: {existing}")
+        return existing, existing
+
+    archive = os.path.join(output_dir, f'archive{suffix}.txt')
+    # The archive says it was downloaded but the file was deleted since: fetch it again
+    _forget_archived(archive, video_id)
+
     ydl_opts = {
-        'format': 'best[ext=mp4]/best',  # Download best pre-merged mp4
-        'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
+        'format': fmt,
+        # Named by canonical_video_id (not yt-dlp's %(id)s) so the lookup above finds it for any site
+        'outtmpl': f'{output_dir}/{video_id}{suffix}.%(ext)s',
+        'download_archive': archive,
+        'concurrent_fragment_downloads': DOWNLOAD_FRAGMENTS,
         'noplaylist': True,
         'postprocessors': []  # Avoid using ffmpeg
     }
 
-    with YoutubeDL(ydl_opts) as ydl:
-        info = ydl.extract_info(url, download=True)
-        filename = ydl.prepare_filename(info)
+    with span("download", audio_only=audio_only) as s:
+        with YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            filename = ydl.prepare_filename(info)
+        if not os.path.exists(filename):
+            # Archived under the extractor's own id (non-YouTube sites), which
+            # _forget_archived can't know in advance: fetch without the archive
+            with YoutubeDL(dict(ydl_opts, download_archive=None)) as ydl:
+                info = ydl.extract_info(url, download=True)
+                filename = ydl.prepare_filename(info)
+        s.set(bytes=os.path.getsize(filename))
 
     print(f"✅ Downloaded file: {filename}")
     return filename, filename  # Return same path for video and audio
+
+def fetch_video_info(url):
+    """
+    Fetch a video's metadata without downloading any media.
+
+    Returns:
+        dict: id, title, channel, duration (s) and upload_date
+    """
+    from yt_dlp import YoutubeDL
+
+    with span("download.info"), YoutubeDL({'quiet': True, 'skip_download': True, 'noplaylist': True}) as ydl:
+        info = ydl.extract_info(url, download=False)
+    return {
+        "id": info.get("id"),
+        "title": info.get("title"),
+        "channel": info.get("channel") or info.get("uploader"),
+        "duration": info.get("duration"),
+        "upload_date": info.get("upload_date"),
+    }
+
+def list_playlist_urls(url):
+    """
+    Expand a playlist or channel URL into its video URLs without downloading anything.
+    """
+    from yt_dlp import YoutubeDL
+
+    ydl_opts = {
+        'extract_flat': 'in_playlist',
+        'quiet': True,
+    }
+    with YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False)
+
+    entries = info.get("entries") or [info]
+    urls = []
+    for entry in entries:
+        if not entry:
+            continue
+        video_url = entry.get("webpage_url") or entry.get("url")
+        if video_url and not video_url.startswith("http"):
+            video_url = f"https://www.youtube.com/watch?v={video_url}"
+        if video_url:
+            urls.append(video_url)
+    return urls
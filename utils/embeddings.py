@@ -1,10 +1,112 @@
-import torch
-from transformers import CLIPProcessor, CLIPModel
-from PIL import Image
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Load CLIP model + processor once
-clip_model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-clip_processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
+import numpy as np
+
+from utils.tracing import current_span, traced, traced_submit
+
+# torch, transformers and PIL are imported on first use so importing this
+# module (and everything that imports it) stays fast
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+CLIP_DIM = 512
+# "torch" (fp32 PyTorch), "onnx" (ONNX Runtime fp32) or "onnx-int8" (dynamically quantized)
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "torch")
+
+_clip = None
+_processor = None
+_backend = None
+_clip_lock = threading.Lock()
+
+def set_torch_threads(num_threads):
+    """
+    Set the number of intra-op threads torch uses for CLIP inference.
+    Pass None to keep torch's default (one per physical core).
+    """
+    if num_threads:
+        import torch
+
+        torch.set_num_threads(int(num_threads))
+
+def get_clip_processor():
+    global _processor
+    if _processor is None:
+        with _clip_lock:
+            if _processor is None:
+                from transformers import CLIPProcessor
+
+                _processor = CLIPProcessor.from_pretrained(CLIP_MODEL_NAME)
+    return _processor
+
+def get_clip():
+    """
+    Load the CLIP model + processor once per process, on first use.
+
+    Returns:
+        (CLIPModel, CLIPProcessor)
+    """
+    global _clip
+    if _clip is None:
+        processor = get_clip_processor()
+        with _clip_lock:
+            if _clip is None:
+                from transformers import CLIPModel
+
+                set_torch_threads(os.getenv("CLIP_TORCH_THREADS"))
+                model = CLIPModel.from_pretrained(CLIP_MODEL_NAME)
+                model.eval()
+                _clip = (model, processor)
+    return _clip
+
+class TorchClip:
+    """
+    PyTorch inference backend. Takes and returns NumPy arrays like the ONNX one.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def image_features(self, pixel_values):
+        import torch
+
+        with torch.no_grad():
+            return self.model.get_image_features(pixel_values=torch.from_numpy(pixel_values)).numpy()
+
+    def text_features(self, input_ids, attention_mask):
+        import torch
+
+        with torch.no_grad():
+            return self.model.get_text_features(
+                input_ids=torch.from_numpy(input_ids), attention_mask=torch.from_numpy(attention_mask)
+            ).numpy()
+
+def get_clip_backend(name=None):
+    """
+    Return the process-wide CLIP inference backend chosen by CLIP_BACKEND.
+    Passing `name` builds a fresh backend of that kind (used by benchmarks).
+    """
+    global _backend
+    if name is not None:
+        return _build_backend(name)
+    if _backend is None:
+        backend = _build_backend(CLIP_BACKEND)
+        with _clip_lock:
+            if _backend is None:
+                _backend = backend
+    return _backend
+
+def _build_backend(name):
+    if name == "torch":
+        return TorchClip(get_clip()[0])
+    if name in ("onnx", "onnx-int8"):
+        from utils.onnx_clip import OnnxClip
+
+        return OnnxClip.load(quantized=name == "onnx-int8", num_threads=os.getenv("CLIP_TORCH_THREADS"))
+    raise ValueError(f"Unknown CLIP backend: {name}")
+
+def _normalize(features):
+    return (features / np.linalg.norm(features, axis=-1, keepdims=True)).astype(np.float32)
 
 def get_clip_embedding(image_path):
     """
@@ -16,6 +118,10 @@ def get_clip_embedding(image_path):
     Returns:
         torch.Tensor: 512-d CLIP image embedding
     """
+    import torch
+    from PIL import Image
+
+    clip_model, clip_processor = get_clip()
     image = Image.open(image_path).convert("RGB")
     inputs = clip_processor(images=image, return_tensors="pt")
 
@@ -25,16 +131,97 @@ def get_clip_embedding(image_path):
 
     return embedding.squeeze(0)  # 512-d vector
 
+def _load_image(item):
+    from PIL import Image
+
+    # Paths are decoded from disk; arrays are assumed to be RGB frames
+    if isinstance(item, np.ndarray):
+        return Image.fromarray(item)
+    return Image.open(item).convert("RGB")
+
+def _preprocess_batch(items):
+    images = [_load_image(item) for item in items]
+    return get_clip_processor()(images=images, return_tensors="np")["pixel_values"].astype(np.float32)
+
+@traced("clip.images")
+def get_clip_embeddings(images, batch_size=32, num_workers=4, num_threads=None, backend=None, checkpoint=None):
+    """
+    Embed many images with CLIP in batches.
+
+    Decoding and preprocessing run on a thread pool while the previous
+    batch is in the forward pass.
+
+    Args:
+        images (list): Frame paths or RGB np.ndarrays (H, W, 3)
+        batch_size (int): Images per forward pass
+        num_workers (int): Threads used to decode and preprocess
+        num_threads (int): Torch intra-op threads (None keeps the current setting)
+        backend: Inference backend; defaults to get_clip_backend()
+        checkpoint (callable): Called before each forward pass; raise from it to stop early
+
+    Returns:
+        np.ndarray: (N, 512) float32 matrix of L2-normalized embeddings
+    """
+    images = list(images)
+    if not images:
+        return np.empty((0, CLIP_DIM), dtype=np.float32)
+    current_span().set(items=len(images))
+
+    backend = backend or get_clip_backend()
+    set_torch_threads(num_threads)
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    result = np.empty((len(images), CLIP_DIM), dtype=np.float32)
+
+    num_workers = max(1, num_workers)
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        # Keep a bounded number of batches preprocessed ahead of inference
+        pending = [traced_submit(pool, _preprocess_batch, batch) for batch in batches[:num_workers]]
+        next_batch = len(pending)
+        offset = 0
+        while pending:
+            if checkpoint:
+                checkpoint()
+            pixel_values = pending.pop(0).result()
+            if next_batch < len(batches):
+                pending.append(traced_submit(pool, _preprocess_batch, batches[next_batch]))
+                next_batch += 1
+            outputs = _normalize(backend.image_features(pixel_values))
+            n = outputs.shape[0]
+            result[offset:offset + n] = outputs
+            offset += n
+
+    return result
+
 def get_text_embedding(text):
     """
     Get CLIP-compatible text embedding, truncated to fit within 77 token limit.
     """
     # Truncate text manually to 77 tokens worth (roughly ~400 characters)
     text = text[:400]
+    return get_text_embeddings([text])[0]
 
-    inputs = clip_processor(text=[text], return_tensors="pt", padding=True, truncation=True)
-    with torch.no_grad():
-        outputs = clip_model.get_text_features(**inputs)
-        embedding = outputs / outputs.norm(dim=-1, keepdim=True)
-    
-    return embedding.squeeze(0)
+@traced("clip.text")
+def get_text_embeddings(texts, batch_size=64, backend=None):
+    """
+    Embed many texts with CLIP in batches.
+
+    Args:
+        texts (list): Strings; each is truncated by the tokenizer to 77 tokens
+        backend: Inference backend; defaults to get_clip_backend()
+
+    Returns:
+        np.ndarray: (N, 512) float32 matrix of L2-normalized embeddings
+    """
+    backend = backend or get_clip_backend()
+    processor = get_clip_processor()
+    texts = list(texts)
+    current_span().set(items=len(texts))
+    result = np.empty((len(texts), CLIP_DIM), dtype=np.float32)
+    for offset in range(0, len(texts), batch_size):
+        batch = texts[offset:offset + batch_size]
+        inputs = processor(text=batch, return_tensors="np", padding=True, truncation=True)
+        outputs = backend.text_features(
+            inputs["input_ids"].astype(np.int64), inputs["attention_mask"].astype(np.int64)
+        )
+        result[offset:offset + len(batch)] = _normalize(outputs)
+    return result
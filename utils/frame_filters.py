@@ -0,0 +1,92 @@
+import cv2
+import numpy as np
+
+class PerceptualHashFilter:
+    """
+    Drop frames whose DCT perceptual hash is within `max_distance` bits
+    of the last kept frame.
+    """
+
+    def __init__(self, max_distance=6, hash_size=8):
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.last_hash = None
+
+    def _hash(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        size = self.hash_size * 4
+        small = cv2.resize(gray, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+        low = cv2.dct(small)[:self.hash_size, :self.hash_size]
+        return (low > np.median(low)).ravel()
+
+    def __call__(self, frame):
+        frame_hash = self._hash(frame)
+        if self.last_hash is not None:
+            if np.count_nonzero(frame_hash != self.last_hash) <= self.max_distance:
+                return False
+        self.last_hash = frame_hash
+        return True
+
+class HistogramFilter:
+    """
+    Drop frames whose HSV colour histogram is within `max_distance`
+    (Bhattacharyya distance, 0..1) of the last kept frame.
+    """
+
+    def __init__(self, max_distance=0.1, bins=(16, 16)):
+        self.max_distance = max_distance
+        self.bins = list(bins)
+        self.last_hist = None
+
+    def _hist(self, frame):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_RGB2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, self.bins, [0, 180, 0, 256])
+        return cv2.normalize(hist, hist).astype(np.float32)
+
+    def __call__(self, frame):
+        hist = self._hist(frame)
+        if self.last_hist is not None:
+            distance = cv2.compareHist(self.last_hist, hist, cv2.HISTCMP_BHATTACHARYYA)
+            if distance < self.max_distance:
+                return False
+        self.last_hist = hist
+        return True
+
+FRAME_FILTERS = {
+    "phash": PerceptualHashFilter,
+    "histogram": HistogramFilter,
+}
+
+def get_frame_filter(name="phash", **kwargs):
+    """
+    Build a frame filter by name. Returns None for "none" so callers can skip filtering.
+    """
+    if not name or name == "none":
+        return None
+    if name not in FRAME_FILTERS:
+        raise ValueError(f"Unknown frame filter: {name}")
+    return FRAME_FILTERS[name](**kwargs)
+
+def filter_frames(frames, frame_filter, stats=None):
+    """
+    Drop near-duplicate frames before they reach CLIP.
+
+    Args:
+        frames (iterable): (timestamp, RGB ndarray) tuples, e.g. from sample_frames
+        frame_filter (callable): Returns True to keep a frame; None keeps everything
+        stats (dict): Optional dict updated with "frames_kept" and "frames_skipped"
+
+    Yields:
+        (float, np.ndarray): The frames that were kept
+    """
+    if stats is None:
+        stats = {}
+    stats.setdefault("frames_kept", 0)
+    stats.setdefault("frames_skipped", 0)
+
+    for timestamp, frame in frames:
+        if frame_filter is None or frame_filter(frame):
+            stats["frames_kept"] += 1
+            yield timestamp, frame
+        else:
+            stats["frames_skipped"] += 1
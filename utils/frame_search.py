@@ -0,0 +1,169 @@
+import os
+import threading
+
+import numpy as np
+
+from utils.cache import VIDEOS_DIR
+from utils.storage import list_stored_videos, load_video_artifacts
+
+# CLIP text-image cosine for an unrelated frame sits around 0.15-0.2
+MOMENT_MIN_SCORE = float(os.getenv("MOMENT_MIN_SCORE", "0.22"))
+
+class FrameIndex:
+    """
+    Text-to-moment search over every stored frame embedding.
+
+    All frames live in one contiguous float32 matrix with parallel arrays of
+    video numbers and timestamps, so a query is a single matrix-vector
+    product plus argpartition; tens of thousands of frames take a few ms.
+    The matrix is built lazily from the per-video .npy artifacts and a
+    video's rows are swapped out when it is re-ingested.
+    """
+
+    def __init__(self, root=VIDEOS_DIR, dim=512):
+        self.root = root
+        self.dim = dim
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._video_names = []
+        self._video_numbers = {}
+        self._matrix = np.empty((0, dim), dtype=np.float32)
+        self._videos = np.empty(0, dtype=np.int32)
+        self._times = np.empty(0, dtype=np.float32)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        parts = []
+        for video_id in list_stored_videos(self.root):
+            artifacts = load_video_artifacts(video_id, self.root)
+            if artifacts is not None and len(artifacts["frame_timestamps"]):
+                parts.append((video_id, artifacts["frame_embeddings"], artifacts["frame_timestamps"]))
+        self._rebuild(parts)
+        self._loaded = True
+
+    def _number(self, video_id):
+        if video_id not in self._video_numbers:
+            self._video_numbers[video_id] = len(self._video_names)
+            self._video_names.append(video_id)
+        return self._video_numbers[video_id]
+
+    def _rebuild(self, parts, keep=None):
+        matrices = [self._matrix[keep]] if keep is not None else []
+        videos = [self._videos[keep]] if keep is not None else []
+        times = [self._times[keep]] if keep is not None else []
+        for video_id, embeddings, timestamps in parts:
+            embeddings = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            matrices.append(embeddings / np.where(norms == 0, 1, norms))
+            videos.append(np.full(len(timestamps), self._number(video_id), dtype=np.int32))
+            times.append(np.asarray(timestamps, dtype=np.float32))
+        if matrices:
+            self._matrix = np.ascontiguousarray(np.concatenate(matrices))
+            self._videos = np.concatenate(videos)
+            self._times = np.concatenate(times)
+
+    def add_video(self, video_id, frame_embeddings, frame_timestamps):
+        """
+        Add or replace one video's frames.
+        """
+        with self._lock:
+            if not self._loaded:
+                return  # the first search loads everything from disk, this video included
+            number = self._number(video_id)
+            keep = self._videos != number
+            self._rebuild([(video_id, frame_embeddings, frame_timestamps)], keep=keep)
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._times)
+
+    def search(self, query_embedding, top_k=10, video_id=None):
+        """
+        Nearest frames to a (D,) query vector.
+
+        Returns:
+            list: (video_id, timestamp_sec, score) tuples, best first
+        """
+        with self._lock:
+            self._ensure_loaded()
+            matrix, videos, times, names = self._matrix, self._videos, self._times, list(self._video_names)
+            number = self._video_numbers.get(video_id) if video_id is not None else None
+
+        if video_id is not None:
+            if number is None:
+                return []
+            rows = np.flatnonzero(videos == number)
+        else:
+            rows = None
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        candidates = matrix if rows is None else matrix[rows]
+        if not len(candidates):
+            return []
+
+        scores = candidates @ query
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        index = top if rows is None else rows[top]
+        return [(names[videos[i]], float(times[i]), float(scores[j])) for i, j in zip(index, top)]
+
+def merge_hits(hits, max_gap=10.0):
+    """
+    Merge frame hits from the same video that are at most `max_gap` seconds
+    apart into segments.
+
+    Returns:
+        list: {"video_id", "start", "end", "score", "frames"} dicts, best
+            segment (highest single-frame score) first
+    """
+    segments = []
+    by_video = {}
+    for video_id, timestamp, score in hits:
+        by_video.setdefault(video_id, []).append((timestamp, score))
+    for video_id, frames in by_video.items():
+        frames.sort()
+        current = None
+        for timestamp, score in frames:
+            if current and timestamp - current["end"] <= max_gap:
+                current["end"] = timestamp
+                current["score"] = max(current["score"], score)
+                current["frames"] += 1
+            else:
+                current = {"video_id": video_id, "start": timestamp, "end": timestamp, "score": score, "frames": 1}
+                segments.append(current)
+    return sorted(segments, key=lambda s: -s["score"])
+
+def find_moments(text, video_id=None, top_k=3, candidates=20, max_gap=10.0, min_score=MOMENT_MIN_SCORE, index=None):
+    """
+    Find the moments whose frames best match a text query, e.g. "slide with the
+    architecture diagram".
+
+    Args:
+        video_id (str): Only search this video; None searches every video
+        top_k (int): Segments to return
+        candidates (int): Frames retrieved before merging into segments
+        min_score (float): Frames scoring below this are dropped, so questions
+            with nothing visual to match return no moments
+
+    Returns:
+        list: Segments as returned by merge_hits
+    """
+    from utils.embeddings import get_text_embedding
+
+    index = index or get_frame_index()
+    hits = index.search(get_text_embedding(text), top_k=candidates, video_id=video_id)
+    hits = [hit for hit in hits if hit[2] >= min_score]
+    return merge_hits(hits, max_gap=max_gap)[:top_k]
+
+_frame_index = None
+_frame_index_lock = threading.Lock()
+
+def get_frame_index():
+    global _frame_index
+    with _frame_index_lock:
+        if _frame_index is None:
+            _frame_index = FrameIndex()
+        return _frame_index
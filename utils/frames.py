@@ -1,28 +1,121 @@
 import cv2
 import os
 
-def extract_frames(video_path, video_id, interval_sec=5):
+from utils.tracing import current_span, traced
+
+# Used only when the container reports neither fps nor timestamps
+FALLBACK_FPS = 25.0
+
+def _frame_time(vidcap, index, fps):
+    # Prefer the decoder's timestamp so variable-frame-rate files stay accurate
+    pos_msec = vidcap.get(cv2.CAP_PROP_POS_MSEC)
+    if pos_msec > 0 or index == 0:
+        return pos_msec / 1000.0
+    return index / (fps or FALLBACK_FPS)
+
+def _prepare(image, min_side):
+    if min_side:
+        h, w = image.shape[:2]
+        scale = min_side / min(h, w)
+        if scale < 1:
+            image = cv2.resize(image, (round(w * scale), round(h * scale)), interpolation=cv2.INTER_AREA)
+    return image
+
+def _emit(image, timestamp, output_dir, min_side):
+    image = _prepare(image, min_side)
+    if output_dir:
+        cv2.imwrite(os.path.join(output_dir, f"frame_{int(timestamp * 1000)}.jpg"), image)
+    return timestamp, cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+
+def _sample_by_grab(vidcap, interval_sec, fps, output_dir, min_side):
+    # grab() demuxes and decodes but skips the copy/convert; only kept frames are retrieved
+    next_time = 0.0
+    index = 0
+    while vidcap.grab():
+        timestamp = _frame_time(vidcap, index, fps)
+        index += 1
+        if timestamp + 1e-3 < next_time:
+            continue
+        success, image = vidcap.retrieve()
+        if not success:
+            break
+        yield _emit(image, timestamp, output_dir, min_side)
+        next_time = timestamp + interval_sec
+
+def _sample_by_seek(vidcap, interval_sec, fps, output_dir, min_side):
+    target = 0.0
+    last_time = -1.0
+    while True:
+        if not vidcap.set(cv2.CAP_PROP_POS_MSEC, target * 1000.0):
+            return False
+        success, image = vidcap.read()
+        if not success:
+            return True
+        timestamp = vidcap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if timestamp <= 0 and target > 0:
+            timestamp = target
+        if timestamp <= last_time:
+            # The backend ignored the seek; let the caller fall back to grab()
+            return False
+        yield _emit(image, timestamp, output_dir, min_side)
+        last_time = timestamp
+        target = max(target + interval_sec, timestamp + interval_sec / 2)
+
+def sample_frames(video_path, interval_sec=5, mode="seek", output_dir=None, min_side=None):
     """
-    Extract frames to a per-video folder.
+    Sample one frame every `interval_sec` seconds without decoding to disk.
+
+    Args:
+        video_path (str): Path to the video file
+        interval_sec (float): Seconds between sampled frames
+        mode (str): "seek" jumps to each target timestamp; "grab" walks every
+            frame with grab() and only decodes the kept ones. Seek falls back
+            to grab when the container can't seek.
+        output_dir (str): Optional folder to also write each frame as a JPEG
+        min_side (int): Optional downscale so the shorter side is at most this
+
+    Yields:
+        (float, np.ndarray): Timestamp in seconds and the RGB frame
     """
-    frame_output_dir = os.path.join("data/videos", video_id, "frames")
-    os.makedirs(frame_output_dir, exist_ok=True)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
 
     vidcap = cv2.VideoCapture(video_path)
-    fps = vidcap.get(cv2.CAP_PROP_FPS)
-    frame_interval = int(fps * interval_sec)
+    try:
+        if not vidcap.isOpened():
+            raise IOError(f"Could not open video: {video_path}")
+        fps = vidcap.get(cv2.CAP_PROP_FPS) or 0.0
 
-    success, image = vidcap.read()
-    count = 0
-    saved_frames = []
+        resume_at = 0.0
+        if mode == "seek":
+            seeker = _sample_by_seek(vidcap, interval_sec, fps, output_dir, min_side)
+            while True:
+                try:
+                    timestamp, frame = next(seeker)
+                except StopIteration as stop:
+                    if stop.value:
+                        return
+                    break
+                resume_at = timestamp + interval_sec
+                yield timestamp, frame
+            # Seeking is unsupported: restart from the top and skip what was already yielded
+            vidcap.release()
+            vidcap = cv2.VideoCapture(video_path)
 
-    while success:
-        if count % frame_interval == 0:
-            frame_path = os.path.join(frame_output_dir, f"frame_{count}.jpg")
-            cv2.imwrite(frame_path, image)
-            saved_frames.append(frame_path)
-        success, image = vidcap.read()
-        count += 1
+        for timestamp, frame in _sample_by_grab(vidcap, interval_sec, fps, output_dir, min_side):
+            if timestamp + 1e-3 >= resume_at:
+                yield timestamp, frame
+    finally:
+        vidcap.release()
 
-    vidcap.release()
+@traced("extract_frames")
+def extract_frames(video_path, video_id, interval_sec=5):
+    """
+    Extract frames to a per-video folder.
+    """
+    frame_output_dir = os.path.join("data/videos", video_id, "frames")
+    saved_frames = []
+    for timestamp, _ in sample_frames(video_path, interval_sec=interval_sec, output_dir=frame_output_dir):
+        saved_frames.append(os.path.join(frame_output_dir, f"frame_{int(timestamp * 1000)}.jpg"))
+    current_span().set(items=len(saved_frames))
     return saved_frames
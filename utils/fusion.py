@@ -1,17 +1,22 @@
 import numpy as np
 
+from utils.tracing import traced
+
+@traced("fusion")
 def fuse_embeddings(text_embedding, frame_embeddings):
     """
     Fuse text and visual embeddings into one vector.
 
     Args:
         text_embedding (np.array or tensor)
-        frame_embeddings (List of np.array or tensors)
+        frame_embeddings (List of np.array or tensors, or an (N, D) np.array)
 
     Returns:
         np.array: Unified embedding
     """
-    all_embeddings = [text_embedding] + frame_embeddings
+    if isinstance(frame_embeddings, np.ndarray):
+        frame_embeddings = list(frame_embeddings)
+    all_embeddings = [text_embedding] + list(frame_embeddings)
     all_embeddings = [e if isinstance(e, np.ndarray) else e.cpu().numpy() for e in all_embeddings]
     avg_embedding = np.mean(all_embeddings, axis=0)
     return avg_embedding
@@ -0,0 +1,95 @@
+from utils.llm import get_client, LLMError
+
+TEMPERATURE = 0.3
+
+# Bump a template's version whenever its prompt text changes so cached responses are not reused
+PROMPT_TEMPLATES = {
+    "summary": {"version": "summary/v1", "max_tokens": 300},
+    "detailed": {"version": "detailed/v1", "max_tokens": 1000},
+    "breakdown": {"version": "breakdown/v1", "max_tokens": 1000},
+}
+
+# What the map step extracts from each section when a transcript is too long for one prompt
+MAP_INSTRUCTIONS = {
+    "summary": "List the main points of this section as short bullet points.",
+    "detailed": "Write detailed notes covering every important point, example and argument in this section.",
+    "breakdown": "List the key topics of this section, each starting with the [mm:ss] timestamp where it begins.",
+}
+
+_error_handler = print
+
+def set_error_handler(handler):
+    """
+    Route Groq errors to `handler(message)` (e.g. st.error) instead of print.
+    """
+    global _error_handler
+    _error_handler = handler
+
+def _stream_or_fail(chunks, failure_message, on_error):
+    try:
+        yield from chunks
+    except LLMError as e:
+        on_error(str(e))
+        yield failure_message
+
+def _complete(messages, max_tokens, failure_message, stream=False, on_error=None):
+    # Callers off the Streamlit script thread pass their own on_error; st.error is dropped there
+    on_error = on_error or _error_handler
+    client = get_client()
+    if stream:
+        return _stream_or_fail(client.stream_chat(messages, max_tokens=max_tokens, temperature=TEMPERATURE),
+                               failure_message, on_error)
+    try:
+        return client.chat(messages, max_tokens=max_tokens, temperature=TEMPERATURE)
+    except LLMError as e:
+        on_error(str(e))
+        return failure_message
+
+def answer_prompt(context_text, question):
+    return f"Context:\n{context_text}\n\nQuestion: {question}"
+
+def generate_answer_groq(context_text, chat_history, question, stream=False):
+    messages = chat_history + [
+        {"role": "user", "content": answer_prompt(context_text, question)}
+    ]
+    return _complete(messages, 300, "Failed to generate answer.", stream)
+
+def generate_summary_groq(transcript_text, stream=False, on_error=None):
+    prompt = f"""
+You are an assistant that summarizes YouTube video transcripts.
+
+Please provide a concise and informative summary of the following transcript:
+
+{transcript_text}
+
+Summary:
+"""
+    max_tokens = PROMPT_TEMPLATES["summary"]["max_tokens"]
+    return _complete([{"role": "user", "content": prompt}], max_tokens, "Failed to generate summary.", stream, on_error)
+
+def generate_detailed_explanation(transcript_text, stream=False, on_error=None):
+    prompt = f"""
+You are an AI assistant. Read the transcript of a YouTube video below and generate a detailed explanation that expands on all important points, examples, and logic used.
+
+Transcript:
+{transcript_text}
+
+Detailed Explanation:
+"""
+    max_tokens = PROMPT_TEMPLATES["detailed"]["max_tokens"]
+    return _complete([{"role": "user", "content": prompt}], max_tokens, "Failed to generate detailed explanation.", stream, on_error)
+
+def generate_time_aligned_breakdown(transcript_text, stream=False, on_error=None):
+    prompt = f"""
+Read the following YouTube video transcript and generate a time-aligned breakdown of key sections. Format it as:
+
+[00:00] Introduction: ...
+[01:15] Key Concept 1: ...
+[03:45] Example and Use Case: ...
+...
+
+Transcript:
+{transcript_text}
+"""
+    max_tokens = PROMPT_TEMPLATES["breakdown"]["max_tokens"]
+    return _complete([{"role": "user", "content": prompt}], max_tokens, "Failed to generate time-aligned breakdown.", stream, on_error)
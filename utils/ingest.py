@@ -0,0 +1,259 @@
+"""
+Bulk ingestion with a resumable SQLite job queue.
+
+    python -m utils.ingest --file urls.txt
+    python -m utils.ingest --playlist "https://www.youtube.com/playlist?list=..."
+    python -m utils.ingest                      # resume whatever is left in the queue
+    python -m utils.ingest --reindex            # rebuild the vector store from saved artifacts
+
+Every stage (download, transcribe, embed, index) has its own bounded worker
+pool, so videos flow through the stages concurrently. Stage outputs are kept
+in each video's StageCache manifest; after a crash, re-running the command
+puts interrupted jobs back in the queue and completed stages are served from
+cache. The index stage writes to Chroma in batches.
+"""
+import argparse
+import threading
+import time
+from collections import defaultdict
+
+from utils import tracing
+from utils.cache import StageCache
+from utils.downloader import list_playlist_urls
+from utils.jobqueue import JobQueue, JOB_STAGES
+from utils.lexical_index import get_lexical_index
+from utils.pipeline import (
+    stage_info, stage_download, stage_audio, stage_transcript, stage_chunks, stage_frames, stage_fusion, video_metadata,
+    reindex_video,
+)
+from utils.storage import save_video_metadata, list_stored_videos
+from utils.vectorstore import get_or_create_collection, add_videos_to_collection, add_chunks_to_collection
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.seconds = defaultdict(float)
+
+    def record(self, stage, seconds, ok=True, count=1):
+        with self._lock:
+            self.seconds[stage] += seconds
+            if ok:
+                self.completed[stage] += count
+            else:
+                self.errors[stage] += count
+
+def _download(video_id, url):
+    cache = StageCache(video_id)
+    stage_info(cache, url)
+    video_path, _ = stage_download(cache, url)
+    stage_audio(cache, video_path)
+
+def _transcribe(video_id, url):
+    cache = StageCache(video_id)
+    video_path, _ = stage_download(cache, url)
+    audio_path, _ = stage_audio(cache, video_path)
+    stage_transcript(cache, audio_path)
+
+def _embed(video_id, url):
+    cache = StageCache(video_id)
+    video_path, _ = stage_download(cache, url)
+    audio_path, _ = stage_audio(cache, video_path)
+    transcript, _ = stage_transcript(cache, audio_path)
+    _, chunk_embeddings, _ = stage_chunks(cache, transcript)
+    frames_path, _, _ = stage_frames(cache, video_path)
+    stage_fusion(cache, transcript["text"], frames_path, chunk_embeddings)
+
+def _prepare_index_entry(video_id, url):
+    # Every upstream stage is a cache hit at this point
+    cache = StageCache(video_id)
+    video_path, _ = stage_download(cache, url)
+    audio_path, _ = stage_audio(cache, video_path)
+    transcript, _ = stage_transcript(cache, audio_path)
+    chunks, chunk_embeddings, _ = stage_chunks(cache, transcript)
+    frames_path, frame_stats, _ = stage_frames(cache, video_path)
+    video_embedding, _ = stage_fusion(cache, transcript["text"], frames_path, chunk_embeddings)
+    metadata = video_metadata(url, transcript["text"], frame_stats, stage_info(cache, url))
+    save_video_metadata(video_id, metadata)
+    return video_embedding, metadata, (chunks, chunk_embeddings)
+
+HANDLERS = {
+    "download": _download,
+    "transcribe": _transcribe,
+    "embed": _embed,
+}
+
+def _stage_worker(queue, stage, stats, stop):
+    upstream = JOB_STAGES[:JOB_STAGES.index(stage) + 1]
+    handler = HANDLERS[stage]
+    while not stop.is_set():
+        jobs = queue.claim(stage)
+        if not jobs:
+            if not queue.has_work(upstream):
+                return
+            time.sleep(0.5)
+            continue
+        video_id, url = jobs[0]
+        start = time.perf_counter()
+        try:
+            handler(video_id, url)
+        except Exception as e:
+            stats.record(stage, time.perf_counter() - start, ok=False)
+            queue.fail(video_id, f"{stage}: {e}")
+            print(f"❌ {stage} failed for {video_id}: {e}")
+        else:
+            stats.record(stage, time.perf_counter() - start)
+            queue.advance(video_id, stage)
+
+def _index_worker(queue, collection, batch_size, flush_sec, stats, stop):
+    upstream = JOB_STAGES[:-1]
+    last_flush = time.monotonic()
+    while not stop.is_set():
+        upstream_busy = queue.has_work(upstream)
+        pending = queue.pending_count("index")
+        if pending == 0:
+            if not upstream_busy and not queue.has_work(["index"]):
+                return
+            time.sleep(0.5)
+            continue
+        # Wait for a full batch unless upstream is idle or the batch has waited long enough
+        if pending < batch_size and upstream_busy and time.monotonic() - last_flush < flush_sec:
+            time.sleep(0.5)
+            continue
+
+        jobs = queue.claim("index", limit=batch_size)
+        start = time.perf_counter()
+        ids, embeddings, metadatas, chunk_sets = [], [], [], []
+        for video_id, url in jobs:
+            try:
+                embedding, metadata, chunk_set = _prepare_index_entry(video_id, url)
+            except Exception as e:
+                stats.record("index", 0, ok=False)
+                queue.fail(video_id, f"index: {e}")
+                continue
+            ids.append(video_id)
+            embeddings.append(embedding)
+            metadatas.append(metadata)
+            chunk_sets.append(chunk_set)
+
+        if ids:
+            try:
+                add_videos_to_collection(collection, ids, embeddings, metadatas)
+                for video_id, metadata, (chunks, chunk_embeddings) in zip(ids, metadatas, chunk_sets):
+                    add_chunks_to_collection(collection, video_id, chunks, chunk_embeddings, metadata)
+                    get_lexical_index().add_chunks(video_id, chunks)
+            except Exception as e:
+                stats.record("index", time.perf_counter() - start, ok=False, count=len(ids))
+                for video_id in ids:
+                    queue.fail(video_id, f"index: {e}")
+            else:
+                stats.record("index", time.perf_counter() - start, count=len(ids))
+                for video_id in ids:
+                    queue.advance(video_id, "index")
+                print(f"📦 Indexed batch of {len(ids)} videos")
+        last_flush = time.monotonic()
+
+def run(queue, workers, index_batch=32, flush_sec=30):
+    """
+    Drain the queue with one bounded thread pool per stage.
+
+    Args:
+        queue (JobQueue): The job queue
+        workers (dict): Pool size per stage, e.g. {"download": 2, "transcribe": 8, "embed": 1}
+        index_batch (int): Videos per Chroma write
+        flush_sec (float): Longest time a partial batch waits for more videos
+
+    Returns:
+        _Stats: Per-stage completed/error counts and busy time
+    """
+    stats = _Stats()
+    stop = threading.Event()
+    _, collection = get_or_create_collection()
+
+    threads = []
+    for stage in HANDLERS:
+        for i in range(max(1, workers.get(stage, 1))):
+            threads.append(threading.Thread(
+                target=_stage_worker, args=(queue, stage, stats, stop), name=f"{stage}-{i}", daemon=True,
+            ))
+    threads.append(threading.Thread(
+        target=_index_worker, args=(queue, collection, index_batch, flush_sec, stats, stop), name="index", daemon=True,
+    ))
+    for thread in threads:
+        thread.start()
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        # Running jobs are put back in the queue on the next start
+        print("\n⏹️ Stopping; re-run the command to resume.")
+        stop.set()
+    return stats
+
+def _read_urls(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", help="Text file with one YouTube URL per line")
+    parser.add_argument("--playlist", action="append", default=[], help="Playlist or channel URL (repeatable)")
+    parser.add_argument("--db", default="data/jobs.db", help="Job queue database")
+    parser.add_argument("--download-workers", type=int, default=2)
+    parser.add_argument("--transcribe-workers", type=int, default=8)
+    parser.add_argument("--embed-workers", type=int, default=1)
+    parser.add_argument("--index-batch", type=int, default=32)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--retry-failed", action="store_true", help="Re-queue jobs that previously failed")
+    parser.add_argument("--trace", help="Append per-stage trace spans to this JSONL file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
+    parser.add_argument("--reindex", action="store_true",
+                        help="Rebuild the vector store from saved artifacts (no downloads or inference) and exit")
+    args = parser.parse_args()
+    if args.trace or args.metrics_port:
+        tracing.configure(args.trace, args.metrics_port)
+
+    if args.reindex:
+        start = time.perf_counter()
+        _, collection = get_or_create_collection()
+        video_ids = list_stored_videos()
+        done = sum(reindex_video(video_id, collection) for video_id in video_ids)
+        print(f"🔁 Re-indexed {done}/{len(video_ids)} stored videos in {time.perf_counter() - start:.1f}s")
+        return
+
+    queue = JobQueue(args.db, max_attempts=args.max_attempts)
+    recovered = queue.recover()
+    if recovered:
+        print(f"♻️ Resuming {recovered} interrupted jobs")
+    if args.retry_failed:
+        print(f"🔁 Re-queued {queue.retry_failed()} failed jobs")
+
+    urls = _read_urls(args.file) if args.file else []
+    for playlist in args.playlist:
+        urls.extend(list_playlist_urls(playlist))
+    if urls:
+        print(f"📥 Queued {queue.enqueue(urls)} new videos ({len(urls)} URLs read)")
+
+    start = time.perf_counter()
+    stats = run(queue, {
+        "download": args.download_workers,
+        "transcribe": args.transcribe_workers,
+        "embed": args.embed_workers,
+    }, index_batch=args.index_batch)
+    elapsed = time.perf_counter() - start
+
+    indexed = stats.completed["index"]
+    print("\n--- Ingest report ---")
+    print(f"⏱️ {elapsed:.1f}s wall, {indexed} videos indexed ({indexed / elapsed * 60 if elapsed else 0:.1f}/min)")
+    for stage in JOB_STAGES:
+        print(f"  {stage:<11} ok={stats.completed[stage]:<6} errors={stats.errors[stage]:<4} busy={stats.seconds[stage]:.1f}s")
+    failures = queue.failures()
+    if failures:
+        print(f"❌ {len(failures)} jobs failed permanently (use --retry-failed to re-queue):")
+        for video_id, url, stage, error in failures[:20]:
+            print(f"  {video_id} [{stage}] {error}")
+    queue.close()
+
+if __name__ == "__main__":
+    main()
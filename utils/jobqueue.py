@@ -0,0 +1,164 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.cache import canonical_video_id
+
+# Each job moves through these stages in order; "done" is terminal
+JOB_STAGES = ["download", "transcribe", "embed", "index"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    video_id   TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    stage      TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    error      TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_stage_status ON jobs (stage, status);
+"""
+
+class JobQueue:
+    """
+    SQLite-backed ingest queue that survives crashes.
+
+    A job row holds the next stage to run and its status (pending, running,
+    failed). Stage outputs live in the per-video StageCache, so a resumed
+    job picks up from the manifest rather than from the queue.
+    """
+
+    def __init__(self, path="data/jobs.db", max_attempts=3):
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, urls):
+        """
+        Add URLs, skipping videos that are already queued. Returns the number added.
+        """
+        now = time.time()
+        rows = [(canonical_video_id(url), url, JOB_STAGES[0], "pending", now, now) for url in urls]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (video_id, url, stage, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def recover(self):
+        """
+        Put jobs left "running" by a crashed process back in the queue.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'running'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def retry_failed(self):
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = 0, error = NULL, updated_at = ? "
+                "WHERE status = 'failed'",
+                (time.time(),),
+            )
+            return cursor.rowcount
+
+    def claim(self, stage, limit=1):
+        """
+        Atomically mark up to `limit` pending jobs of `stage` as running.
+
+        Returns:
+            list: (video_id, url) tuples
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT video_id, url FROM jobs WHERE stage = ? AND status = 'pending' "
+                    "ORDER BY created_at LIMIT ?",
+                    (stage, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE jobs SET status = 'running', updated_at = ? WHERE video_id = ?",
+                    [(time.time(), video_id) for video_id, _ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def advance(self, video_id, stage):
+        """
+        Mark `stage` finished and queue the job for the next one.
+        """
+        index = JOB_STAGES.index(stage)
+        next_stage = JOB_STAGES[index + 1] if index + 1 < len(JOB_STAGES) else "done"
+        status = "done" if next_stage == "done" else "pending"
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, status = ?, attempts = 0, error = NULL, updated_at = ? "
+                "WHERE video_id = ?",
+                (next_stage, status, time.time(), video_id),
+            )
+
+    def fail(self, video_id, error):
+        """
+        Record an error; the job is retried until it has failed `max_attempts` times.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, error = ?, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END "
+                "WHERE video_id = ?",
+                (str(error)[:2000], time.time(), self.max_attempts, video_id),
+            )
+
+    def has_work(self, stages):
+        """
+        True while any job is pending or running in one of `stages`.
+        """
+        placeholders = ",".join("?" for _ in stages)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM jobs WHERE stage IN ({placeholders}) "
+                "AND status IN ('pending', 'running') LIMIT 1",
+                list(stages),
+            ).fetchone()
+        return row is not None
+
+    def pending_count(self, stage):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE stage = ? AND status = 'pending'", (stage,)
+            ).fetchone()
+        return row[0]
+
+    def counts(self):
+        """
+        Returns:
+            dict: {(stage, status): count}
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT stage, status, COUNT(*) FROM jobs GROUP BY stage, status").fetchall()
+        return {(stage, status): count for stage, status, count in rows}
+
+    def failures(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT video_id, url, stage, error FROM jobs WHERE status = 'failed' ORDER BY updated_at"
+            ).fetchall()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,158 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.pipeline import IngestCancelled
+
+# Ingest jobs running at once across all users; they share one CLIP model
+MAX_PARALLEL_JOBS = int(os.getenv("MAX_PARALLEL_INGESTS", "2"))
+# Finished jobs are forgotten after this many seconds
+JOB_TTL_SEC = 3600
+
+class Job:
+    """
+    State of one background job, written by the worker thread and read by UI
+    reruns. Use snapshot() to read it consistently.
+    """
+
+    def __init__(self, label, stages):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.stages = {stage: {"status": "pending", "seconds": None} for stage in stages}
+        self.status = "queued"  # queued | running | done | failed | cancelled
+        self.stage = None
+        self.error = None
+        self.result = None
+        self.preview = ""
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def report(self, stage, status, seconds=None):
+        """
+        Progress callback with run_ingest's signature: (stage, status, seconds).
+        """
+        with self._lock:
+            if stage not in self.stages:
+                self.stages[stage] = {"status": "pending", "seconds": None}
+            self.stages[stage] = {"status": status, "seconds": seconds}
+            if status == "running":
+                self.stage = stage
+
+    def set_error(self, message):
+        """
+        Record an error for the UI; a job can finish with an error and still
+        return a result (e.g. a failed summary after a good ingest).
+        """
+        with self._lock:
+            self.error = message
+
+    def finish(self, status, error=None):
+        """
+        Move to a terminal status. finished_at is set in the same step, so
+        anything that sees a finished job also sees when it finished.
+        """
+        with self._lock:
+            if error is not None:
+                self.error = error
+            self.finished_at = time.time()
+            self.status = status
+
+    def append_preview(self, text):
+        with self._lock:
+            self.preview += text
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def percent(self):
+        done = sum(1 for s in self.stages.values() if s["status"] in ("done", "cached"))
+        return done / len(self.stages) if self.stages else 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "label": self.label,
+                "status": self.status,
+                "stage": self.stage,
+                "stages": {stage: dict(info) for stage, info in self.stages.items()},
+                "percent": self.percent,
+                "error": self.error,
+                "preview": self.preview,
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+                "cancelling": self.cancel_event.is_set() and not self.finished,
+            }
+
+class JobManager:
+    """
+    Runs jobs on a bounded thread pool that outlives Streamlit reruns and
+    sessions. Jobs beyond `max_parallel` wait in the pool's queue.
+    """
+
+    def __init__(self, max_parallel=MAX_PARALLEL_JOBS, ttl_sec=JOB_TTL_SEC):
+        self.ttl_sec = ttl_sec
+        self._pool = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="ingest")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, label, work, stages=()):
+        """
+        Start `work(job)` in the background. It should report progress through
+        job.report and stop early once job.cancel_event is set; its return
+        value becomes job.result.
+
+        Returns:
+            Job
+        """
+        job = Job(label, stages)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, work)
+        return job
+
+    def _run(self, job, work):
+        if job.cancel_event.is_set():
+            job.finish("cancelled")
+            return
+        job.status = "running"
+        try:
+            job.result = work(job)
+            job.finish("done")
+        except IngestCancelled:
+            job.finish("cancelled")
+        except Exception as e:
+            traceback.print_exc()
+            job.finish("failed", f"{type(e).__name__}: {e}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: -job.created_at)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job and not job.finished:
+            job.cancel_event.set()
+        return job
+
+    def running_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _prune(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and now - job.finished_at > self.ttl_sec:
+                del self._jobs[job_id]
@@ -0,0 +1,336 @@
+"""
+BM25 keyword index over transcript chunks, kept in SQLite FTS5.
+
+CLIP text embeddings blur names, code identifiers and exact phrases; this
+index finds them by their words. utils.query runs it next to the vector
+store and merges the two rankings with reciprocal-rank fusion.
+
+Query cost does not grow with the corpus:
+- Searching one video (the chat case) scores that video's chunks directly
+  with corpus-wide BM25 statistics, so it reads a few dozen rows.
+- Searching everything goes through FTS5 with the query words taken
+  rarest first, up to MAX_POSTINGS postings; very common words add little
+  to BM25 but would make each query scan most of the corpus.
+"""
+import heapq
+import math
+import os
+import queue
+import re
+import sqlite3
+import threading
+import unicodedata
+from collections import Counter
+from contextlib import contextmanager
+
+from utils.tracing import current_span, traced
+
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "data/lexical.db")
+MAX_POSTINGS = int(os.getenv("LEXICAL_MAX_POSTINGS", "20000"))
+
+# Same BM25 parameters as FTS5's bm25()
+K1 = 1.2
+B = 0.75
+
+# Chunk rows live in a plain table (indexed by video); the FTS5 table holds
+# only the inverted index over their text. `terms` keeps each word's
+# document frequency and `stats` the chunk and token totals. There is no
+# stemmer and "_" is a word character, so FTS5 tokens are the words _words()
+# returns, and identifiers like get_text_embedding stay whole. FTS5 strips
+# accents from Latin letters (remove_diacritics 2), so _words() does too:
+# "cafe" and "café" are the same term in both.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    rowid     INTEGER PRIMARY KEY,
+    chunk_id  TEXT NOT NULL UNIQUE,
+    video_id  TEXT NOT NULL,
+    text      TEXT NOT NULL,
+    start     REAL,
+    "end"     REAL
+);
+CREATE INDEX IF NOT EXISTS chunks_video ON chunks (video_id);
+CREATE TABLE IF NOT EXISTS terms (
+    term  TEXT PRIMARY KEY,
+    df    INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    text, content='chunks', content_rowid='rowid',
+    tokenize="unicode61 remove_diacritics 2 tokenchars '_'"
+);
+"""
+
+# Words too common to rank anything
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i if in into is it its me my no not of on or our
+she so than that the their them then there these they this to was we were what when where which who why will
+with you your do does did can could would should how about just like
+""".split())
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Bumped when _words() changes, so `terms` is rebuilt from the stored chunks
+SCHEMA_VERSION = 1
+
+def _fold(text):
+    text = text.lower()
+    if text.isascii():
+        return text
+    # Like unicode61's remove_diacritics 2: only marks on Latin letters (up to U+024F) go
+    chars = []
+    for c in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(c) and chars and chars[-1] <= "\u024f":
+            continue
+        chars.append(c)
+    return unicodedata.normalize("NFC", "".join(chars))
+
+def _words(text):
+    return _WORD.findall(_fold(text))
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+def _hit(chunk_id, video_id, text, start, end, score):
+    metadata = {"video_id": video_id, "kind": "chunk"}
+    if start is not None:
+        metadata.update(start=start, end=end)
+    return {"id": chunk_id, "text": text, "metadata": metadata, "score": score}
+
+class LexicalIndex:
+    """
+    Incrementally updated BM25 index. Thread-safe: writes go through one
+    connection under a lock, like ResponseCache; searches borrow read-only
+    connections from a small pool, so they run in parallel (WAL lets
+    readers proceed alongside a writer).
+    """
+
+    def __init__(self, path=LEXICAL_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._idle_readers = queue.LifoQueue()
+        self._readers_lock = threading.Lock()
+        self._closed = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._rebuild_terms()
+
+    def _rebuild_terms(self):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("DELETE FROM terms")
+            self._conn.execute("DELETE FROM stats")
+            cursor = self._conn.execute("SELECT text FROM chunks")
+            while True:
+                texts = [row[0] for row in cursor.fetchmany(1000)]
+                if not texts:
+                    break
+                self._update_stats(texts, 1)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    @contextmanager
+    def _reader(self):
+        # As many connections as there have been concurrent searches
+        try:
+            conn = self._idle_readers.get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA query_only=ON")
+        try:
+            yield conn
+        finally:
+            # Not self._lock: a search must never wait behind a write
+            with self._readers_lock:
+                if self._closed:
+                    conn.close()
+                else:
+                    self._idle_readers.put(conn)
+
+    def _update_stats(self, texts, sign):
+        words = [_words(text) for text in texts]
+        counts = Counter(term for chunk_words in words for term in set(chunk_words))
+        self._conn.executemany(
+            "INSERT INTO terms (term, df) VALUES (?, ?) ON CONFLICT (term) DO UPDATE SET df = df + excluded.df",
+            [(term, sign * n) for term, n in counts.items()],
+        )
+        if sign < 0:
+            self._conn.executemany("DELETE FROM terms WHERE term = ? AND df <= 0", [(term,) for term in counts])
+        self._conn.executemany(
+            "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = value + excluded.value",
+            [("chunks", sign * len(texts)), ("tokens", sign * sum(len(w) for w in words))],
+        )
+
+    def _delete_video(self, video_id):
+        texts = [row[0] for row in self._conn.execute("SELECT text FROM chunks WHERE video_id = ?", (video_id,))]
+        if not texts:
+            return
+        self._update_stats(texts, -1)
+        # External-content FTS5 needs the old values to remove a row's postings
+        self._conn.execute(
+            "INSERT INTO chunks_fts (chunks_fts, rowid, text) "
+            "SELECT 'delete', rowid, text FROM chunks WHERE video_id = ?", (video_id,)
+        )
+        self._conn.execute("DELETE FROM chunks WHERE video_id = ?", (video_id,))
+
+    @traced("lexical.add")
+    def add_chunks(self, video_id, chunks):
+        """
+        Replace a video's chunks. Ids match add_chunks_to_collection's, so
+        hits from both indexes can be fused.
+
+        Args:
+            chunks (list): {"text", "start", "end"} dicts from utils.chunking
+        """
+        current_span().set(items=len(chunks))
+        rows = [
+            (f"{video_id}:chunk:{i}", video_id, chunk["text"], chunk.get("start"), chunk.get("end"))
+            for i, chunk in enumerate(chunks)
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._delete_video(video_id)
+                self._update_stats([row[2] for row in rows], 1)
+                for row in rows:
+                    cursor = self._conn.execute(
+                        'INSERT INTO chunks (chunk_id, video_id, text, start, "end") VALUES (?, ?, ?, ?, ?)', row
+                    )
+                    self._conn.execute(
+                        "INSERT INTO chunks_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, row[2])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete_video(self, video_id):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._delete_video(video_id)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _document_frequencies(conn, text):
+        # Rarest first; words that were never indexed can't match anything
+        terms = list({term for term in _words(text) if term not in STOPWORDS})
+        if not terms:
+            return []
+        return conn.execute(
+            f"SELECT term, df FROM terms WHERE term IN ({', '.join('?' * len(terms))}) ORDER BY df", terms
+        ).fetchall()
+
+    @traced("lexical.query")
+    def search(self, text, top_k=10, video_id=None, start=None, end=None):
+        """
+        Best BM25 matches for `text`.
+
+        Args:
+            video_id (str or list): Only search this video (or these videos)
+            start, end (float): Only return chunks overlapping this range, in seconds
+
+        Returns:
+            list: Hits shaped like vectorstore.search's (id, text, metadata),
+                with `score` (higher is better) instead of a distance
+        """
+        with self._reader() as conn:
+            # One read transaction, so the statistics and rows come from the same snapshot
+            conn.execute("BEGIN")
+            try:
+                frequencies = self._document_frequencies(conn, text)
+                if not frequencies:
+                    return []
+                if video_id is not None:
+                    hits = self._search_videos(conn, frequencies, video_id, start, end, top_k)
+                else:
+                    hits = self._search_all(conn, frequencies, start, end, top_k)
+            finally:
+                conn.execute("COMMIT")
+        current_span().set(items=len(hits))
+        return hits
+
+    def _search_videos(self, conn, frequencies, video_id, start, end, top_k):
+        stats = dict(conn.execute("SELECT key, value FROM stats").fetchall())
+        n = stats.get("chunks", 0)
+        avgdl = stats.get("tokens", 0) / n if n else 1.0
+        idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in frequencies}
+
+        video_ids = [video_id] if isinstance(video_id, str) else list(video_id)
+        sql = (f'SELECT chunk_id, video_id, text, start, "end" FROM chunks '
+               f"WHERE video_id IN ({', '.join('?' * len(video_ids))})")
+        params = list(video_ids)
+        sql, params = self._time_filter(sql, params, start, end, prefix="")
+
+        scored = []
+        for row in conn.execute(sql, params):
+            words = _words(row[2])
+            tf = Counter(word for word in words if word in idf)
+            if not tf:
+                continue
+            norm = K1 * (1 - B + B * len(words) / avgdl)
+            score = sum(idf[term] * f * (K1 + 1) / (f + norm) for term, f in tf.items())
+            scored.append((score, row))
+        return [_hit(*row, score) for score, row in heapq.nlargest(top_k, scored, key=lambda item: item[0])]
+
+    def _search_all(self, conn, frequencies, start, end, top_k):
+        terms, postings = [], 0
+        for term, df in frequencies:
+            if terms and postings + df > MAX_POSTINGS:
+                break
+            terms.append(term)
+            postings += df
+
+        sql = ('SELECT c.chunk_id, c.video_id, c.text, c.start, c."end", bm25(chunks_fts) AS score '
+               "FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid WHERE chunks_fts MATCH ?")
+        params = [" OR ".join(_quote(term) for term in terms)]
+        sql, params = self._time_filter(sql, params, start, end, prefix="c.")
+        sql += " ORDER BY score LIMIT ?"
+        params.append(top_k)
+        # FTS5's bm25() is negated so that smaller sorts first
+        return [_hit(*row[:5], -row[5]) for row in conn.execute(sql, params).fetchall()]
+
+    @staticmethod
+    def _time_filter(sql, params, start, end, prefix):
+        if start is not None:
+            sql += f' AND {prefix}"end" >= ?'
+            params.append(float(start))
+        if end is not None:
+            sql += f" AND {prefix}start <= ?"
+            params.append(float(end))
+        return sql, params
+
+    def count(self):
+        with self._reader() as conn:
+            row = conn.execute("SELECT value FROM stats WHERE key = 'chunks'").fetchone()
+        return row[0] if row else 0
+
+    def close(self):
+        with self._readers_lock:
+            self._closed = True
+            while not self._idle_readers.empty():
+                self._idle_readers.get_nowait().close()
+        with self._lock:
+            self._conn.close()
+
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+def get_lexical_index():
+    global _lexical_index
+    with _lexical_index_lock:
+        if _lexical_index is None:
+            _lexical_index = LexicalIndex()
+        return _lexical_index
@@ -0,0 +1,191 @@
+import json
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from utils.tracing import span
+
+load_dotenv()
+
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+DEFAULT_MODEL = "llama-3.3-70b-versatile"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+class LLMError(RuntimeError):
+    def __init__(self, message, status_code=None, body=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+def _retry_after(response):
+    # Retry-After is either a number of seconds or an HTTP date
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class GroqClient:
+    """
+    Shared client for Groq's OpenAI-compatible chat endpoint.
+
+    Keeps a keep-alive connection pool, caps in-flight requests with a
+    semaphore, retries 429/5xx and connection errors with jittered
+    exponential backoff (honouring Retry-After), and can stream tokens.
+    """
+
+    def __init__(self, api_key=None, api_url=GROQ_API_URL, model=DEFAULT_MODEL, max_concurrency=4,
+                 max_retries=5, backoff_base=0.5, backoff_cap=30.0, timeout=(5, 120)):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        self.api_url = api_url
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(10, max_concurrency))
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        })
+
+    def _backoff(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _post(self, payload, stream=False):
+        """
+        POST with retries. The caller must hold the semaphore and close the response.
+        """
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(self.api_url, json=payload, stream=stream, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise LLMError(f"Groq request failed: {e}") from e
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 200:
+                return response
+            if response.status_code in RETRY_STATUS and attempt < self.max_retries:
+                delay = self._backoff(attempt, _retry_after(response))
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            body = response.text
+            response.close()
+            raise LLMError(f"Groq API error {response.status_code}: {body}", response.status_code, body)
+
+    def _payload(self, messages, max_tokens, temperature, model, stream):
+        return {
+            "model": model or self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream,
+        }
+
+    def chat(self, messages, max_tokens=300, temperature=0.3, model=None):
+        """
+        Run a chat completion and return the reply text.
+
+        Raises:
+            LLMError: On a non-retryable error or when retries are exhausted
+        """
+        with span("llm.chat", model=model or self.model, max_tokens=max_tokens) as s, self._semaphore:
+            response = self._post(self._payload(messages, max_tokens, temperature, model, False))
+            try:
+                result = response.json()
+                usage = result.get("usage") or {}
+                s.set(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"))
+                return result["choices"][0]["message"]["content"].strip()
+            finally:
+                response.close()
+
+    @staticmethod
+    def _deltas(response, trace):
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                return
+            chunk = json.loads(data)
+            if chunk.get("error"):
+                # Errors after the stream has started arrive as an event, not a status code
+                error = chunk["error"]
+                message = error.get("message") if isinstance(error, dict) else error
+                raise LLMError(f"Groq stream error: {message}", body=data)
+            # Groq puts usage on the last chunk under x_groq; OpenAI-style servers at the top level
+            usage = chunk.get("usage") or (chunk.get("x_groq") or {}).get("usage")
+            if usage:
+                trace.set(prompt_tokens=usage.get("prompt_tokens"),
+                          completion_tokens=usage.get("completion_tokens"))
+            if not chunk.get("choices"):
+                continue
+            delta = chunk["choices"][0].get("delta", {}).get("content")
+            if delta:
+                yield delta
+
+    def stream_chat(self, messages, max_tokens=300, temperature=0.3, model=None):
+        """
+        Run a chat completion and yield content deltas as they arrive (SSE).
+
+        Works with st.write_stream. The concurrency slot is held until the
+        stream is exhausted or closed.
+
+        Raises:
+            LLMError: On a failed request, a dropped or garbled stream, or an error event
+        """
+        trace = span("llm.stream", model=model or self.model, max_tokens=max_tokens)
+        self._semaphore.acquire()
+        try:
+            with trace:
+                response = self._post(self._payload(messages, max_tokens, temperature, model, True), stream=True)
+                try:
+                    yield from self._deltas(response, trace)
+                except (requests.RequestException, ValueError) as e:
+                    # A dropped connection or a garbled event after the 200
+                    raise LLMError(f"Groq stream failed: {e}") from e
+                finally:
+                    response.close()
+        finally:
+            self._semaphore.release()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Process-wide GroqClient so every LLM call shares one connection pool.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GroqClient(max_concurrency=int(os.getenv("GROQ_MAX_CONCURRENCY", "4")))
+        return _client
@@ -0,0 +1,150 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.chunking import format_timestamp
+from utils.llm import get_client
+from utils.tracing import bind_span
+
+# Rough token estimate for English transcripts; good enough to stay under the context limit
+CHARS_PER_TOKEN = 4
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+MAP_MAX_TOKENS = 400
+MAX_WORKERS = int(os.getenv("SUMMARY_MAP_WORKERS", "8"))
+
+MAP_PROMPT = """
+You are reading part {part} of {total} of a YouTube video transcript.
+{instruction}
+
+Transcript section:
+{text}
+
+Notes:
+"""
+
+REDUCE_PROMPT = """
+Below are notes written about consecutive parts of one YouTube video.
+Merge them into a single set of notes in the same order, removing repetition
+but keeping every distinct point{keep_timestamps}.
+
+Notes:
+{text}
+
+Merged notes:
+"""
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def timestamped_lines(words, line_sec=30):
+    """
+    Group word timestamps into "[mm:ss] ..." lines so prompts can cite times.
+    """
+    lines = []
+    current = []
+    line_start = None
+    for word in words:
+        if line_start is None:
+            line_start = word["start"]
+        current.append(word["text"])
+        if word["end"] - line_start >= line_sec * 1000:
+            lines.append(f"[{format_timestamp(line_start / 1000)}] {' '.join(current)}")
+            current, line_start = [], None
+    if current:
+        lines.append(f"[{format_timestamp(line_start / 1000)}] {' '.join(current)}")
+    return lines
+
+def split_units(text):
+    """
+    Split plain text into sentence-ish units so chunks don't cut words in half.
+    """
+    units = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        start = 0
+        for i, ch in enumerate(line):
+            if ch in ".?!" and (i + 1 == len(line) or line[i + 1] == " "):
+                units.append(line[start:i + 1].strip())
+                start = i + 1
+        if line[start:].strip():
+            units.append(line[start:].strip())
+    return units
+
+def pack(units, budget_tokens):
+    """
+    Greedily pack units into chunks of at most `budget_tokens`; an oversized
+    unit is split by characters.
+    """
+    max_chars = budget_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+    for unit in units:
+        while len(unit) > max_chars:
+            if current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            chunks.append(unit[:max_chars])
+            unit = unit[max_chars:]
+        if size + len(unit) + 1 > max_chars and current:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(unit)
+        size += len(unit) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def _parallel_chat(prompts, max_tokens, temperature, max_workers):
+    # GroqClient's semaphore and 429 backoff keep this within the rate limit
+    client = get_client()
+    messages = [[{"role": "user", "content": prompt}] for prompt in prompts]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+        return list(pool.map(
+            bind_span(lambda m: client.chat(m, max_tokens=max_tokens, temperature=temperature)), messages
+        ))
+
+def condense(text_units, instruction, keep_timestamps=False, chunk_tokens=CHUNK_TOKENS,
+             map_max_tokens=MAP_MAX_TOKENS, temperature=0.3, max_workers=MAX_WORKERS):
+    """
+    Map-reduce a long transcript down to notes that fit in one prompt.
+
+    The transcript is packed into chunks of `chunk_tokens`, each chunk is
+    summarized concurrently (map), and the notes are merged in groups until
+    they fit in a single chunk (hierarchical reduce). The caller runs its
+    usual final prompt on the result.
+
+    Args:
+        text_units (list): Sentences or "[mm:ss] ..." lines, in order
+        instruction (str): What the map step should extract from each section
+
+    Returns:
+        str: Notes no longer than `chunk_tokens`
+
+    Raises:
+        LLMError: If a map or reduce call fails after retries
+    """
+    chunks = pack(text_units, chunk_tokens)
+    if len(chunks) <= 1:
+        return chunks[0] if chunks else ""
+
+    prompts = [
+        MAP_PROMPT.format(part=i + 1, total=len(chunks), instruction=instruction, text=chunk)
+        for i, chunk in enumerate(chunks)
+    ]
+    notes = _parallel_chat(prompts, map_max_tokens, temperature, max_workers)
+
+    suffix = ", and the [mm:ss] timestamps" if keep_timestamps else ""
+    while estimate_tokens("\n\n".join(notes)) > chunk_tokens:
+        groups = pack(notes, chunk_tokens)
+        if len(groups) >= len(notes):
+            # Each note is already a full chunk; truncating is the only way forward
+            notes = [note[:chunk_tokens * CHARS_PER_TOKEN // len(notes)] for note in notes]
+            break
+        prompts = [REDUCE_PROMPT.format(keep_timestamps=suffix, text=group) for group in groups]
+        notes = _parallel_chat(prompts, map_max_tokens * 2, temperature, max_workers)
+    return "\n\n".join(notes)
+
+def needs_map_reduce(text, chunk_tokens=CHUNK_TOKENS):
+    return estimate_tokens(text) > chunk_tokens
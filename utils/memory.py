@@ -0,0 +1,129 @@
+import os
+
+from utils.llm import get_client, LLMError
+from utils.mapreduce import CHARS_PER_TOKEN, estimate_tokens
+from utils.tracing import traced
+
+# Budget for the verbatim turns (with the context each was answered from)
+HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "2000"))
+# Turns kept word for word; older ones are folded into the running summary
+KEEP_TURNS = int(os.getenv("CHAT_KEEP_TURNS", "3"))
+SUMMARY_MAX_TOKENS = 250
+# Per-message overhead of the chat format (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """
+You keep a running summary of a conversation about a YouTube video.
+Update the summary with the new exchanges below. Keep the facts, names,
+numbers and timestamps the user may refer back to, and drop small talk.
+Reply with the updated summary only, in at most {max_words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Updated summary:
+"""
+
+def _message_tokens(message):
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+class ChatMemory:
+    """
+    Conversation memory for the chat tab with a bounded prompt size.
+
+    The last `keep_turns` turns are sent verbatim, together with the context
+    each one was answered from, as long as they fit in `history_tokens`.
+    Older turns are folded into a rolling summary, one LLM call per fold,
+    that starts from the previous summary instead of the whole history.
+    Retrieved chunks that are still visible in the verbatim turns are not
+    sent again (see fresh_hits).
+
+    A prompt is therefore at most: summary + history_tokens + new context.
+    """
+
+    def __init__(self, history_tokens=HISTORY_TOKENS, keep_turns=KEEP_TURNS, summary_max_tokens=SUMMARY_MAX_TOKENS):
+        self.history_tokens = history_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summary_max_tokens = summary_max_tokens
+        self.summary = ""
+        self.turns = []  # {"question", "messages", "chunk_ids"}
+        self.summarized_turns = 0
+
+    def fresh_hits(self, hits):
+        """
+        Drop hits whose chunk is already in a verbatim turn's context.
+        """
+        seen = {chunk_id for turn in self.turns for chunk_id in turn["chunk_ids"]}
+        return [hit for hit in hits if hit["id"] not in seen]
+
+    def messages(self):
+        """
+        Messages to send before the new question: the summary as a system
+        message, then the verbatim turns.
+        """
+        messages = []
+        if self.summary:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary}"})
+        for turn in self.turns:
+            messages += turn["messages"]
+        return messages
+
+    def tokens(self):
+        return sum(_message_tokens(m) for m in self.messages())
+
+    def record(self, question, prompt, answer, chunk_ids=()):
+        """
+        Add a finished turn.
+
+        Args:
+            question (str): What the user asked, for the summary
+            prompt (str): The user message that was sent, including its context
+            answer (str): The assistant's reply
+            chunk_ids (iterable): Ids of the chunks in the prompt's context
+        """
+        self.turns.append({
+            "question": question,
+            "messages": [{"role": "user", "content": prompt}, {"role": "assistant", "content": answer}],
+            "chunk_ids": list(chunk_ids),
+        })
+        self._fold()
+
+    def _turns_tokens(self):
+        return sum(_message_tokens(m) for turn in self.turns for m in turn["messages"])
+
+    def _fold(self):
+        folded = []
+        while len(self.turns) > self.keep_turns or (len(self.turns) > 1 and self._turns_tokens() > self.history_tokens):
+            folded.append(self.turns.pop(0))
+        if folded:
+            self.summary = self._summarize(folded)
+            self.summarized_turns += len(folded)
+
+        # A single turn over budget (a very long context): keep the exchange, drop its context
+        turn = self.turns[-1]
+        if self._turns_tokens() > self.history_tokens and turn["chunk_ids"]:
+            turn["messages"][0] = {"role": "user", "content": turn["question"]}
+            turn["chunk_ids"] = []
+
+    @traced("chat.summarize")
+    def _summarize(self, turns):
+        exchanges = "\n\n".join(
+            f"User: {turn['question']}\nAssistant: {turn['messages'][1]['content']}" for turn in turns
+        )
+        prompt = SUMMARY_PROMPT.format(
+            max_words=self.summary_max_tokens * 3 // 4,
+            summary=self.summary or "(none yet)",
+            turns=exchanges,
+        )
+        try:
+            return get_client().chat([{"role": "user", "content": prompt}], max_tokens=self.summary_max_tokens,
+                                     temperature=0.0).strip()
+        except LLMError as e:
+            # Keep going without the model: append the questions and cut to the budget
+            print(f"⚠️ Could not summarize the chat history: {e}")
+            questions = " ".join(f"Asked: {turn['question']}" for turn in turns)
+            text = f"{self.summary} {questions}".strip()
+            return text[-self.summary_max_tokens * CHARS_PER_TOKEN:]
@@ -0,0 +1,122 @@
+import os
+import threading
+
+import numpy as np
+
+ONNX_DIR = os.getenv("CLIP_ONNX_DIR", "models/clip-onnx")
+VISION_FILE = "vision.onnx"
+TEXT_FILE = "text.onnx"
+
+_export_lock = threading.Lock()
+
+def _model_paths(output_dir, quantized):
+    suffix = ".int8.onnx" if quantized else ".onnx"
+    return (
+        os.path.join(output_dir, VISION_FILE.replace(".onnx", suffix)),
+        os.path.join(output_dir, TEXT_FILE.replace(".onnx", suffix)),
+    )
+
+def export_clip_onnx(output_dir=ONNX_DIR, quantize=False):
+    """
+    Export CLIP's image and text towers (projection included) to ONNX, with
+    dynamic batch and sequence axes. With quantize=True the fp32 graphs are
+    also written as dynamically quantized int8 copies.
+
+    Returns:
+        (vision_path, text_path) of the requested variant
+    """
+    import torch
+
+    from utils.embeddings import get_clip
+
+    os.makedirs(output_dir, exist_ok=True)
+    vision_path, text_path = _model_paths(output_dir, quantized=False)
+    model, processor = get_clip()
+
+    class Vision(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, pixel_values):
+            return self.clip.get_image_features(pixel_values=pixel_values)
+
+    class Text(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, input_ids, attention_mask):
+            return self.clip.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    if not os.path.exists(vision_path):
+        size = processor.image_processor.crop_size["height"]
+        dummy = torch.zeros(1, 3, size, size)
+        torch.onnx.export(
+            Vision(model).eval(), (dummy,), vision_path, opset_version=17,
+            input_names=["pixel_values"], output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+        )
+        print(f"📦 Exported CLIP vision tower to {vision_path}")
+
+    if not os.path.exists(text_path):
+        tokens = processor(text=["a photo"], return_tensors="pt", padding=True)
+        torch.onnx.export(
+            Text(model).eval(), (tokens["input_ids"], tokens["attention_mask"]), text_path, opset_version=17,
+            input_names=["input_ids", "attention_mask"], output_names=["text_embeds"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "text_embeds": {0: "batch"},
+            },
+        )
+        print(f"📦 Exported CLIP text tower to {text_path}")
+
+    if not quantize:
+        return vision_path, text_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_paths = _model_paths(output_dir, quantized=True)
+    for source, target in zip((vision_path, text_path), int8_paths):
+        if not os.path.exists(target):
+            quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+            print(f"📦 Quantized {source} -> {target}")
+    return int8_paths
+
+class OnnxClip:
+    """
+    ONNX Runtime inference backend for CLIP on CPU. Same interface as
+    TorchClip: NumPy inputs from the CLIP processor, unnormalized features out.
+    """
+
+    def __init__(self, vision_path, text_path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        providers = ["CPUExecutionProvider"]
+        self.vision = ort.InferenceSession(vision_path, options, providers=providers)
+        self.text = ort.InferenceSession(text_path, options, providers=providers)
+
+    @classmethod
+    def load(cls, output_dir=ONNX_DIR, quantized=False, num_threads=None):
+        """
+        Open the exported models, exporting (and quantizing) them on first use.
+        """
+        vision_path, text_path = _model_paths(output_dir, quantized)
+        if not (os.path.exists(vision_path) and os.path.exists(text_path)):
+            with _export_lock:
+                export_clip_onnx(output_dir, quantize=quantized)
+        return cls(vision_path, text_path, num_threads=num_threads)
+
+    def image_features(self, pixel_values):
+        return self.vision.run(None, {"pixel_values": pixel_values.astype(np.float32)})[0]
+
+    def text_features(self, input_ids, attention_mask):
+        return self.text.run(None, {
+            "input_ids": input_ids.astype(np.int64),
+            "attention_mask": attention_mask.astype(np.int64),
+        })[0]
@@ -0,0 +1,408 @@
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from utils.downloader import download_video_audio, fetch_video_info
+from utils.audio import extract_audio
+from utils.transcribe import transcribe as transcribe_audio, TranscriptionError
+from utils.frames import sample_frames
+from utils.frame_filters import get_frame_filter, filter_frames
+from utils.embeddings import get_clip_embeddings, get_text_embedding, get_text_embeddings
+from utils.chunking import chunk_transcript
+from utils.fusion import fuse_embeddings
+from utils.storage import (
+    save_video_metadata, load_video_artifacts, VIDEO_EMBEDDING_FILE, FRAME_EMBEDDINGS_FILE, FRAME_TIMESTAMPS_FILE,
+)
+from utils.vectorstore import get_or_create_collection, add_video_to_collection, add_chunks_to_collection
+from utils.frame_search import get_frame_index
+from utils.lexical_index import get_lexical_index
+from utils.tracing import current_span, span, traced, traced_submit
+from utils.cache import StageCache, canonical_video_id, file_digest, hash_inputs
+
+TRANSCRIBE_BACKEND = os.getenv("TRANSCRIBE_BACKEND", "assemblyai")
+
+STAGE_VERSIONS = {
+    "info": "yt-dlp-info/v1",
+    "download": "yt-dlp-best-mp4/v1",
+    "download-audio": "yt-dlp-bestaudio/v1",
+    "audio": "ffmpeg-speech-16k-mono/v2",
+    "transcript": "words-segmented/v4",
+    "chunks": "words-45s-10s/clip-vit-base-patch32/v1",
+    "frames": "seek-5s-phash/clip-vit-base-patch32/v2",
+    "fusion": "mean-chunks/clip-vit-base-patch32/v2",
+}
+
+# Stages in the order they are reported; audio/transcript and frames run side by side
+STAGES = ["download", "audio", "transcript", "chunks", "frames", "fusion", "index"]
+
+class IngestCancelled(RuntimeError):
+    pass
+
+def transcribe_with_words(audio_path, cancel=None):
+    return transcribe_audio(audio_path, backend=TRANSCRIBE_BACKEND, cancel=cancel)
+
+transcribe_with_words.backend_name = TRANSCRIBE_BACKEND
+
+class _Progress:
+    """
+    Collects stage events from worker threads so they can be replayed on the
+    caller's thread (Streamlit only renders from the script thread).
+
+    `stop` is set when the run ends early (cancelled or failed), so the
+    branch still running gives up at its next check.
+    """
+
+    def __init__(self, cancel=None):
+        self.events = queue.Queue()
+        self.started = {}
+        self.timings = {}
+        self.cancel = cancel
+        self.stop = threading.Event()
+
+    def check(self):
+        if self.stop.is_set() or (self.cancel is not None and self.cancel.is_set()):
+            raise IngestCancelled("Ingestion cancelled")
+
+    def start(self, stage):
+        # Stage boundaries are where a cancelled run stops, on either branch
+        self.check()
+        self.started[stage] = time.perf_counter()
+        self.events.put((stage, "running", None))
+
+    def done(self, stage, cached=False):
+        self.timings[stage] = time.perf_counter() - self.started.get(stage, time.perf_counter())
+        self.events.put((stage, "cached" if cached else "done", self.timings[stage]))
+
+    def drain(self, callback):
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                return
+            if callback:
+                callback(*event)
+
+def stage_download(cache, url, audio_only=False):
+    stage = "download-audio" if audio_only else "download"
+    download, cached = cache.run(
+        stage, {"video_id": cache.video_id}, STAGE_VERSIONS[stage],
+        lambda: {"video_path": download_video_audio(url, audio_only=audio_only)[0]},
+        files=lambda out: [out["video_path"]],
+    )
+    return download["video_path"], cached
+
+def stage_info(cache, url):
+    """
+    Title, channel and duration from a metadata-only request (no media).
+    Returns {} if the lookup fails, since the title is only cosmetic.
+    """
+    try:
+        info, _ = cache.run("info", {"video_id": cache.video_id}, STAGE_VERSIONS["info"],
+                            lambda: fetch_video_info(url))
+    except Exception as e:
+        print(f"⚠️ Could not fetch video info for {cache.video_id}: {e}")
+        return {}
+    return info
+
+def stage_audio(cache, media_path):
+    def extract():
+        audio_path = extract_audio(media_path, cache.video_dir)
+        return {
+            "audio_path": audio_path,
+            "source_bytes": os.path.getsize(media_path),
+            "audio_bytes": os.path.getsize(audio_path),
+        }
+
+    audio, cached = cache.run(
+        "audio", {"media": file_digest(media_path)}, STAGE_VERSIONS["audio"],
+        extract, files=lambda out: [out["audio_path"]],
+    )
+    return audio["audio_path"], cached
+
+def stage_transcript(cache, audio_path, transcribe=transcribe_with_words, cancel=None):
+    """
+    Args:
+        cancel (threading.Event): Passed on to `transcribe` so it can stop polling
+
+    Returns:
+        (dict, bool): {"text", "words"} (words may be empty) and whether it was cached
+    """
+    transcript_path = cache.path("transcript.json")
+
+    def run_transcription():
+        if cancel is not None:
+            transcription_result = transcribe(audio_path, cancel=cancel)
+        else:
+            transcription_result = transcribe(audio_path)
+        if not transcription_result:
+            raise TranscriptionError("Transcription failed.")
+        if isinstance(transcription_result, str):
+            transcription_result = {"text": transcription_result, "words": []}
+        with open(transcript_path, "w") as f:
+            json.dump(transcription_result, f)
+        return {"transcript_path": transcript_path}
+
+    inputs = {"audio": file_digest(audio_path), "backend": getattr(transcribe, "backend_name", transcribe.__name__)}
+    _, cached = cache.run("transcript", inputs, STAGE_VERSIONS["transcript"],
+                          run_transcription, files=[transcript_path])
+    with open(transcript_path) as f:
+        return json.load(f), cached
+
+def stage_chunks(cache, transcript):
+    """
+    Split the transcript into overlapping time-aligned windows and embed them in batches.
+
+    Returns:
+        (list, np.ndarray, bool): Chunks, their (N, 512) embeddings and whether they were cached
+    """
+    chunks_path = cache.path("chunks.json")
+    embeddings_path = cache.path("chunk_embeddings.npy")
+
+    def embed_chunks():
+        chunks = chunk_transcript(transcript)
+        with open(chunks_path, "w") as f:
+            json.dump(chunks, f)
+        np.save(embeddings_path, get_text_embeddings([chunk["text"] for chunk in chunks]))
+        return {"count": len(chunks)}
+
+    _, cached = cache.run("chunks", {"transcript": hash_inputs(transcript)}, STAGE_VERSIONS["chunks"],
+                          embed_chunks, files=[chunks_path, embeddings_path])
+    with open(chunks_path) as f:
+        chunks = json.load(f)
+    return chunks, np.load(embeddings_path), cached
+
+def _checked(items, checkpoint):
+    for item in items:
+        checkpoint()
+        yield item
+
+def stage_frames(cache, video_path, interval_sec=5, frame_filter="phash", checkpoint=None):
+    """
+    Sample, dedupe and CLIP-embed frames, keeping each kept frame's timestamp.
+    `checkpoint` is called for every sampled frame and CLIP batch; raise
+    from it to stop early.
+
+    Returns:
+        (str, dict, bool): Path of the (N, 512) frame matrix (frame_timestamps.npy
+            sits next to it), frame stats and whether they were cached
+    """
+    frames_path = cache.path(FRAME_EMBEDDINGS_FILE)
+    timestamps_path = cache.path(FRAME_TIMESTAMPS_FILE)
+
+    def embed_frames():
+        frame_stats = {}
+        with span("frames.sample", interval_sec=interval_sec, filter=frame_filter) as s:
+            sampled = sample_frames(video_path, interval_sec=interval_sec, min_side=224)
+            if checkpoint:
+                sampled = _checked(sampled, checkpoint)
+            kept = list(filter_frames(sampled, get_frame_filter(frame_filter), frame_stats))
+            s.set(items=len(kept), skipped=frame_stats["frames_skipped"])
+        np.save(timestamps_path, np.asarray([ts for ts, _ in kept], dtype=np.float32))
+        np.save(frames_path, get_clip_embeddings([frame for _, frame in kept], checkpoint=checkpoint))
+        return frame_stats
+
+    inputs = {"video": file_digest(video_path), "interval_sec": interval_sec, "filter": frame_filter}
+    frame_stats, cached = cache.run("frames", inputs, STAGE_VERSIONS["frames"], embed_frames,
+                                    files=[frames_path, timestamps_path])
+    return frames_path, frame_stats, cached
+
+def stage_fusion(cache, text, frames_path, chunk_embeddings=None):
+    """
+    Average the text vector with the frame vectors; frames_path=None fuses text only.
+    """
+    fused_path = cache.path(VIDEO_EMBEDDING_FILE)
+    # Memory-mapped: on a cache hit the frame matrix is never read
+    frame_embeddings = np.load(frames_path, mmap_mode="r") if frames_path else []
+
+    def fuse():
+        if chunk_embeddings is not None and len(chunk_embeddings):
+            # Cover the whole transcript rather than its first ~77 tokens
+            text_embedding = np.mean(chunk_embeddings, axis=0)
+            text_embedding /= np.linalg.norm(text_embedding)
+        else:
+            text_embedding = get_text_embedding(text)
+        np.save(fused_path, fuse_embeddings(text_embedding, frame_embeddings))
+        return {"fused_path": fused_path}
+
+    frames_hash = file_digest(frames_path) if frames_path else None
+    _, cached = cache.run("fusion", {"text": hash_inputs(text), "frames": frames_hash},
+                          STAGE_VERSIONS["fusion"], fuse, files=[fused_path])
+    return np.load(fused_path), cached
+
+def video_metadata(url, text, frame_stats, info=None):
+    info = info or {}
+    return {
+        "url": url,
+        "text": text,
+        "title": info.get("title") or "Unknown Title",
+        "channel": info.get("channel") or "",
+        "duration": info.get("duration") or 0,
+        "frames_kept": frame_stats["frames_kept"],
+        "frames_skipped": frame_stats["frames_skipped"]
+    }
+
+def _transcript_branch(cache, video_path, transcribe, progress):
+    progress.start("audio")
+    audio_path, cached = stage_audio(cache, video_path)
+    progress.done("audio", cached)
+
+    progress.start("transcript")
+    transcript, cached = stage_transcript(cache, audio_path, transcribe, cancel=progress.stop)
+    progress.done("transcript", cached)
+
+    progress.start("chunks")
+    chunks, chunk_embeddings, cached = stage_chunks(cache, transcript)
+    progress.done("chunks", cached)
+    return audio_path, transcript, chunks, chunk_embeddings
+
+def _visual_branch(cache, video_path, interval_sec, frame_filter, progress):
+    progress.start("frames")
+    frames_path, frame_stats, cached = stage_frames(cache, video_path, interval_sec, frame_filter,
+                                                    checkpoint=progress.check)
+    progress.done("frames", cached)
+    return frames_path, frame_stats
+
+@traced("ingest")
+def run_ingest(url, progress=None, transcribe=transcribe_with_words, interval_sec=5, frame_filter="phash",
+               visual=True, cancel=None):
+    """
+    Ingest a video, overlapping transcription with frame extraction + CLIP.
+
+    After the download, audio extraction and transcription (mostly waiting on
+    the API) run on one worker while frame sampling and CLIP run on another.
+    The two branches join at fusion, so latency is about max(transcribe, visual).
+
+    Args:
+        url (str): YouTube URL
+        progress (callable): Called as progress(stage, status, seconds) on the
+            caller's thread; status is "running", "done" or "cached"
+        transcribe (callable): audio_path -> transcript text or {"text", "words"}
+        interval_sec (float): Seconds between sampled frames
+        frame_filter (str): Near-duplicate filter name (see utils.frame_filters)
+        visual (bool): False downloads only the audio stream and skips frames/CLIP,
+            for when only the transcript (and text search) is needed
+        cancel (threading.Event): When set, the run stops; the branches check it at
+            stage boundaries, per sampled frame and CLIP batch, and while polling
+            for the transcript
+
+    Returns:
+        dict: video_id, text, video_embedding, frame_stats, paths and per-stage timings
+
+    Raises:
+        TranscriptionError: If the transcription backend returned nothing
+        IngestCancelled: If `cancel` was set before the run finished
+    """
+    video_id = canonical_video_id(url)
+    current_span().set(video_id=video_id, visual=visual)
+    cache = StageCache(video_id)
+    tracker = _Progress(cancel)
+
+    pool = ThreadPoolExecutor(max_workers=3)
+    try:
+        # Metadata-only request for the title, alongside the download
+        info_future = traced_submit(pool, stage_info, cache, url)
+
+        tracker.start("download")
+        video_path, cached = stage_download(cache, url, audio_only=not visual)
+        tracker.done("download", cached)
+        tracker.drain(progress)
+
+        transcript_future = traced_submit(pool, _transcript_branch, cache, video_path, transcribe, tracker)
+        pending = {transcript_future}
+        if visual:
+            visual_future = traced_submit(pool, _visual_branch, cache, video_path, interval_sec, frame_filter, tracker)
+            pending.add(visual_future)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            tracker.drain(progress)
+            tracker.check()
+            for future in done:
+                if future.exception():
+                    raise future.exception()
+        audio_path, transcript, chunks, chunk_embeddings = transcript_future.result()
+        text = transcript["text"]
+        if visual:
+            frames_path, frame_stats = visual_future.result()
+        else:
+            frames_path, frame_stats = None, {"frames_kept": 0, "frames_skipped": 0}
+    except BaseException:
+        # Stop the other branch and wait for it, so a cancelled or failed run
+        # holds its job slot until its work has actually stopped
+        tracker.stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        pool.shutdown(wait=False)
+
+    tracker.start("fusion")
+    video_embedding, cached = stage_fusion(cache, text, frames_path, chunk_embeddings)
+    tracker.done("fusion", cached)
+    tracker.drain(progress)
+
+    tracker.start("index")
+    metadata = video_metadata(url, text, frame_stats, info_future.result())
+    save_video_metadata(video_id, metadata)
+    client, collection = get_or_create_collection()
+    add_video_to_collection(client, collection, video_id, video_embedding, dict(metadata))
+    add_chunks_to_collection(collection, video_id, chunks, chunk_embeddings, metadata)
+    get_lexical_index().add_chunks(video_id, chunks)
+    if frames_path:
+        get_frame_index().add_video(
+            video_id, np.load(frames_path, mmap_mode="r"), np.load(cache.path(FRAME_TIMESTAMPS_FILE), mmap_mode="r")
+        )
+    tracker.done("index")
+    tracker.drain(progress)
+
+    return {
+        "video_id": video_id,
+        "video_path": video_path,
+        "audio_path": audio_path,
+        "text": text,
+        "transcript": transcript,
+        "chunks": chunks,
+        "video_embedding": video_embedding,
+        "frame_stats": frame_stats,
+        "timings": dict(tracker.timings),
+        "cache": cache,
+    }
+
+def reindex_video(video_id, collection=None):
+    """
+    Re-add a stored video and its chunks to the vector store from the saved
+    artifacts, without downloading, transcribing or running CLIP.
+
+    Returns:
+        bool: False if the video has no artifacts or cached transcript chunks
+    """
+    artifacts = load_video_artifacts(video_id)
+    cache = StageCache(video_id)
+    chunks_path = cache.path("chunks.json")
+    embeddings_path = cache.path("chunk_embeddings.npy")
+    transcript_path = cache.path("transcript.json")
+    if artifacts is None or not all(os.path.exists(p) for p in (chunks_path, embeddings_path, transcript_path)):
+        return False
+
+    with open(chunks_path) as f:
+        chunks = json.load(f)
+    with open(transcript_path) as f:
+        text = json.load(f)["text"]
+    metadata = dict(artifacts["metadata"], text=text)
+    metadata = {k: v for k, v in metadata.items() if k not in ("text_chars", "text_sha256")}
+    if metadata.get("title", "Unknown Title") == "Unknown Title" and metadata.get("url"):
+        # Stored before titles were fetched; a metadata-only request fills it in
+        info = stage_info(cache, metadata["url"])
+        if info.get("title"):
+            metadata.update(title=info["title"], channel=info.get("channel") or "", duration=info.get("duration") or 0)
+            save_video_metadata(video_id, metadata)
+
+    if collection is None:
+        _, collection = get_or_create_collection()
+    add_video_to_collection(None, collection, video_id, np.asarray(artifacts["video_embedding"]), dict(metadata))
+    add_chunks_to_collection(collection, video_id, chunks, np.load(embeddings_path, mmap_mode="r"), metadata)
+    get_lexical_index().add_chunks(video_id, chunks)
+    return True
@@ -1,10 +1,22 @@
 import os
-import openai
-from utils.vectorstore import get_or_create_collection
-from app import generate_answer_groq
-import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+from utils.vectorstore import get_or_create_collection, search
+from utils.generation import generate_answer_groq, answer_prompt
+from utils.chunking import format_timestamp
+from utils.lexical_index import get_lexical_index
+from utils.answer_cache import context_key
+from utils.llm import DEFAULT_MODEL
+from utils.tracing import traced, traced_submit
+
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+# Fuse BM25 keyword hits with the vector hits; "0" for vector-only retrieval
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") != "0"
+# Standard reciprocal-rank fusion constant; damps the weight of the very top ranks
+RRF_K = 60
+
+# Keyword searches run here while the caller embeds the question and queries the vector store
+_lexical_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="lexical")
 
 def query_chroma(collection, query_embedding, top_k=3):
     results = collection.query(
@@ -15,6 +27,9 @@ def query_chroma(collection, query_embedding, top_k=3):
     return results
 
 def generate_answer(context_text, question):
+    import openai  # only this legacy helper needs it; keep it off the import path
+
+    openai.api_key = os.getenv("OPENAI_API_KEY")
     prompt = f"""
 You are a helpful assistant. Based on the following context, answer the question:
 
@@ -36,31 +51,124 @@ Answer:
     return response.choices[0].text.strip()
 
 
-def answer_question(collection, question, chat_history):
-    from utils.embeddings import get_text_embedding
+def rrf_fuse(rankings, top_k, k=RRF_K):
+    """
+    Merge ranked hit lists by reciprocal-rank fusion: each hit scores
+    sum(1 / (k + rank)) over the lists it appears in. The first list's copy
+    of a hit is kept, so pass the vector hits first.
+    """
+    scores = {}
+    hits = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit["id"]] = scores.get(hit["id"], 0.0) + 1.0 / (k + rank)
+            hits.setdefault(hit["id"], hit)
+    best = sorted(scores, key=lambda hit_id: -scores[hit_id])[:top_k]
+    return [dict(hits[hit_id], rrf_score=scores[hit_id]) for hit_id in best]
 
-    q_emb = get_text_embedding(question)
-    results = collection.query(
-        query_embeddings=[q_emb.tolist()],
-        n_results=10,
-        include=['documents', 'metadatas', 'distances']
-    )
+def _lexical_hits(future):
+    try:
+        return future.result()
+    except Exception as e:
+        # Keyword search is an extra; answer from the vector hits alone
+        print(f"⚠️ Keyword search failed: {e}")
+        return []
+
+@traced("chat.retrieve")
+def retrieve(collection, questions, video_id=None, top_k=RETRIEVAL_TOP_K, start=None, end=None,
+             hybrid=HYBRID_RETRIEVAL, query_embeddings=None):
+    """
+    Retrieve transcript chunks for one or more questions in a single query.
+
+    Args:
+        questions (str or list): One question, or several to embed and search together
+        video_id (str or list): Only search this video (or these videos); None searches all
+        start, end (float): Only return chunks overlapping this range, in seconds
+        hybrid (bool): Also run a BM25 keyword search (utils.lexical_index) in
+            parallel and fuse both rankings, which finds names and exact phrases
+            that CLIP embeddings miss
+        query_embeddings (np.ndarray): The questions' text embeddings, if already computed
+
+    Returns:
+        list: Hits for a single question, or one list of hits per question
+    """
+    from utils.embeddings import get_text_embeddings
+
+    single = isinstance(questions, str)
+    texts = [questions] if single else list(questions)
+    candidates = top_k * 2 if hybrid else top_k
+    if hybrid:
+        index = get_lexical_index()
+        lexical = [traced_submit(_lexical_pool, index.search, text, candidates, video_id, start, end) for text in texts]
+    embeddings = get_text_embeddings(texts) if query_embeddings is None else query_embeddings
+    hits = search(collection, embeddings, top_k=candidates, video_id=video_id, start=start, end=end)
+    if hybrid:
+        hits = [rrf_fuse([vector_hits, _lexical_hits(future)], top_k) for vector_hits, future in zip(hits, lexical)]
+    return hits[0] if single else hits
+
+def format_context(hits):
+    """
+    Join retrieved chunks into a prompt context, prefixed with their time range.
+    """
+    passages = []
+    for hit in hits:
+        meta = hit["metadata"] or {}
+        text = hit["text"]
+        if meta.get("start") is not None:
+            text = f"[{format_timestamp(meta['start'])}-{format_timestamp(meta['end'])}] {text}"
+        passages.append(text)
+    return "\n\n".join(passages) if passages else "No relevant context found."
+
+def _recorded(chunks, record):
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    record("".join(parts))
+
+def answer_question(collection, question, chat_history=None, video_id=None, top_k=RETRIEVAL_TOP_K, stream=False,
+                    memory=None, cache=None):
+    """
+    Answer a question from retrieved transcript chunks.
+
+    With a ChatMemory (utils.memory), the prior conversation comes from it
+    instead of `chat_history`, chunks it already holds are not sent again,
+    and the finished turn is recorded in it (after the last streamed token).
+
+    With an AnswerCache (utils.answer_cache), a question close enough to an
+    earlier one about the same video, with the same retrieved chunks, gets
+    the stored answer without an LLM call; new answers are stored.
+    """
+    from utils.embeddings import get_text_embeddings
+
+    embedding = get_text_embeddings([question])[0]
+    hits = retrieve(collection, question, video_id=video_id, top_k=top_k, query_embeddings=embedding[None, :])
+    key = context_key(hits, DEFAULT_MODEL) if cache is not None else None
+    cached = cache.get(video_id, key, embedding) if cache is not None else None
 
-    current_vid = st.session_state.video_id
-    filtered_docs = []
+    if memory is None:
+        fresh, history = hits, chat_history or []
+    else:
+        fresh, history = memory.fresh_hits(hits), memory.messages()
+    context = format_context(fresh) if fresh or not hits else "Already given earlier in this conversation."
 
-    for doc_list, meta in zip(results['documents'], results['metadatas']):
-        if meta.get("video_id") == current_vid:
-            if isinstance(doc_list, list):
-                filtered_docs.extend(doc_list)
-            else:
-                filtered_docs.append(doc_list)
+    def record(text):
+        if memory is not None:
+            memory.record(question, answer_prompt(context, question), text, [hit["id"] for hit in fresh])
+        if cache is not None and cached is None and not text.startswith("Failed to generate"):
+            cache.put(video_id, key, question, embedding, text)
 
-    context = "\n\n".join(filtered_docs) if filtered_docs else "No relevant context found."
-    return generate_answer_groq(context, chat_history, question)
+    if cached is not None:
+        answer = iter([cached]) if stream else cached
+    else:
+        answer = generate_answer_groq(context, history, question, stream=stream)
+    if stream:
+        return _recorded(answer, record)
+    record(answer)
+    return answer
 
 if __name__ == "__main__":
-    collection = get_or_create_collection()
+    _, collection = get_or_create_collection()
     print("Enter 'exit' to quit.")
     while True:
         q = input("\n❓ Ask a question: ").strip()
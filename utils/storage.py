@@ -1,18 +1,107 @@
+import hashlib
 import json
+import os
+
 import numpy as np
 
-def save_embedding_to_json(video_id, embedding, metadata):
-    import os, json
-    output_dir = os.path.join("data/videos", video_id)
+from utils.cache import VIDEOS_DIR
+from utils.tracing import current_span, traced
+
+# Binary per-video artifacts, written by the frames and fusion stages
+VIDEO_EMBEDDING_FILE = "video_embedding.npy"
+FRAME_EMBEDDINGS_FILE = "frame_embeddings.npy"
+FRAME_TIMESTAMPS_FILE = "frame_timestamps.npy"
+METADATA_FILE = "metadata.json"
+LEGACY_EMBEDDING_FILE = "embedding.json"
+
+@traced("storage.save")
+def save_video_metadata(video_id, metadata, root=VIDEOS_DIR):
+    """
+    Write the small JSON sidecar for a video's binary artifacts.
+
+    The transcript itself lives in the stage cache, so only its length and
+    hash are kept here. Replaces the old pretty-printed embedding.json.
+    """
+    output_dir = os.path.join(root, video_id)
     os.makedirs(output_dir, exist_ok=True)
 
-    filepath = os.path.join(output_dir, "embedding.json")
-    data = {
-        "video_id": video_id,
-        "embedding": embedding.tolist(),
-        "metadata": metadata
+    metadata = dict(metadata)
+    text = metadata.pop("text", None)
+    if text is not None:
+        metadata["text_chars"] = len(text)
+        metadata["text_sha256"] = hashlib.sha256(text.encode()).hexdigest()
+    data = {"video_id": video_id, "metadata": metadata}
+
+    filepath = os.path.join(output_dir, METADATA_FILE)
+    tmp_path = filepath + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, filepath)
+    current_span().set(bytes=os.path.getsize(filepath))
+
+    legacy_path = os.path.join(output_dir, LEGACY_EMBEDDING_FILE)
+    if os.path.exists(legacy_path):
+        os.remove(legacy_path)
+    print(f"💾 Metadata saved to {filepath}")
+
+def _load_npy(path, mmap):
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+@traced("storage.load")
+def load_video_artifacts(video_id, root=VIDEOS_DIR, mmap=True):
+    """
+    Load a video's fused vector, frame matrix, frame timestamps and metadata.
+
+    With mmap=True the arrays are read-only memory maps, so nothing is read
+    from disk until it is used. Videos ingested before the binary format
+    fall back to embedding.json (and have no frames).
+
+    Returns:
+        dict: video_embedding (D,), frame_embeddings (N, D), frame_timestamps (N,)
+            in seconds, and metadata; None if the video has no artifacts
+    """
+    video_dir = os.path.join(root, video_id)
+    metadata = {}
+    metadata_path = os.path.join(video_dir, METADATA_FILE)
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)["metadata"]
+
+    embedding_path = os.path.join(video_dir, VIDEO_EMBEDDING_FILE)
+    legacy_path = os.path.join(video_dir, LEGACY_EMBEDDING_FILE)
+    if os.path.exists(embedding_path):
+        video_embedding = _load_npy(embedding_path, mmap)
+    elif os.path.exists(legacy_path):
+        with open(legacy_path) as f:
+            legacy = json.load(f)
+        video_embedding = np.asarray(legacy["embedding"], dtype=np.float32)
+        metadata = metadata or legacy.get("metadata", {})
+    else:
+        return None
+
+    frames_path = os.path.join(video_dir, FRAME_EMBEDDINGS_FILE)
+    timestamps_path = os.path.join(video_dir, FRAME_TIMESTAMPS_FILE)
+    if os.path.exists(frames_path) and os.path.exists(timestamps_path):
+        frame_embeddings = _load_npy(frames_path, mmap)
+        frame_timestamps = _load_npy(timestamps_path, mmap)
+    else:
+        frame_embeddings = np.empty((0, video_embedding.shape[-1]), dtype=np.float32)
+        frame_timestamps = np.empty(0, dtype=np.float32)
+
+    return {
+        "video_embedding": video_embedding,
+        "frame_embeddings": frame_embeddings,
+        "frame_timestamps": frame_timestamps,
+        "metadata": metadata,
     }
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
-    print(f"💾 Embedding saved to {filepath}")
 
+def list_stored_videos(root=VIDEOS_DIR):
+    """
+    Ids of every video with saved artifacts.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if any(os.path.exists(os.path.join(root, name, f)) for f in (VIDEO_EMBEDDING_FILE, LEGACY_EMBEDDING_FILE))
+    )
@@ -0,0 +1,292 @@
+"""
+Lightweight tracing for the ingest and chat paths.
+
+    with span("clip.images", items=len(frames)) as s:
+        ...
+        s.set(bytes=nbytes)
+
+    @traced("fusion")
+    def fuse_embeddings(...):
+        current_span().set(items=n)
+
+    traced_submit(pool, work, ...)  # work's spans nest under the current one
+
+Each finished span records wall time, thread CPU time, the process's peak
+RSS and any attributes set on it (bytes, tokens, counts). Spans go to a
+JSON-lines file when TRACE_FILE is set, and are aggregated into Prometheus
+text metrics served on PROMETHEUS_PORT when that is set. With neither set,
+span() returns a shared no-op object, so instrumented code pays one
+attribute check per call.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+PROMETHEUS_PORT = os.getenv("PROMETHEUS_PORT")
+
+# Numeric span attributes summed into Prometheus counters
+COUNTED_ATTRS = ("bytes", "prompt_tokens", "completion_tokens", "items", "hits", "misses")
+
+_local = threading.local()
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+class _ParentRef(_NoopSpan):
+    """
+    Stands in for a span open on another thread: child spans take its ids,
+    and set() is a no-op so workers never write to the real span's attrs.
+    """
+
+    def __init__(self, parent):
+        self.name = parent.name
+        self.trace_id = parent.trace_id
+        self.span_id = parent.span_id
+
+class Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        parent = stack[-1] if stack else None
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = uuid.uuid4().hex[:8]
+        stack.append(self)
+        self._start = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        # Not always the top: a streaming generator's span can close after spans opened later
+        stack = getattr(_local, "stack", [])
+        if self in stack:
+            stack.remove(self)
+        record = {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self._start,
+            "wall_s": round(wall, 6),
+            "cpu_s": round(cpu, 6),
+            "peak_rss": _peak_rss_bytes(),
+            "thread": threading.current_thread().name,
+            "error": f"{exc_type.__name__}: {exc}" if exc_type else None,
+        }
+        record.update(self.attrs)
+        self.tracer.record(record)
+        return False
+
+class Tracer:
+    """
+    Collects finished spans: appends them to a JSONL file and keeps
+    per-name totals for the Prometheus endpoint.
+    """
+
+    def __init__(self, trace_file=None, prometheus_port=None):
+        self.trace_file = trace_file
+        self.enabled = bool(trace_file or prometheus_port)
+        self._lock = threading.Lock()
+        self._file = None
+        if trace_file:
+            os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+            self._file = open(trace_file, "a", encoding="utf-8")
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self._peak_rss = 0
+        if prometheus_port:
+            self.serve_metrics(int(prometheus_port))
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NOOP
+        return Span(self, name, attrs)
+
+    def record(self, record):
+        with self._lock:
+            if self._file:
+                self._file.write(json.dumps(record, default=str) + "\n")
+                self._file.flush()
+            totals = self._totals[record["name"]]
+            totals["calls"] += 1
+            totals["errors"] += 1 if record["error"] else 0
+            totals["wall_s"] += record["wall_s"]
+            totals["cpu_s"] += record["cpu_s"]
+            for attr in COUNTED_ATTRS:
+                value = record.get(attr)
+                if isinstance(value, (int, float)):
+                    totals[attr] += value
+            if record["peak_rss"]:
+                self._peak_rss = max(self._peak_rss, record["peak_rss"])
+
+    def metrics_text(self):
+        """
+        Span totals in the Prometheus text exposition format.
+        """
+        metrics = {
+            "calls": ("yt_span_calls_total", "counter", "Finished spans"),
+            "errors": ("yt_span_errors_total", "counter", "Spans that raised"),
+            "wall_s": ("yt_span_wall_seconds_total", "counter", "Wall-clock time inside spans"),
+            "cpu_s": ("yt_span_cpu_seconds_total", "counter", "Thread CPU time inside spans"),
+            "bytes": ("yt_span_bytes_total", "counter", "Bytes moved (downloaded, uploaded, written)"),
+            "prompt_tokens": ("yt_llm_prompt_tokens_total", "counter", "LLM prompt tokens"),
+            "completion_tokens": ("yt_llm_completion_tokens_total", "counter", "LLM completion tokens"),
+            "items": ("yt_span_items_total", "counter", "Items processed (frames, chunks, vectors)"),
+            "hits": ("yt_cache_hits_total", "counter", "Cache lookups that returned a stored result"),
+            "misses": ("yt_cache_misses_total", "counter", "Cache lookups that found nothing"),
+        }
+        lines = []
+        with self._lock:
+            for key, (metric, kind, help_text) in metrics.items():
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for name, totals in sorted(self._totals.items()):
+                    if key in totals:
+                        lines.append(f'{metric}{{span="{name}"}} {totals[key]:g}')
+            peak = self._peak_rss
+        if peak:
+            lines += ["# HELP yt_peak_rss_bytes Peak resident set size", "# TYPE yt_peak_rss_bytes gauge",
+                      f"yt_peak_rss_bytes {peak}"]
+        return "\n".join(lines) + "\n"
+
+    def serve_metrics(self, port):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        tracer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.metrics_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+        except OSError as e:
+            # Streamlit reruns and several workers may try the same port
+            print(f"⚠️ Metrics endpoint not started on port {port}: {e}")
+            return
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Prometheus metrics on http://localhost:{port}/metrics")
+
+_tracer = Tracer(TRACE_FILE, PROMETHEUS_PORT)
+
+def get_tracer():
+    return _tracer
+
+def configure(trace_file=None, prometheus_port=None):
+    """
+    Replace the process tracer (for scripts that enable tracing from flags).
+    """
+    global _tracer
+    _tracer = Tracer(trace_file, prometheus_port)
+    return _tracer
+
+def span(name, **attrs):
+    """
+    Context manager timing a block; a no-op when tracing is off.
+    """
+    return _tracer.span(name, **attrs)
+
+def current_span():
+    """
+    The innermost open span on this thread (a no-op span if there is none),
+    so a @traced function can attach attributes to its own span.
+    """
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else _NOOP
+
+def bind_span(fn):
+    """
+    Wrap `fn` so spans it opens on another thread (a pool worker) nest under
+    the span open here, instead of starting separate traces. Outside its own
+    spans the worker sees a read-only reference, so current_span().set()
+    there cannot race on the parent's attributes.
+    """
+    parent = current_span()
+    if parent is _NOOP:
+        return fn
+    parent = _ParentRef(parent)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        # Only a reference: the span itself is entered and exited on the submitting thread
+        stack.append(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if parent in stack:
+                stack.remove(parent)
+    return run
+
+def traced_submit(pool, fn, *args, **kwargs):
+    """
+    pool.submit(fn, ...) with the current span as the parent of the worker's spans.
+    """
+    return pool.submit(bind_span(fn), *args, **kwargs)
+
+def traced(name=None):
+    """
+    Decorator wrapping every call of a function in a span.
+    """
+    def decorate(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return fn(*args, **kwargs)
+            with _tracer.span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
@@ -1,57 +1,315 @@
 import os
+import re
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 from dotenv import load_dotenv
 
+from utils.audio import probe_audio, SPEECH_FORMATS
+from utils.tracing import bind_span, span
+
 load_dotenv()
 
-def transcribe_with_assemblyai(audio_path):
-    api_key = os.getenv("ASSEMBLYAI_API_KEY")
-    if not api_key:
-        raise ValueError("❌ ASSEMBLYAI_API_KEY not set in .env")
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com/v2")
+GROQ_TRANSCRIBE_URL = os.getenv("GROQ_TRANSCRIBE_URL", "https://api.groq.com/openai/v1/audio/transcriptions")
 
-    # Step 1: Upload audio file
-    upload_url = "https://api.assemblyai.com/v2/upload"
-    headers = {"authorization": api_key}
+class TranscriptionError(RuntimeError):
+    pass
 
-    with open(audio_path, "rb") as f:
-        response = requests.post(upload_url, headers=headers, files={"file": f})
+class TranscriptionTimeout(RuntimeError):
+    pass
 
-    if response.status_code != 200:
-        print("❌ Upload failed:", response.text)
-        return None
+class TranscriptionCancelled(TranscriptionError):
+    pass
 
-    audio_url = response.json()["upload_url"]
-    print("📤 Audio uploaded")
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise TranscriptionCancelled("Transcription cancelled")
 
-    # Step 2: Start transcription
-    transcript_url = "https://api.assemblyai.com/v2/transcript"
-    json_data = {
-        "audio_url": audio_url,
-        "language_code": "en",
-        "auto_chapters": False,
-    }
-    response = requests.post(transcript_url, headers=headers, json=json_data)
+def poll_with_backoff(check, initial=1.0, factor=1.5, max_interval=15.0, timeout=1800, cancel=None):
+    """
+    Call `check()` until it returns (True, value), sleeping 1s, 1.5s, 2.25s, ...
+    up to `max_interval` between calls.
 
-    if response.status_code != 200:
-        print("❌ Transcription request failed:", response.text)
-        return None
+    Args:
+        cancel (threading.Event): Wakes the wait and stops polling when set
+
+    Raises:
+        TranscriptionTimeout: If `timeout` seconds pass without a result
+        TranscriptionCancelled: If `cancel` was set
+    """
+    deadline = time.monotonic() + timeout
+    interval = initial
+    while True:
+        done, value = check()
+        if done:
+            return value
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TranscriptionTimeout(f"No transcription result after {timeout}s")
+        if cancel is None:
+            time.sleep(min(interval, remaining))
+        elif cancel.wait(min(interval, remaining)):
+            raise TranscriptionCancelled("Transcription cancelled")
+        interval = min(max_interval, interval * factor)
 
-    transcript_id = response.json()["id"]
-    print("📝 Transcription started, ID:", transcript_id)
+class AssemblyAIBackend:
+    """
+    Upload, start a job, then poll with adaptive backoff.
+    """
 
-    # Step 3: Poll for result
-    polling_endpoint = f"https://api.assemblyai.com/v2/transcript/{transcript_id}"
+    name = "assemblyai"
 
-    while True:
-        polling_response = requests.get(polling_endpoint, headers=headers)
-        status = polling_response.json()["status"]
-
-        if status == "completed":
-            print("✅ Transcription complete!")
-            return polling_response.json()["text"]
-        elif status == "error":
-            print("❌ Transcription failed:", polling_response.json()["error"])
+    def __init__(self, api_key=None, base_url=ASSEMBLYAI_BASE_URL, timeout=1800):
+        self.api_key = api_key or os.getenv("ASSEMBLYAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("❌ ASSEMBLYAI_API_KEY not set in .env")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({"authorization": self.api_key})
+
+    def transcribe(self, audio_path, cancel=None):
+        """
+        Args:
+            cancel (threading.Event): Stops polling when set
+
+        Returns:
+            dict: {"text", "words"} with word times in ms, or None on failure
+        """
+        _check_cancel(cancel)
+        # Step 1: Upload audio file (streamed from disk)
+        with span("transcribe.upload", backend=self.name, bytes=os.path.getsize(audio_path)), \
+                open(audio_path, "rb") as f:
+            response = self.session.post(f"{self.base_url}/upload", data=f, timeout=(10, 600))
+        if response.status_code != 200:
+            print("❌ Upload failed:", response.text)
+            return None
+        audio_url = response.json()["upload_url"]
+        print("📤 Audio uploaded")
+
+        # Step 2: Start transcription
+        json_data = {
+            "audio_url": audio_url,
+            "language_code": "en",
+            "auto_chapters": False,
+        }
+        with span("transcribe.queue", backend=self.name):
+            response = self.session.post(f"{self.base_url}/transcript", json=json_data, timeout=(10, 60))
+        if response.status_code != 200:
+            print("❌ Transcription request failed:", response.text)
+            return None
+        transcript_id = response.json()["id"]
+        print("📝 Transcription started, ID:", transcript_id)
+
+        # Step 3: Poll for result
+        polling_endpoint = f"{self.base_url}/transcript/{transcript_id}"
+
+        def check():
+            # Transient failures keep polling; the backoff and deadline still apply
+            try:
+                polling_response = self.session.get(polling_endpoint, timeout=(10, 60))
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"⚠️ Polling transcript {transcript_id} failed, retrying: {e}")
+                return False, None
+            if polling_response.status_code >= 500 or polling_response.status_code == 429:
+                return False, None
+            try:
+                polling_response.raise_for_status()
+            except requests.HTTPError as e:
+                raise TranscriptionError(f"Polling transcript {transcript_id} failed: {polling_response.text[:500]}") from e
+            result = polling_response.json()
+            if "status" not in result:
+                raise TranscriptionError(f"Unexpected transcript poll response: {str(result)[:500]}")
+            if result["status"] == "completed":
+                return True, result
+            if result["status"] == "error":
+                print("❌ Transcription failed:", result.get("error"))
+                return True, None
+            return False, None
+
+        with span("transcribe.poll", backend=self.name) as s:
+            result = poll_with_backoff(check, timeout=self.timeout, cancel=cancel)
+            s.set(items=len((result or {}).get("words") or []))
+        if result is None:
+            return None
+        print("✅ Transcription complete!")
+        words = [{"text": w["text"], "start": w["start"], "end": w["end"]} for w in result.get("words") or []]
+        return {"text": result["text"], "words": words}
+
+class GroqWhisperBackend:
+    """
+    Groq's OpenAI-compatible Whisper endpoint; synchronous, word timestamps via verbose_json.
+    """
+
+    name = "groq"
+
+    def __init__(self, api_key=None, url=GROQ_TRANSCRIBE_URL, model="whisper-large-v3-turbo"):
+        self.api_key = api_key or os.getenv("GROQ_API_KEY")
+        if not self.api_key:
+            raise ValueError("❌ GROQ_API_KEY not set in .env")
+        self.url = url
+        self.model = model
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+
+    def transcribe(self, audio_path, cancel=None):
+        # One synchronous request; `cancel` is only checked before it starts
+        _check_cancel(cancel)
+        with span("transcribe.request", backend=self.name, bytes=os.path.getsize(audio_path)), \
+                open(audio_path, "rb") as f:
+            response = self.session.post(
+                self.url,
+                files={"file": (os.path.basename(audio_path), f)},
+                data={
+                    "model": self.model,
+                    "language": "en",
+                    "response_format": "verbose_json",
+                    "timestamp_granularities[]": "word",
+                },
+                timeout=(10, 600),
+            )
+        if response.status_code != 200:
+            print("❌ Groq transcription failed:", response.text)
             return None
+        result = response.json()
+        words = [
+            {"text": w["word"].strip(), "start": int(w["start"] * 1000), "end": int(w["end"] * 1000)}
+            for w in result.get("words") or []
+        ]
+        print("✅ Transcription complete!")
+        return {"text": result["text"].strip(), "words": words}
+
+BACKENDS = {
+    "assemblyai": AssemblyAIBackend,
+    "groq": GroqWhisperBackend,
+}
+
+def get_backend(name="assemblyai", **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}")
+    return BACKENDS[name](**kwargs)
+
+def find_split_points(audio_path, duration, segment_sec=600, min_silence=0.5, noise_db=-35):
+    """
+    Pick cut points near every `segment_sec` seconds, snapped to the middle of
+    the nearest silence so no word is cut in half.
+    """
+    command = [
+        "ffmpeg", "-i", audio_path, "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-"
+    ]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    starts = [float(x) for x in re.findall(r"silence_start: ([\d.]+)", result.stderr)]
+    ends = [float(x) for x in re.findall(r"silence_end: ([\d.]+)", result.stderr)]
+    silences = [(s + e) / 2 for s, e in zip(starts, ends)]
+
+    points = []
+    target = segment_sec
+    while target < duration - segment_sec / 2:
+        # Look for a silence within a quarter segment of the target, else cut at the target
+        window = segment_sec / 4
+        nearby = [s for s in silences if abs(s - target) <= window and (not points or s > points[-1])]
+        point = min(nearby, key=lambda s: abs(s - target)) if nearby else target
+        points.append(point)
+        target = point + segment_sec
+    return points
+
+def split_audio(audio_path, points, duration, output_dir):
+    """
+    Cut the audio at `points`, re-encoding each segment as 16 kHz mono Opus.
+
+    Stream copy can only cut on packet boundaries, so segments would start
+    slightly before their split point and the word offsets would drift;
+    decoding makes every cut sample-accurate, so each segment starts exactly
+    at its offset.
+
+    Returns:
+        list: (offset_sec, segment_path) tuples
+    """
+    ext, codec_args = SPEECH_FORMATS["opus"]
+    bounds = [0.0] + list(points) + [duration]
+    segments = []
+    for i, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        segment_path = os.path.join(output_dir, f"segment_{i:03d}{ext}")
+        command = [
+            "ffmpeg", "-ss", f"{start:.3f}", "-i", audio_path, "-t", f"{end - start:.3f}",
+            "-vn", "-ac", "1", "-ar", "16000", *codec_args, segment_path, "-y"
+        ]
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed splitting {audio_path}: {result.stderr.strip()[-500:]}")
+        segments.append((start, segment_path))
+    return segments
+
+def merge_segments(results):
+    """
+    Merge per-segment transcripts, shifting word times by each segment's offset.
+
+    Args:
+        results (list): (offset_sec, {"text", "words"}) tuples
+    """
+    texts = []
+    words = []
+    for offset, result in sorted(results, key=lambda r: r[0]):
+        texts.append(result["text"].strip())
+        shift = int(round(offset * 1000))
+        words.extend(
+            {"text": w["text"], "start": w["start"] + shift, "end": w["end"] + shift}
+            for w in result["words"]
+        )
+    return {"text": " ".join(t for t in texts if t), "words": words}
+
+def transcribe(audio_path, backend="assemblyai", segment_sec=600, max_workers=4, cancel=None):
+    """
+    Transcribe audio with the chosen backend, in parallel segments for long files.
+
+    Audio longer than 1.5 x `segment_sec` is split at silences near every
+    `segment_sec` seconds, the segments are transcribed concurrently and the
+    word timestamps are stitched back into one ordered transcript, so the
+    wall time is about that of the slowest segment.
+
+    Args:
+        backend (str): "assemblyai" or "groq"
+        cancel (threading.Event): When set, pending and polling segments stop
+
+    Returns:
+        dict: {"text", "words"} (word times in ms), or None if any segment failed
+
+    Raises:
+        TranscriptionCancelled: If `cancel` was set before the result arrived
+    """
+    engine = get_backend(backend)
+    duration = probe_audio(audio_path)["duration"] or 0
+    if duration <= segment_sec * 1.5:
+        return engine.transcribe(audio_path, cancel=cancel)
+
+    points = find_split_points(audio_path, duration, segment_sec)
+    with tempfile.TemporaryDirectory() as tmp:
+        segments = split_audio(audio_path, points, duration, tmp)
+        print(f"✂️ Transcribing {len(segments)} segments in parallel")
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(segments))) as pool:
+            results = list(pool.map(bind_span(lambda seg: engine.transcribe(seg[1], cancel=cancel)), segments))
+
+    if any(result is None for result in results):
+        return None
+    return merge_segments([(offset, result) for (offset, _), result in zip(segments, results)])
+
+def transcribe_with_assemblyai(audio_path, return_words=False, cancel=None):
+    """
+    Transcribe with AssemblyAI. Returns the transcript text, or with
+    return_words=True a dict with "text" and "words" ({text, start, end} in ms).
+    """
+    result = transcribe(audio_path, backend="assemblyai", cancel=cancel)
+    if result is None or return_words:
+        return result
+    return result["text"]
 
-        import time
-        time.sleep(3)
+def transcribe_with_groq_whisper(audio_path, cancel=None):
+    """
+    Transcribe with Groq Whisper. Returns {"text", "words"} or None.
+    """
+    return transcribe(audio_path, backend="groq", cancel=cancel)
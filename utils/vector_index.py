@@ -0,0 +1,385 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "data/vector_index")
+# Rows are converted to float32 in blocks this big while scoring, to bound memory
+SCORE_BLOCK = 65536
+# Rewrite the files once this fraction of rows is dead (replaced or deleted)
+COMPACT_RATIO = 0.3
+
+def _matches(meta, where):
+    """
+    Evaluate the subset of Chroma's `where` syntax this repo uses:
+    equality, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte, $and and $or.
+    """
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(_matches(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(_matches(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            for op, target in cond.items():
+                if op == "$eq":
+                    ok = value == target
+                elif op == "$ne":
+                    ok = value != target
+                elif op == "$in":
+                    ok = value in target
+                elif op == "$nin":
+                    ok = value not in target
+                elif value is None:
+                    ok = False
+                elif op == "$gt":
+                    ok = value > target
+                elif op == "$gte":
+                    ok = value >= target
+                elif op == "$lt":
+                    ok = value < target
+                elif op == "$lte":
+                    ok = value <= target
+                else:
+                    raise ValueError(f"Unsupported where operator: {op}")
+                if not ok:
+                    return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+def _video_ids(where):
+    """
+    Pull a top-level video_id restriction out of a where filter, so only
+    that video's rows need to be checked against the rest of it.
+    """
+    if not where:
+        return None
+    clauses = where["$and"] if "$and" in where else [where]
+    for clause in clauses:
+        cond = clause.get("video_id")
+        if isinstance(cond, str):
+            return [cond]
+        if isinstance(cond, dict) and "$in" in cond:
+            return list(cond["$in"])
+    return None
+
+class NumpyIndex:
+    """
+    Exact cosine-similarity index kept in one process, with no server.
+
+    Vectors are L2-normalized and stored as float16 rows of an append-only
+    `.npy` memmap. Ids, documents and metadata go to an append-only JSONL
+    sidecar. Upserting an id appends a new row and marks the old one dead;
+    the files are compacted in a background thread once enough rows are dead,
+    without blocking queries while the live rows are copied.
+
+    The methods mirror the part of Chroma's collection API the repo uses
+    (upsert, delete, query, get, count), so either backend can sit behind
+    utils.vectorstore.
+    """
+
+    def __init__(self, path=INDEX_DIR, dim=512, dtype=np.float16):
+        self.path = path
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._compacting = None
+        self._compact_lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._vectors_path = os.path.join(path, "vectors.npy")
+        self._rows_path = os.path.join(path, "rows.jsonl")
+        self._load()
+
+    # -- storage ---------------------------------------------------------
+
+    def _reset_rows(self):
+        self._ids = []
+        self._documents = []
+        self._metadatas = []
+        self._alive = []
+        self._row_of = {}
+        self._by_video = {}
+        self._live = None
+
+    def _load(self):
+        self._reset_rows()
+        if os.path.exists(self._rows_path):
+            good_bytes = 0
+            with open(self._rows_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line) if line.endswith(b"\n") else None
+                    except json.JSONDecodeError:
+                        entry = None
+                    if entry is None:
+                        break  # torn final line from a crash; everything before it is intact
+                    good_bytes += len(line)
+                    if "delete" in entry:
+                        self._kill(entry["delete"])
+                    else:
+                        self._append_row(entry["id"], entry["document"], entry["metadata"])
+            # Cut the fragment off, or the next append would be glued onto it and lost on every later load
+            if good_bytes < os.path.getsize(self._rows_path):
+                os.truncate(self._rows_path, good_bytes)
+        if os.path.exists(self._vectors_path):
+            self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+        else:
+            self._vectors = self._allocate(self._vectors_path, 1024)
+        self._log = open(self._rows_path, "a", encoding="utf-8")
+
+    def _allocate(self, path, capacity):
+        return np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(capacity, self.dim))
+
+    def _grow(self, needed):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        tmp_path = self._vectors_path + ".tmp"
+        grown = self._allocate(tmp_path, capacity)
+        grown[:len(self._ids)] = self._vectors[:len(self._ids)]
+        grown.flush()
+        del grown
+        os.replace(tmp_path, self._vectors_path)
+        # Readers holding the old memmap keep a valid view of the replaced file
+        self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+
+    def _append_row(self, id_, document, metadata):
+        self._kill(id_)
+        row = len(self._ids)
+        self._ids.append(id_)
+        self._documents.append(document)
+        self._metadatas.append(metadata)
+        self._alive.append(True)
+        self._live = None
+        self._row_of[id_] = row
+        video_id = metadata.get("video_id")
+        if video_id is not None:
+            self._by_video.setdefault(video_id, set()).add(row)
+        return row
+
+    def _kill(self, id_):
+        row = self._row_of.pop(id_, None)
+        if row is None:
+            return
+        self._alive[row] = False
+        self._live = None
+        video_id = self._metadatas[row].get("video_id")
+        if video_id is not None:
+            self._by_video.get(video_id, set()).discard(row)
+
+    def _write(self, entries):
+        self._log.write("".join(json.dumps(e) + "\n" for e in entries))
+        self._log.flush()
+
+    # -- collection API ----------------------------------------------------
+
+    def count(self):
+        return len(self._row_of)
+
+    def upsert(self, ids, embeddings, metadatas=None, documents=None):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.where(norms == 0, 1, norms)
+        metadatas = metadatas or [{} for _ in ids]
+        documents = documents or [None for _ in ids]
+        with self._lock:
+            start = len(self._ids)
+            self._grow(start + len(ids))
+            # Vectors first, then the log line: a row only exists once it's logged
+            self._vectors[start:start + len(ids)] = embeddings.astype(self.dtype)
+            self._vectors.flush()
+            entries = []
+            for id_, document, metadata in zip(ids, documents, metadatas):
+                self._append_row(id_, document, dict(metadata))
+                entries.append({"id": id_, "document": document, "metadata": metadata})
+            self._write(entries)
+            self._maybe_compact()
+
+    def delete(self, ids=None, where=None):
+        with self._lock:
+            if where is not None:
+                targets = [self._ids[row] for row in self._candidates(where)]
+                if ids is not None:
+                    wanted = set(ids)
+                    targets = [id_ for id_ in targets if id_ in wanted]
+            else:
+                targets = [id_ for id_ in ids or [] if id_ in self._row_of]
+            if not targets:
+                return
+            for id_ in targets:
+                self._kill(id_)
+            self._write([{"delete": id_} for id_ in targets])
+            self._maybe_compact()
+
+    def _candidates(self, where):
+        """
+        Live row numbers matching `where`, as a sorted int array.
+        """
+        video_ids = _video_ids(where)
+        if video_ids is not None:
+            rows = np.fromiter(
+                sorted(row for video_id in video_ids for row in self._by_video.get(video_id, ())), dtype=np.int64
+            )
+        else:
+            if self._live is None:
+                self._live = np.flatnonzero(np.fromiter(self._alive, dtype=bool, count=len(self._alive)))
+            rows = self._live
+        if where and len(rows):
+            metadatas = self._metadatas
+            rows = rows[np.fromiter((_matches(metadatas[row], where) for row in rows), dtype=bool, count=len(rows))]
+        return rows
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        with self._lock:
+            if ids is not None:
+                rows = [self._row_of[id_] for id_ in ids if id_ in self._row_of]
+            else:
+                rows = self._candidates(where).tolist()
+            result = {"ids": [self._ids[row] for row in rows]}
+            if "documents" in include:
+                result["documents"] = [self._documents[row] for row in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self._metadatas[row] for row in rows]
+            if "embeddings" in include:
+                result["embeddings"] = np.asarray(self._vectors[rows], dtype=np.float32)
+            return result
+
+    def query(self, query_embeddings, n_results=10, where=None, include=("documents", "metadatas", "distances")):
+        """
+        Exact top-k by cosine distance (1 - similarity) for a batch of queries.
+
+        Returns:
+            dict: Chroma-style nested lists, one inner list per query
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[None, :]
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        with self._lock:
+            rows = self._candidates(where)
+            vectors = self._vectors
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+        k = min(n_results, len(rows))
+        if k == 0:
+            top = np.empty((len(queries), 0), dtype=np.int64)
+            scores = np.empty((len(queries), 0), dtype=np.float32)
+        else:
+            scores = self._score(vectors, rows, queries)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            scores = np.take_along_axis(scores, top, axis=1)
+
+        result = {"ids": [[ids[rows[i]] for i in q] for q in top]}
+        if "documents" in include:
+            result["documents"] = [[documents[rows[i]] for i in q] for q in top]
+        if "metadatas" in include:
+            result["metadatas"] = [[metadatas[rows[i]] for i in q] for q in top]
+        if "distances" in include:
+            result["distances"] = (1.0 - scores).tolist()
+        return result
+
+    @staticmethod
+    def _score(vectors, rows, queries):
+        # Contiguous candidate ranges can be sliced straight off the memmap
+        contiguous = len(rows) and rows[-1] - rows[0] + 1 == len(rows)
+        scores = np.empty((len(queries), len(rows)), dtype=np.float32)
+        for offset in range(0, len(rows), SCORE_BLOCK):
+            block_rows = rows[offset:offset + SCORE_BLOCK]
+            if contiguous:
+                block = vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = vectors[block_rows]
+            scores[:, offset:offset + len(block_rows)] = queries @ np.asarray(block, dtype=np.float32).T
+        return scores
+
+    # -- compaction --------------------------------------------------------
+
+    def _maybe_compact(self):
+        dead = len(self._ids) - len(self._row_of)
+        if dead < 1024 or dead < COMPACT_RATIO * len(self._ids):
+            return
+        if self._compacting is not None and self._compacting.is_alive():
+            return
+        self._compacting = threading.Thread(target=self.compact, daemon=True)
+        self._compacting.start()
+
+    def compact(self):
+        """
+        Rewrite the vectors and sidecar with live rows only, then swap them in.
+
+        The copy runs without the lock, so queries and writes carry on; rows
+        upserted or deleted meanwhile are applied to the new files just
+        before the swap, which is the only part done under the lock.
+        """
+        with self._compact_lock:
+            with self._lock:
+                live = sorted(self._row_of.values())
+                snapshot_rows = len(self._ids)
+                vectors = self._vectors
+                ids, documents, metadatas = self._ids, self._documents, self._metadatas
+
+            # Rows below snapshot_rows never change (the files are append-only), so this needs no lock
+            tmp_vectors = self._vectors_path + ".compact.tmp"
+            tmp_rows = self._rows_path + ".compact.tmp"
+            capacity = max(1024, 2 * len(live))
+            compacted = self._allocate(tmp_vectors, capacity)
+            for offset in range(0, len(live), SCORE_BLOCK):
+                block = live[offset:offset + SCORE_BLOCK]
+                compacted[offset:offset + len(block)] = vectors[block]
+            with open(tmp_rows, "w", encoding="utf-8") as f:
+                for row in live:
+                    f.write(json.dumps({"id": ids[row], "document": documents[row], "metadata": metadatas[row]}) + "\n")
+
+            with self._lock:
+                # Catch up with writes made during the copy: new rows go after the copied ones,
+                # and copied rows deleted since get a tombstone (a re-upsert's new row replaces them anyway)
+                added = [row for row in range(snapshot_rows, len(self._ids)) if self._alive[row]]
+                deleted = [self._ids[row] for row in live if not self._alive[row] and self._ids[row] not in self._row_of]
+                order = live + added
+                if len(order) > capacity:
+                    compacted.flush()
+                    del compacted
+                    grown_path = tmp_vectors + ".grow"
+                    grown = self._allocate(grown_path, max(capacity * 2, len(order)))
+                    grown[:len(live)] = np.load(tmp_vectors, mmap_mode="r")[:len(live)]
+                    del grown
+                    os.replace(grown_path, tmp_vectors)
+                    compacted = np.load(tmp_vectors, mmap_mode="r+")
+                if added:
+                    compacted[len(live):len(order)] = self._vectors[added]
+                compacted.flush()
+                del compacted
+                with open(tmp_rows, "a", encoding="utf-8") as f:
+                    for row in added:
+                        f.write(json.dumps({
+                            "id": self._ids[row], "document": self._documents[row], "metadata": self._metadatas[row]
+                        }) + "\n")
+                    for id_ in deleted:
+                        f.write(json.dumps({"delete": id_}) + "\n")
+
+                self._log.close()
+                os.replace(tmp_vectors, self._vectors_path)
+                os.replace(tmp_rows, self._rows_path)
+                # Replay the new file's order in memory instead of re-parsing it
+                old_ids, old_documents, old_metadatas = self._ids, self._documents, self._metadatas
+                self._reset_rows()
+                for row in order:
+                    self._append_row(old_ids[row], old_documents[row], old_metadatas[row])
+                for id_ in deleted:
+                    self._kill(id_)
+                self._vectors = np.load(self._vectors_path, mmap_mode="r+")
+                self._log = open(self._rows_path, "a", encoding="utf-8")
+            print(f"🧹 Compacted vector index to {len(self._row_of)} rows")
+
+    def close(self):
+        with self._lock:
+            self._log.close()
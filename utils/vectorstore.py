@@ -1,23 +1,68 @@
-import chromadb
+import os
+import threading
+
+import numpy as np
+
+from utils.tracing import current_span, traced
+
+CHROMA_PATH = "./chromadb_data"
+COLLECTION_NAME = "youtube_summarizer"
+# "chroma" (chromadb.PersistentClient) or "numpy" (utils.vector_index.NumpyIndex)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+_collections = {}
+_collections_lock = threading.Lock()
+
+def _open_chroma(path):
+    import chromadb  # heavy; only load it when the store is actually opened
 
-def get_or_create_collection():
     # Initialize Chroma client with persistence directory
     # The new way uses PersistentClient instead of Client with settings
-    client = chromadb.PersistentClient(path="./chromadb_data")
-    
+    client = chromadb.PersistentClient(path=path or CHROMA_PATH)
+
     # Get or create collection with optional metadata (e.g. similarity metric)
     collection = client.get_or_create_collection(
-        name="youtube_summarizer",
+        name=COLLECTION_NAME,
         metadata={"hnsw:space": "cosine"}  # cosine similarity for vector search
     )
-    
     return client, collection
 
+def _open_numpy(path):
+    from utils.vector_index import INDEX_DIR, NumpyIndex
+
+    # No client object; the index is the collection
+    return None, NumpyIndex(path or INDEX_DIR)
+
+VECTOR_BACKENDS = {
+    "chroma": _open_chroma,
+    "numpy": _open_numpy,
+}
+
+def get_or_create_collection(path=None, backend=None):
+    """
+    Open the vector store once per process and hand out the same
+    (client, collection) pair on every later call.
+
+    Both backends expose the same collection methods (upsert, delete, query,
+    get, count), so callers don't care which one VECTOR_BACKEND picked.
+    """
+    backend = backend or VECTOR_BACKEND
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend: {backend}")
+    with _collections_lock:
+        if (backend, path) not in _collections:
+            _collections[(backend, path)] = VECTOR_BACKENDS[backend](path)
+        return _collections[(backend, path)]
+
+@traced("vector.add")
 def add_video_to_collection(client, collection, video_id, embedding, metadata):
     # Ensure video_id is part of metadata for filtering later
     metadata["video_id"] = video_id
+    metadata["kind"] = "video"
 
-    collection.add(
+    # upsert so re-ingesting the same video replaces its entry instead of failing
+    current_span().set(items=1)
+    collection.upsert(
         documents=[metadata["text"]],
         embeddings=[embedding.tolist()],
         metadatas=[metadata],
@@ -26,4 +71,115 @@ def add_video_to_collection(client, collection, video_id, embedding, metadata):
 
     
     # Note: PersistentClient automatically persists changes
-    # No need to call client.persist() explicitly
\ No newline at end of file
+    # No need to call client.persist() explicitly
+
+@traced("vector.add")
+def add_videos_to_collection(collection, video_ids, embeddings, metadatas):
+    """
+    Upsert many videos with a single Chroma call (used by batch ingestion).
+    """
+    metadatas = [dict(metadata, video_id=video_id, kind="video") for video_id, metadata in zip(video_ids, metadatas)]
+    current_span().set(items=len(metadatas))
+    collection.upsert(
+        documents=[metadata["text"] for metadata in metadatas],
+        embeddings=[embedding.tolist() for embedding in embeddings],
+        metadatas=metadatas,
+        ids=list(video_ids)
+    )
+
+@traced("vector.add")
+def add_chunks_to_collection(collection, video_id, chunks, embeddings, metadata=None):
+    """
+    Store each transcript chunk as its own entry with one bulk upsert.
+
+    Args:
+        chunks (list): {"text", "start", "end"} dicts from utils.chunking
+        embeddings (np.ndarray): (N, D) matrix, one row per chunk
+        metadata (dict): Extra fields copied onto every chunk (url, title, ...)
+    """
+    if not chunks:
+        return
+    current_span().set(items=len(chunks))
+    # Drop chunks from an earlier ingest that may have produced more windows
+    collection.delete(where={"$and": [{"video_id": video_id}, {"kind": "chunk"}]})
+
+    metadatas = []
+    for chunk in chunks:
+        chunk_meta = {k: v for k, v in (metadata or {}).items() if k != "text"}
+        chunk_meta.update(video_id=video_id, kind="chunk")
+        if chunk["start"] is not None:
+            chunk_meta.update(start=chunk["start"], end=chunk["end"])
+        metadatas.append(chunk_meta)
+
+    collection.upsert(
+        documents=[chunk["text"] for chunk in chunks],
+        embeddings=[embedding.tolist() for embedding in embeddings],
+        metadatas=metadatas,
+        ids=[f"{video_id}:chunk:{i}" for i in range(len(chunks))]
+    )
+
+def build_where(video_id=None, kind="chunk", start=None, end=None):
+    """
+    Build a Chroma `where` filter.
+
+    Args:
+        video_id (str or list): Restrict to one video, or any of several
+        kind (str): "chunk" or "video"; None matches both
+        start, end (float): Keep chunks overlapping this time range (seconds)
+
+    Returns:
+        dict or None: None when there is nothing to filter on
+    """
+    clauses = []
+    if video_id is not None:
+        if isinstance(video_id, (list, tuple, set)):
+            clauses.append({"video_id": {"$in": list(video_id)}})
+        else:
+            clauses.append({"video_id": video_id})
+    if kind is not None:
+        clauses.append({"kind": kind})
+    if start is not None:
+        clauses.append({"end": {"$gte": float(start)}})
+    if end is not None:
+        clauses.append({"start": {"$lte": float(end)}})
+    if not clauses:
+        return None
+    # Chroma rejects an $and with a single operand
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+@traced("vector.query")
+def search(collection, query_embeddings, top_k=5, video_id=None, kind="chunk", start=None, end=None):
+    """
+    Nearest-neighbour search with the filters applied inside Chroma, so top_k
+    results all come from the requested video and time range.
+
+    Args:
+        query_embeddings (np.ndarray): One (D,) vector or an (N, D) batch
+        top_k (int): Results per query
+
+    Returns:
+        list: One list of hits per query; each hit is a dict with
+            id, text, metadata and distance, nearest first
+    """
+    query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+    if query_embeddings.ndim == 1:
+        query_embeddings = query_embeddings[None, :]
+    current_span().set(items=len(query_embeddings), top_k=top_k)
+    kwargs = {"where": build_where(video_id, kind, start, end)}
+    if kwargs["where"] is None:
+        kwargs = {}
+    results = collection.query(
+        query_embeddings=query_embeddings.tolist(),
+        n_results=top_k,
+        include=['documents', 'metadatas', 'distances'],
+        **kwargs
+    )
+    return [
+        [
+            {"id": id_, "text": doc, "metadata": meta, "distance": distance}
+            for id_, doc, meta, distance in zip(ids, docs, metas, distances)
+        ]
+        for ids, docs, metas, distances in zip(
+            results["ids"], results["documents"], results["metadatas"], results["distances"]
+        )
+    ]